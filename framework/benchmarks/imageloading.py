@@ -0,0 +1,217 @@
+"""
+Micro-benchmarks of the modelhublib image loaders and converters: wall time
+and peak memory of each loader's load and each converter's conversion on
+synthetic inputs from tiny PNGs to a 512x512x300 NIfTI volume, including
+the attempts that fail (as they do in the chain of responsibility before
+the right handler is reached), the whole chains, and the routed load
+through the :class:`~modelhublib.imageloaders.loaderRegistry.LoaderRegistry`.
+
+Each case runs in a fresh process, so its peak memory is not distorted by
+earlier cases. Peak memory is the growth of the process' resident set
+size (RSS) during the call, including memory allocated by PIL and SimpleITK.
+It is read from /proc, so the benchmark runs on Linux only.
+
+Run from the framework folder:
+
+    python -m benchmarks.imageloading [--repeat N] [--quick] [--json RESULTS_FILE]
+"""
+
+import os
+import gc
+import time
+import json
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+import numpy as np
+import PIL.Image
+import SimpleITK as sitk
+from modelhublib.processor import ImageProcessorBase
+from modelhublib.imageloaders import PilImageLoader, SitkImageLoader, NumpyImageLoader
+from modelhublib.imageconverters import PilToNumpyConverter, SitkToNumpyConverter, \
+    NumpyToNumpyConverter
+
+
+# accepts inputs of any size
+CONFIG = {"model": {"io": {"input": {"format": ["image/png"],
+                                     "single": {"dim_limits": [{}, {}, {}]}}}}}
+
+LOADERS = [PilImageLoader, SitkImageLoader, NumpyImageLoader]
+CONVERTERS = [PilToNumpyConverter, SitkToNumpyConverter, NumpyToNumpyConverter]
+
+
+def make_volume(shape, dtype=np.int16, seed=0):
+    """
+    Returns a volume of smooth blobs with some noise, which compresses like
+    real scans do.
+    """
+    random = np.random.RandomState(seed)
+    grid = np.ogrid[tuple(slice(0, size) for size in shape)]
+    distance = sum(((axis - size / 2.0) / size) ** 2 for axis, size in zip(grid, shape))
+    volume = (1000 * np.cos(6 * distance)).astype(dtype)
+    volume += random.randint(0, 20, size=shape).astype(dtype)
+    return volume
+
+
+def write_pil(array, path):
+    PIL.Image.fromarray(array).save(path)
+
+
+def write_sitk(array, path):
+    sitk.WriteImage(sitk.GetImageFromArray(array), path, path.endswith(".gz"))
+
+
+INPUTS = [
+    ("png 4x2 gray", "input.png", write_pil,
+     lambda: np.tile(np.array([50, 100, 150, 200], dtype=np.uint8), (2, 1))),
+    ("png 512x512 rgb", "input.png", write_pil,
+     lambda: make_volume((512, 512, 3), np.uint8)),
+    ("npy 64x256x256 float32", "input.npy", lambda array, path: np.save(path, array),
+     lambda: make_volume((64, 256, 256), np.float32)),
+    ("nrrd 64x256x256 int16", "input.nrrd", write_sitk,
+     lambda: make_volume((64, 256, 256))),
+    ("nii.gz 155x240x240 int16", "input.nii.gz", write_sitk,
+     lambda: make_volume((155, 240, 240))),
+    ("nii 300x512x512 int16", "input.nii", write_sitk,
+     lambda: make_volume((300, 512, 512))),
+]
+LARGE_INPUTS = ["nii 300x512x512 int16"]
+
+
+def current_rss():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+
+
+def reset_peak_rss():
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+
+
+def peak_rss():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+
+
+def make_case(kind, handler, path, copy_free):
+    """
+    Returns the function to benchmark for a case. kind is "load" or
+    "convert", handler the name of a loader or converter
+    class, "chain" for the processor's chain of responsibility or "routed"
+    for the processor's loader registry.
+    """
+    processor = ImageProcessorBase(CONFIG)
+    if kind == "load":
+        if handler == "chain":
+            return lambda: processor._imageLoader.load(path)
+        if handler == "routed":
+            return lambda: processor._loaderRegistry.load(path)
+        loader = dict((cls.__name__, cls) for cls in LOADERS)[handler](CONFIG)
+        return lambda: loader._loadSingle(path)
+    image = processor._loaderRegistry.load(path)
+    if handler == "chain":
+        converter = processor._imageToNumpyConverter
+        converter.setCopyFree(copy_free)
+        return lambda: converter.convert(image)
+    converter = dict((cls.__name__, cls) for cls in CONVERTERS)[handler](copyFree=copy_free)
+    return lambda: converter._convert(image)
+
+
+def run_case(kind, handler, path, copy_free, repeat):
+    """
+    Runs a case repeat times in the current process, after an unmeasured
+    run that initializes the libraries. Returns the wall times, the largest
+    growth of the peak RSS over the RSS before the call, and whether the
+    handler succeeded.
+    """
+    func = make_case(kind, handler, path, copy_free)
+    try:
+        func()
+    except Exception:
+        pass
+    times = []
+    peak = 0
+    succeeded = True
+    for _ in range(repeat):
+        gc.collect()
+        before = current_rss()
+        reset_peak_rss()
+        start = time.time()
+        try:
+            result = func()
+        except Exception:
+            result = None
+        times.append(time.time() - start)
+        peak = max(peak, peak_rss() - before)
+        succeeded = result is not None
+        del result
+    return {"min_ms": 1000 * min(times),
+            "median_ms": 1000 * sorted(times)[len(times) // 2],
+            "peak_mb": peak / 1e6,
+            "succeeded": succeeded}
+
+
+def cases():
+    for handler in [cls.__name__ for cls in LOADERS] + ["chain", "routed"]:
+        yield "load", handler, False
+    for handler in [cls.__name__ for cls in CONVERTERS] + ["chain"]:
+        yield "convert", handler, False
+        yield "convert", handler, True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark image loaders and converters.")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs per case, the fastest and the median are reported")
+    parser.add_argument("--quick", action="store_true",
+                        help="skip the %s volume" % ", ".join(LARGE_INPUTS))
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp()
+    context = multiprocessing.get_context("spawn")
+    results = []
+    try:
+        for input_name, file_name, write, make_input in INPUTS:
+            if args.quick and input_name in LARGE_INPUTS:
+                continue
+            path = os.path.join(folder, file_name)
+            array = make_input()
+            write(array, path)
+            print("\n%s (%.1f MB in memory, %.1f MB on disk)"
+                  % (input_name, array.nbytes / 1e6, os.path.getsize(path) / 1e6))
+            del array
+            print("%-8s %-22s %-9s %10s %10s %10s %6s" % ("step", "handler", "copyfree",
+                                                          "min ms", "median ms", "peak MB",
+                                                          "ok"))
+            for kind, handler, copy_free in cases():
+                # a fresh process per case keeps peak memory comparable
+                pool = context.Pool(1)
+                try:
+                    result = pool.apply(run_case, (kind, handler, path, copy_free,
+                                                   args.repeat))
+                finally:
+                    pool.close()
+                    pool.join()
+                print("%-8s %-22s %-9s %10.2f %10.2f %10.1f %6s"
+                      % (kind, handler, "yes" if copy_free else "no", result["min_ms"],
+                         result["median_ms"], result["peak_mb"],
+                         "yes" if result["succeeded"] else "no"))
+                result.update({"input": input_name, "step": kind, "handler": handler,
+                               "copy_free": copy_free})
+                results.append(result)
+            os.remove(path)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Compares the output formats of :mod:`modelhubapi.outputwriters` by write
+time, file size and read-back time on segmentation masks and probability
+maps of realistic sizes.
+
+Run from the framework folder:
+
+    python -m benchmarks.output_formats [--repeat N] [--json RESULTS_FILE]
+"""
+
+import os
+import time
+import json
+import shutil
+import argparse
+import tempfile
+import numpy as np
+import h5py
+from modelhubapi.outputwriters import get_output_writer, OUTPUT_FORMATS
+
+
+def make_mask(shape, num_labels=4, seed=0):
+    """
+    Returns a label mask with a few ellipsoid blobs on background, which
+    compresses like real segmentations do (mostly background, smooth
+    boundaries).
+    """
+    random = np.random.RandomState(seed)
+    grid = np.ogrid[tuple(slice(0, size) for size in shape)]
+    mask = np.zeros(shape, dtype=np.uint8)
+    for label in range(1, num_labels + 1):
+        center = [random.uniform(0.3, 0.7) * size for size in shape]
+        radius = [random.uniform(0.05, 0.2) * size for size in shape]
+        distance = sum(((axis - c) / r) ** 2 for axis, c, r in zip(grid, center, radius))
+        mask[distance <= 1] = label
+    return mask
+
+
+def make_probabilities(shape, seed=0):
+    """
+    Returns a smooth float32 probability map for the foreground of a mask.
+    """
+    mask = make_mask(shape, num_labels=1, seed=seed).astype(np.float32)
+    noise = np.random.RandomState(seed).uniform(0, 0.05, shape).astype(np.float32)
+    return np.clip(mask * 0.9 + noise, 0, 1)
+
+
+OUTPUTS = [
+    ("mask 2D 512x512 uint8", lambda: make_mask((512, 512))),
+    ("mask 3D 155x240x240 uint8", lambda: make_mask((155, 240, 240))),
+    ("probabilities 3D 155x240x240 float32", lambda: make_probabilities((155, 240, 240))),
+]
+
+
+def read_back(path, name):
+    if path.endswith(".h5"):
+        with h5py.File(path, "r") as h5f:
+            return h5f[name][...]
+    if path.endswith(".npz"):
+        with np.load(path) as npz:
+            return npz[name]
+    return np.load(path)
+
+
+def benchmark(output, output_format, folder, repeat):
+    writer = get_output_writer(output_format)
+    path = os.path.join(folder, "output" + writer.extension)
+    write_times = []
+    read_times = []
+    for _ in range(repeat):
+        if os.path.exists(path):
+            os.remove(path)
+        start = time.time()
+        writer.write(output, "output", path)
+        write_times.append(time.time() - start)
+        start = time.time()
+        data = read_back(path, "output")
+        read_times.append(time.time() - start)
+        assert np.array_equal(data, output)
+    return {"write_ms": 1000 * min(write_times),
+            "read_ms": 1000 * min(read_times),
+            "size_bytes": os.path.getsize(path),
+            "ratio": float(output.nbytes) / os.path.getsize(path)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark numpy output formats.")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs per output and format, the fastest is reported")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp()
+    results = []
+    try:
+        for output_name, make_output in OUTPUTS:
+            output = make_output()
+            print("\n%s (%.1f MB)" % (output_name, output.nbytes / 1e6))
+            print("%-10s %10s %10s %12s %8s" % ("format", "write ms", "read ms", "size", "ratio"))
+            for output_format in sorted(OUTPUT_FORMATS):
+                result = benchmark(output, output_format, folder, args.repeat)
+                print("%-10s %10.1f %10.1f %12d %8.1f" % (output_format, result["write_ms"],
+                                                         result["read_ms"], result["size_bytes"],
+                                                         result["ratio"]))
+                result.update({"output": output_name, "format": output_format})
+                results.append(result)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
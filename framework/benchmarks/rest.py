@@ -0,0 +1,297 @@
+"""
+End-to-end throughput and latency benchmark of the REST API, driving
+concurrent traffic of several kinds against servers running the single and
+the multi input mock models (contrib_src_si and contrib_src_mi) with a
+synthetic inference latency and numpy output size:
+
+* predict: POST upload of a sample image
+* predict_mi: POST upload of a multi input json file
+* predict_sample: GET prediction on a sample image
+* get_config: GET of the model configuration
+* output: GET download of a saved numpy output
+
+Run from the framework folder:
+
+    python -m benchmarks.rest [--clients N] [--requests N] [--delay SECONDS]
+                              [--output-size BYTES] [--scenarios NAME ...]
+                              [--server flask|gunicorn] [--json RESULTS_FILE]
+                              [--baseline BASELINE_FILE [--tolerance F]]
+                              [--save-baseline BASELINE_FILE]
+
+With --baseline, each scenario is compared to the stored results and the
+benchmark exits with status 1 if throughput dropped or a latency percentile
+rose by more than the tolerance, or if any request failed. Baselines are only
+comparable on the same machine with the same arguments, so no baseline is
+kept in the repository. To check a change for regressions, record a baseline
+on the commit before it and compare against it on the same machine:
+
+    git checkout <commit before the change>
+    python -m benchmarks.rest --save-baseline /tmp/rest_baseline.json
+    git checkout <commit with the change>
+    python -m benchmarks.rest --baseline /tmp/rest_baseline.json
+
+Pass the same arguments (e.g. --server gunicorn) to both runs; a warning is
+printed if they differ. On a noisy machine, rerun the comparison or raise
+--tolerance before treating a single failure as a regression.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import signal
+import argparse
+import tempfile
+import threading
+import multiprocessing
+import numpy as np
+import requests
+from modelhubapi import ModelHubRESTAPI
+from modelhubapi_tests.mockmodels.contrib_src_si.inference import Model
+from .serving import free_port, wait_until_up, percentile
+
+
+MOCKMODELS_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..",
+                              "modelhubapi_tests", "mockmodels")
+SAMPLE_IMAGE = os.path.join(MOCKMODELS_DIR, "contrib_src_si", "sample_data",
+                            "testimage_ramp_4x2.png")
+
+SCENARIOS = ["predict", "predict_mi", "predict_sample", "get_config", "output"]
+LATENCY_KEYS = ["p50_ms", "p95_ms", "p99_ms"]
+
+
+class SyntheticModel(Model):
+    """
+    Single input mock model whose inference sleeps delay seconds and returns
+    a label list and a uint8 mask of output_size bytes.
+    """
+
+    def __init__(self, delay, output_size):
+        self.delay = delay
+        self.output_size = output_size
+
+    def infer(self, input):
+        time.sleep(self.delay)
+        label_list = [{"label": "class_0", "probability": 0.3},
+                      {"label": "class_1", "probability": 0.7}]
+        side = max(1, int(round(np.sqrt(self.output_size))))
+        return [label_list, np.arange(side * side, dtype=np.uint8).reshape(side, side)]
+
+
+class SyntheticMultiInputModel(Model):
+    """
+    Multi input mock model whose inference sleeps delay seconds and returns
+    a label list.
+    """
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def infer(self, input):
+        if not isinstance(input, dict):
+            raise IOError("Multi input model expects a dictionary of inputs.")
+        time.sleep(self.delay)
+        return [{"label": "class_0", "probability": 0.3},
+                {"label": "class_1", "probability": 0.7}]
+
+
+def serve(contrib_src, model, port, folder, server, workers, threads):
+    rest_api = ModelHubRESTAPI(model, os.path.join(MOCKMODELS_DIR, contrib_src))
+    rest_api.working_folder = folder
+    rest_api.api.output_folder = folder
+    if server == "gunicorn":
+        rest_api.start_gunicorn("127.0.0.1", port, workers=workers, threads=threads)
+    else:
+        rest_api.start("127.0.0.1", port)
+
+
+def start_server(contrib_src, model, args, folder):
+    port = free_port()
+    process = multiprocessing.Process(target=serve, args=(contrib_src, model, port, folder,
+                                                          args.server, args.workers,
+                                                          args.threads))
+    process.start()
+    url = "http://127.0.0.1:%d/api/" % port
+    wait_until_up(url)
+    return process, url
+
+
+def stop_server(process):
+    os.kill(process.pid, signal.SIGTERM)
+    process.join(30)
+    if process.is_alive():
+        os.kill(process.pid, signal.SIGKILL)
+        process.join()
+
+
+def make_requests(si_url, mi_url):
+    """
+    Returns a function per scenario, which sends one request of that
+    scenario with the given requests session.
+    """
+    with open(SAMPLE_IMAGE, "rb") as f:
+        image = f.read()
+    mi_input = {"format": ["application/json"]}
+    for key in ["t1", "t1c", "t2", "flair"]:
+        mi_input[key] = {"format": ["application/nii-gzip"], "fileurl": SAMPLE_IMAGE}
+    mi_input = json.dumps(mi_input).encode("utf-8")
+    result = requests.get(si_url + "predict_sample?filename=testimage_ramp_4x2.png").json()
+    # output urls assume the default output folder "/output"
+    output_url = si_url + "output/" + os.path.basename(result["output"][1]["prediction"])
+    return {
+        "predict": lambda session: session.post(
+            si_url + "predict", files={"file": ("input.png", image)}),
+        "predict_mi": lambda session: session.post(
+            mi_url + "predict", files={"file": ("input.json", mi_input)}),
+        "predict_sample": lambda session: session.get(
+            si_url + "predict_sample?filename=testimage_ramp_4x2.png"),
+        "get_config": lambda session: session.get(si_url + "get_config"),
+        "output": lambda session: session.get(output_url),
+    }
+
+
+def run_clients(send, num_clients, num_requests):
+    """
+    Sends num_requests requests per client from num_clients concurrent
+    clients with keep-alive sessions, returns the latencies of successful
+    requests, the status codes of failed ones and the total time.
+    """
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    def client():
+        session = requests.Session()
+        for _ in range(num_requests):
+            start = time.time()
+            try:
+                status = send(session).status_code
+            except requests.RequestException:
+                status = None
+            latency = time.time() - start
+            with lock:
+                if status == 200:
+                    latencies.append(latency)
+                else:
+                    errors.append(status)
+    threads = [threading.Thread(target=client) for _ in range(num_clients)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.time() - start
+
+
+def summarize(latencies, errors, duration):
+    if not latencies:
+        return {"requests": 0, "errors": len(errors), "requests_per_s": 0.0,
+                "p50_ms": None, "p95_ms": None, "p99_ms": None}
+    return {"requests": len(latencies),
+            "errors": len(errors),
+            "requests_per_s": len(latencies) / duration,
+            "p50_ms": 1000 * percentile(latencies, 50),
+            "p95_ms": 1000 * percentile(latencies, 95),
+            "p99_ms": 1000 * percentile(latencies, 99)}
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compares results to baseline results per scenario.
+
+    Returns:
+        list: Descriptions of the regressions, empty if there are none.
+    """
+    regressions = []
+    for scenario, result in sorted(results.items()):
+        if result["errors"]:
+            regressions.append("%s: %d failed requests" % (scenario, result["errors"]))
+        reference = baseline.get(scenario)
+        if reference is None or not result["requests"]:
+            continue
+        if result["requests_per_s"] < reference["requests_per_s"] * (1 - tolerance):
+            regressions.append("%s: %.1f req/s, baseline %.1f req/s"
+                               % (scenario, result["requests_per_s"],
+                                  reference["requests_per_s"]))
+        for key in LATENCY_KEYS:
+            if reference.get(key) and result[key] > reference[key] * (1 + tolerance):
+                regressions.append("%s: %s %.1f ms, baseline %.1f ms"
+                                   % (scenario, key, result[key], reference[key]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the REST API end to end.")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=25, help="requests per client")
+    parser.add_argument("--delay", type=float, default=0.02,
+                        help="synthetic inference latency of the mock models in seconds")
+    parser.add_argument("--output-size", type=int, default=256 * 1024,
+                        help="size of the numpy output of the single input model in bytes")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS,
+                        help="traffic to benchmark, one after the other")
+    parser.add_argument("--server", choices=["flask", "gunicorn"], default="flask")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=4, help="gunicorn threads per worker")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--baseline", help="compare the results to this baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="relative change to the baseline considered a regression")
+    parser.add_argument("--save-baseline", help="store the results as baseline in this file")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp()
+    servers = []
+    results = {}
+    try:
+        si_server, si_url = start_server("contrib_src_si",
+                                         SyntheticModel(args.delay, args.output_size),
+                                         args, folder)
+        servers.append(si_server)
+        mi_server, mi_url = start_server("contrib_src_mi",
+                                         SyntheticMultiInputModel(args.delay), args, folder)
+        servers.append(mi_server)
+        scenarios = make_requests(si_url, mi_url)
+        print("%-16s %10s %10s %10s %10s %8s" % ("scenario", "req/s", "p50 ms", "p95 ms",
+                                                 "p99 ms", "errors"))
+        for scenario in args.scenarios:
+            # warm up connections and lazily started threads
+            run_clients(scenarios[scenario], args.clients, 1)
+            result = summarize(*run_clients(scenarios[scenario], args.clients,
+                                            args.requests))
+            results[scenario] = result
+            latencies = tuple("%.1f" % result[key] if result[key] is not None else "-"
+                              for key in LATENCY_KEYS)
+            print("%-16s %10.1f %10s %10s %10s %8d"
+                  % ((scenario, result["requests_per_s"]) + latencies + (result["errors"],)))
+    finally:
+        for server in servers:
+            stop_server(server)
+        shutil.rmtree(folder, ignore_errors=True)
+
+    report = {"arguments": {"clients": args.clients, "requests": args.requests,
+                            "delay": args.delay, "output_size": args.output_size,
+                            "server": args.server, "workers": args.workers,
+                            "threads": args.threads},
+              "results": results}
+    for path in [args.json, args.save_baseline]:
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("arguments") != report["arguments"]:
+            print("Warning: the baseline was run with other arguments: %s"
+                  % json.dumps(baseline.get("arguments"), sort_keys=True))
+        regressions = compare(results, baseline["results"], args.tolerance)
+        if regressions:
+            print("\nRegressions against %s:" % args.baseline)
+            for regression in regressions:
+                print("  " + regression)
+            sys.exit(1)
+        print("\nNo regressions against %s." % args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Compares throughput and latency of the REST API served by flask's
+development server and by gunicorn (see :mod:`modelhubapi.gunicornserver`),
+using the single input mock model with a synthetic inference latency.
+
+Run from the framework folder:
+
+    python -m benchmarks.serving [--clients N] [--requests N] [--delay SECONDS]
+                                 [--busy] [--workers N] [--threads N]
+                                 [--json RESULTS_FILE]
+
+Pre-forked workers pay off for CPU-bound models (--busy) on machines with
+several cores, where the threads of a single process contend for the GIL.
+"""
+
+import os
+import time
+import json
+import shutil
+import signal
+import socket
+import argparse
+import tempfile
+import threading
+import multiprocessing
+import requests
+from modelhubapi import ModelHubRESTAPI
+from modelhubapi import gunicornserver
+from modelhubapi_tests.mockmodels.contrib_src_si.inference import Model
+
+
+CONTRIB_SRC_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..",
+                               "modelhubapi_tests", "mockmodels", "contrib_src_si")
+
+
+class SyntheticLatencyModel(Model):
+    """
+    Mock model whose inference takes delay seconds, either sleeping (like
+    a model waiting for a GPU) or busy in Python (like a CPU-bound model
+    holding the GIL).
+    """
+
+    def __init__(self, delay, busy=False):
+        self.delay = delay
+        self.busy = busy
+
+    def infer(self, input):
+        end = time.time() + self.delay
+        if self.busy:
+            while time.time() < end:
+                pass
+        else:
+            time.sleep(self.delay)
+        return super(SyntheticLatencyModel, self).infer(input)
+
+
+def free_port():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def serve(server, port, folder, delay, busy, workers, threads):
+    rest_api = ModelHubRESTAPI(SyntheticLatencyModel(delay, busy), CONTRIB_SRC_DIR)
+    rest_api.working_folder = folder
+    rest_api.api.output_folder = folder
+    if server == "gunicorn":
+        rest_api.start_gunicorn("127.0.0.1", port, workers=workers, threads=threads)
+    else:
+        rest_api.start("127.0.0.1", port)
+
+
+def wait_until_up(url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(url + "get_config", timeout=1)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    raise RuntimeError("Server did not start within %d seconds." % timeout)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+
+def run_clients(url, num_clients, num_requests):
+    """
+    Sends num_requests predictions per client from num_clients concurrent
+    clients with keep-alive sessions, returns the latencies and the total time.
+    """
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    def client():
+        session = requests.Session()
+        for _ in range(num_requests):
+            start = time.time()
+            response = session.get(url + "predict_sample?filename=testimage_ramp_4x2.png")
+            latency = time.time() - start
+            with lock:
+                if response.status_code == 200:
+                    latencies.append(latency)
+                else:
+                    errors.append(response.status_code)
+    threads = [threading.Thread(target=client) for _ in range(num_clients)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.time() - start
+
+
+def benchmark(server, args):
+    port = free_port()
+    folder = tempfile.mkdtemp()
+    process = multiprocessing.Process(target=serve, args=(server, port, folder, args.delay,
+                                                          args.busy, args.workers,
+                                                          args.threads))
+    process.start()
+    try:
+        url = "http://127.0.0.1:%d/api/" % port
+        wait_until_up(url)
+        # warm up connections and lazily started threads
+        run_clients(url, args.clients, 1)
+        latencies, errors, duration = run_clients(url, args.clients, args.requests)
+    finally:
+        os.kill(process.pid, signal.SIGTERM)
+        process.join(30)
+        shutil.rmtree(folder, ignore_errors=True)
+    return {"server": server,
+            "requests_per_s": len(latencies) / duration,
+            "p50_ms": 1000 * percentile(latencies, 50),
+            "p95_ms": 1000 * percentile(latencies, 95),
+            "p99_ms": 1000 * percentile(latencies, 99),
+            "errors": len(errors)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the REST API servers.")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=25, help="requests per client")
+    parser.add_argument("--delay", type=float, default=0.05,
+                        help="synthetic inference latency of the mock model in seconds")
+    parser.add_argument("--busy", action="store_true",
+                        help="spend the latency busy in Python instead of sleeping")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=4, help="gunicorn threads per worker")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    servers = ["flask"]
+    if gunicornserver.BaseApplication is not None:
+        servers.append("gunicorn")
+    else:
+        print("gunicorn is not installed, benchmarking flask's server only.")
+    results = []
+    print("%-10s %10s %10s %10s %10s %8s" % ("server", "req/s", "p50 ms", "p95 ms",
+                                             "p99 ms", "errors"))
+    for server in servers:
+        result = benchmark(server, args)
+        print("%-10s %10.1f %10.1f %10.1f %10.1f %8d" % (server, result["requests_per_s"],
+                                                        result["p50_ms"], result["p95_ms"],
+                                                        result["p99_ms"], result["errors"]))
+        results.append(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import os
+import sys
+import time
+import threading
+import six
+from six.moves import queue
+
+
+class BatchScheduler(object):
+    """
+    Gathers concurrent inference requests and runs them together through
+    :func:`~modelhublib.model.ModelBase.infer_batch`.
+
+    The first request arriving at an idle scheduler opens a batch. The batch
+    is run as soon as it holds max_batch_size inputs or max_wait_ms
+    milliseconds have passed since it was opened, whichever comes first.
+    Each caller blocks until the result for its own input is available.
+
+    Args:
+        model (ModelBase): Model to run the batched inference on.
+        max_batch_size (int): Maximum number of inputs passed to a single
+            infer_batch call.
+        max_wait_ms (float): Maximum time in milliseconds a batch waits for
+            further requests before it is run.
+    """
+
+    def __init__(self, model, max_batch_size=8, max_wait_ms=10):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1.")
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+
+
+    def infer(self, input):
+        """
+        Queues input for the next batch and waits for its inference result.
+
+        Args:
+            input: Input as it would be passed to
+                :func:`~modelhublib.model.ModelBase.infer`.
+
+        Returns:
+            The inference result for input, as returned by the model.
+
+        Raises:
+            The exception raised by the model while processing input.
+        """
+        request = _BatchRequest(input)
+        self._ensure_worker()
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            six.reraise(*request.error)
+        return request.output
+
+
+    # -------------------------------------------------------------------------
+    # Private helper functions
+    # -------------------------------------------------------------------------
+
+    def _ensure_worker(self):
+        """
+        Starts the worker thread on first use. Also restarts it in forked
+        child processes, which do not inherit the parent's threads.
+        """
+        with self._lock:
+            if self._worker is None or self._worker_pid != os.getpid():
+                self._queue = queue.Queue()
+                self._start_worker()
+
+
+    def _start_worker(self):
+        """
+        Must be called with the lock acquired.
+        """
+        self._worker_pid = os.getpid()
+        self._worker = threading.Thread(target=self._run, args=(self._queue,))
+        self._worker.daemon = True
+        self._worker.start()
+
+
+    def _run(self, requests):
+        while True:
+            batch = [requests.get()]
+            deadline = time.time() + self.max_wait_ms / 1000.0
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(requests.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                self._run_batch(batch)
+            except BaseException:
+                # e.g. SystemExit raised by the model, which ends this thread:
+                # fail the batch instead of leaving its callers blocked, and
+                # hand the queued requests to a new thread
+                error = sys.exc_info()
+                for request in batch:
+                    if not request.done.is_set():
+                        request.error = error
+                        request.done.set()
+                with self._lock:
+                    if self._queue is requests:
+                        self._start_worker()
+                raise
+
+
+    def _run_batch(self, batch):
+        """
+        Runs the inference on a batch and hands each result to its request.
+        If the batch fails as a whole, each input is retried on its own, so
+        that a single faulty input does not fail the other requests.
+        """
+        try:
+            outputs = self._infer_batch(batch)
+        except Exception:
+            if len(batch) > 1:
+                for request in batch:
+                    self._run_batch([request])
+                return
+            batch[0].error = sys.exc_info()
+            batch[0].done.set()
+            return
+        for request, output in zip(batch, outputs):
+            request.output = output
+            request.done.set()
+
+
+    def _infer_batch(self, batch):
+        outputs = self.model.infer_batch([request.input for request in batch])
+        if len(outputs) != len(batch):
+            raise ValueError("infer_batch returned %d results for %d inputs."
+                             % (len(outputs), len(batch)))
+        return outputs
+
+
+
+class _BatchRequest(object):
+
+    def __init__(self, input):
+        self.input = input
+        self.output = None
+        self.error = None
+        self.done = threading.Event()
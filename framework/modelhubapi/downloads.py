@@ -0,0 +1,224 @@
+import os
+import hashlib
+import threading
+from multiprocessing.pool import ThreadPool
+import requests
+from requests.adapters import HTTPAdapter
+from modelhublib import metrics
+
+
+_cacheRequests = metrics.registry.counter(
+    "modelhub_input_cache_requests_total",
+    "Downloads looked up in the input cache, by result: \"hit\" (cached file "
+    "still valid), \"stale\" (cached file outdated) or \"miss\" (not cached).",
+    ("result",))
+
+
+# Content types servers send when they do not know better. Inputs served with
+# one of these are accepted no matter what types are expected.
+GENERIC_CONTENT_TYPES = ("application/octet-stream", "binary/octet-stream",
+                         "application/gzip", "application/x-gzip",
+                         "text/plain")
+
+
+# Content types different servers send for the same format, keyed by the
+# type they are compared as. Applied to both the served and the expected types.
+CONTENT_TYPE_ALIASES = {
+    "image/jpeg": ("image/jpg", "image/pjpeg"),
+    "image/png": ("image/x-png",),
+    "image/tiff": ("image/x-tiff",),
+    "image/bmp": ("image/x-bmp", "image/x-ms-bmp"),
+    "application/nii": ("application/nii-gzip", "application/x-nifti",
+                        "application/x-nifti-gz", "image/x-nifti", "image/nii"),
+    "application/nrrd": ("application/x-nrrd", "image/x-nrrd", "image/nrrd"),
+    "application/dicom": ("application/dicom+json", "application/x-dicom",
+                          "image/dicom", "image/x-dicom"),
+}
+_CANONICAL_CONTENT_TYPES = dict((alias, content_type)
+                                for content_type, aliases in CONTENT_TYPE_ALIASES.items()
+                                for alias in aliases)
+
+
+class DownloadError(IOError):
+    """
+    Raised if a remote input is rejected or cannot be downloaded.
+    """
+    pass
+
+
+
+class DownloadManager(object):
+    """
+    Downloads remote input files over a pooled keep-alive session.
+
+    Before any content is transferred, each URL is checked with a HEAD
+    request, so that inputs exceeding :attr:`max_size` or served with an
+    unexpected content type are rejected right away. Servers which do not
+    support HEAD are asked with GET only. The content is then streamed to
+    disk in chunks of :attr:`chunk_size` bytes, and the download is aborted
+    as soon as it exceeds :attr:`max_size`.
+
+    If :attr:`cache` is set to an :class:`~modelhubapi.inputcache.InputCache`,
+    URLs downloaded before are revalidated with a conditional GET instead,
+    and the cached file is linked to the requested file name if it is still
+    valid.
+
+    Args:
+        connect_timeout (float): Seconds to wait for a connection.
+        read_timeout (float): Seconds to wait for the server to send data
+            (between two bytes, not for the whole download).
+        max_size (int): Maximum size of a single download in bytes.
+        chunk_size (int): Size of the chunks written to disk in bytes.
+        num_workers (int): Maximum number of concurrent downloads in
+            :func:`~download_many`. Also the number of pooled connections
+            per host.
+    """
+
+    def __init__(self, connect_timeout=5, read_timeout=60, max_size=1024**3,
+                 chunk_size=1024**2, num_workers=4):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_size = max_size
+        self.chunk_size = chunk_size
+        self.num_workers = num_workers
+        self.cache = None
+        self._session = None
+        self._session_pid = None
+        self._lock = threading.Lock()
+
+
+    def download(self, url, file_name, allowed_types=None):
+        """
+        Downloads url to file_name.
+
+        Args:
+            url (str): URL of the file to download.
+            file_name (str): Path to save the file to.
+            allowed_types (list or None): Expected content types. Inputs served
+                with another, non-generic content type (see
+                GENERIC_CONTENT_TYPES) are rejected, aliases of the same
+                format (see CONTENT_TYPE_ALIASES) are accepted. Any type is
+                accepted if None.
+
+        Returns:
+            str: file_name
+
+        Raises:
+            DownloadError if the input is rejected or the server responds
+            with an error.
+            requests.exceptions.RequestException on connection errors and
+            timeouts.
+        """
+        session = self._get_session()
+        timeout = (self.connect_timeout, self.read_timeout)
+        cached = self.cache.lookup(url) if self.cache is not None else None
+        if cached is None:
+            head = session.head(url, timeout=timeout, allow_redirects=True)
+            if head.status_code not in (405, 501):
+                self._check_response(url, head, allowed_types)
+        headers = self.cache.conditional_headers(cached) if cached else None
+        with session.get(url, timeout=timeout, stream=True,
+                         headers=headers) as response:
+            if cached is not None and response.status_code == 304:
+                if self.cache.link(cached, file_name):
+                    _cacheRequests.inc(result="hit")
+                    return file_name
+                # the cached file is gone, download without revalidation
+                self.cache.discard(url)
+                return self.download(url, file_name, allowed_types)
+            self._check_response(url, response, allowed_types)
+            _cacheRequests.inc(result="stale" if cached else "miss")
+            digest = hashlib.sha256()
+            size = 0
+            try:
+                with open(file_name, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        size += len(chunk)
+                        if size > self.max_size:
+                            raise DownloadError(self._too_large_message(url))
+                        digest.update(chunk)
+                        f.write(chunk)
+            except Exception:
+                if os.path.exists(file_name):
+                    os.remove(file_name)
+                raise
+        if self.cache is not None:
+            self.cache.store(url, file_name, digest.hexdigest(),
+                             response.headers.get("ETag"),
+                             response.headers.get("Last-Modified"))
+        return file_name
+
+
+    def download_many(self, downloads):
+        """
+        Downloads several files concurrently.
+
+        Args:
+            downloads (list): Tuples (url, file_name, allowed_types) with the
+                arguments of :func:`~download` for each file.
+
+        Returns:
+            list: File names of the downloaded files, in order of downloads.
+
+        Raises:
+            The first error raised by any of the downloads, see
+            :func:`~download`. The other downloads are completed anyway.
+        """
+        if len(downloads) <= 1 or self.num_workers <= 1:
+            return [self.download(*args) for args in downloads]
+        pool = ThreadPool(min(self.num_workers, len(downloads)))
+        try:
+            return pool.map(lambda args: self.download(*args), downloads)
+        finally:
+            pool.close()
+            pool.join()
+
+
+    # -------------------------------------------------------------------------
+    # Private helper functions
+    # -------------------------------------------------------------------------
+
+    def _get_session(self):
+        """
+        Creates the session on first use. Forked child processes get their own
+        session, so they never share pooled connections with the parent.
+        """
+        with self._lock:
+            if self._session is None or self._session_pid != os.getpid():
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.num_workers,
+                                      pool_maxsize=self.num_workers)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+                self._session_pid = os.getpid()
+            return self._session
+
+
+    def _check_response(self, url, response, allowed_types):
+        if response.status_code >= 400:
+            raise DownloadError("Could not download %s (HTTP status %d)."
+                                % (url, response.status_code))
+        content_length = response.headers.get("Content-Length")
+        if content_length is not None and content_length.isdigit() \
+                and int(content_length) > self.max_size:
+            raise DownloadError(self._too_large_message(url))
+        content_type = response.headers.get("Content-Type", "")
+        content_type = content_type.split(";")[0].strip().lower()
+        if allowed_types is not None and content_type \
+                and content_type not in GENERIC_CONTENT_TYPES \
+                and _canonical_content_type(content_type) not in \
+                [_canonical_content_type(allowed) for allowed in allowed_types]:
+            raise DownloadError("Incorrect file type. The content type %s of %s is not "
+                                "supported." % (content_type, url))
+
+
+    def _too_large_message(self, url):
+        return "The file at %s exceeds the maximum size of %d bytes." \
+            % (url, self.max_size)
+
+
+
+def _canonical_content_type(content_type):
+    content_type = content_type.lower()
+    return _CANONICAL_CONTENT_TYPES.get(content_type, content_type)
@@ -0,0 +1,93 @@
+"""
+Helper functions computing digests which identify inputs and model versions,
+e.g. to key caches of prediction results.
+"""
+
+import os
+import hashlib
+import six
+
+
+# Files and folders of contrib_src which do not affect predictions
+_IGNORED_NAMES = ("sample_data", "__pycache__")
+_IGNORED_EXTENSIONS = (".pyc", ".pyo")
+
+
+def file_digest(input, chunk_size=1024**2):
+    """
+    Args:
+        input (str or file-like): Path to a file or a file-like object,
+            which is rewound afterwards.
+        chunk_size (int): Number of bytes read at once.
+
+    Returns:
+        str: Hex SHA-256 digest of the file's content.
+    """
+    digest = hashlib.sha256()
+    if isinstance(input, six.string_types):
+        with open(input, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+    else:
+        input.seek(0)
+        for chunk in iter(lambda: input.read(chunk_size), b""):
+            digest.update(chunk)
+        input.seek(0)
+    return digest.hexdigest()
+
+
+def input_digest(input):
+    """
+    Args:
+        input (str, file-like or dict): Input as passed to the model's infer
+            method, i.e. a file name, a file-like object or a multi-input
+            dictionary, whose entries hold file names under "fileurl".
+
+    Returns:
+        str: Hex SHA-256 digest of the content of all input files. For
+        multi-input dictionaries, the ids and types of the inputs are part
+        of the digest as well.
+    """
+    if not isinstance(input, dict):
+        return file_digest(input)
+    digest = hashlib.sha256()
+    for key in sorted(input.keys()):
+        value = input[key]
+        digest.update(("%s\0" % key).encode("utf-8"))
+        if key == "format" or not isinstance(value, dict):
+            digest.update(("%r\0" % (value,)).encode("utf-8"))
+            continue
+        digest.update(("%r\0" % (value.get("type"),)).encode("utf-8"))
+        file_name = value.get("fileurl")
+        if isinstance(file_name, six.string_types) and os.path.isfile(file_name):
+            digest.update(file_digest(file_name).encode("utf-8"))
+        else:
+            digest.update(("%r\0" % (file_name,)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def model_fingerprint(contrib_src_dir):
+    """
+    Computes a fingerprint of the model version from the names, sizes and
+    modification times of all files in contrib_src_dir (except sample data
+    and compiled python files). File contents are not read, so this is cheap
+    even for large model weights.
+
+    Args:
+        contrib_src_dir (str): Path to the contrib_src directory of the model.
+
+    Returns:
+        str: Hex SHA-256 digest identifying the current model version.
+    """
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(contrib_src_dir):
+        dirs[:] = sorted(d for d in dirs if d not in _IGNORED_NAMES)
+        for name in sorted(files):
+            if name.endswith(_IGNORED_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            stat = os.stat(path)
+            relative_path = os.path.relpath(path, contrib_src_dir)
+            digest.update(("%s\0%d\0%d\0" % (relative_path, stat.st_size,
+                                              int(stat.st_mtime * 1e6))).encode("utf-8"))
+    return digest.hexdigest()
@@ -0,0 +1,54 @@
+import os
+import flask
+from flask import request
+
+try:
+    from werkzeug.utils import safe_join
+except ImportError:
+    # Werkzeug < 2.0
+    from werkzeug.security import safe_join
+
+
+# send_file's arguments changed in Flask 2.0
+_FLASK_2 = int(getattr(flask, "__version__", "2").split(".")[0]) >= 2
+
+
+def send_file(path, mimetype=None, as_attachment=False, download_name=None, etag=None):
+    """
+    Sends the file at path in response to the current request, like
+    flask.send_file with conditional=True does in Flask 2, on all supported
+    Flask versions (0.12 to 2.2). Responses honor If-None-Match (304) and
+    Range (206) requests.
+
+    Args:
+        path (str): Path of the file to send.
+        mimetype (str or None): Mime type of the file, guessed from its
+            name if None.
+        as_attachment (bool): Whether the client should save the file
+            instead of displaying it.
+        download_name (str or None): File name the client should save the
+            file as, defaults to the file's name.
+        etag (str or None): ETag of the file. Flask derives one from the
+            file's modification time and size if None.
+
+    Returns:
+        flask.Response: The response.
+    """
+    if _FLASK_2:
+        return flask.send_file(path, mimetype=mimetype, as_attachment=as_attachment,
+                               download_name=download_name, conditional=True,
+                               etag=etag if etag is not None else True)
+    if etag is None:
+        response = flask.send_file(path, mimetype=mimetype, as_attachment=as_attachment,
+                                   attachment_filename=download_name, conditional=True)
+    else:
+        response = flask.send_file(path, mimetype=mimetype, as_attachment=as_attachment,
+                                   attachment_filename=download_name, add_etags=False)
+        response.set_etag(etag)
+        response = response.make_conditional(request, accept_ranges=True,
+                                             complete_length=os.path.getsize(path))
+    # unlike Flask 2, older versions let clients cache files for 12 hours
+    response.cache_control.public = None
+    response.cache_control.max_age = None
+    response.expires = None
+    return response
@@ -0,0 +1,88 @@
+"""
+Production serving of the REST API with gunicorn, an optional dependency
+(``pip install gunicorn``).
+
+The model is loaded once in gunicorn's master process, which then forks the
+worker processes (``preload_app``). Workers thereby share the model's
+weights copy-on-write instead of each loading its own copy. Each worker
+serves requests with a pool of threads.
+
+Background services (metadata watcher, output retention) are restarted in
+each worker after the fork. Some state stays per worker, though: the in-memory
+result cache, request coalescing, and the in-process job queue. Jobs are
+therefore only found by the worker they were submitted to; use a single
+worker if clients rely on :func:`~modelhubapi.restapi.ModelHubRESTAPI.submit_job`.
+"""
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:
+    BaseApplication = None
+
+
+def serve(rest_api, host="0.0.0.0", port=80, workers=2, threads=4,
+          keepalive=5, timeout=120, graceful_timeout=30, max_requests=0,
+          max_requests_jitter=0):
+    """
+    Serves the REST API with gunicorn until the master process receives
+    SIGTERM or SIGINT. Blocks until then.
+
+    Args:
+        rest_api (ModelHubRESTAPI): The REST API to serve, including its
+            loaded model.
+        host (str): Address to listen on.
+        port (int): Port to listen on.
+        workers (int): Number of forked worker processes.
+        threads (int): Number of request threads per worker.
+        keepalive (int): Seconds to keep idle client connections open.
+        timeout (int): Seconds after which unresponsive workers are killed
+            and replaced.
+        graceful_timeout (int): Seconds workers get to finish their requests
+            on shutdown or recycling, before they are killed.
+        max_requests (int): Number of requests after which a worker is
+            replaced by a fresh one (e.g. to limit memory leaks of the model),
+            0 disables recycling.
+        max_requests_jitter (int): Random number of requests up to this is
+            added to max_requests per worker, so that workers are not all
+            recycled at once.
+
+    Raises:
+        ImportError if gunicorn is not installed.
+    """
+    if BaseApplication is None:
+        raise ImportError("The production server requires gunicorn, install "
+                          "it with \"pip install gunicorn\".")
+    options = {"bind": "%s:%d" % (host, port),
+               "workers": workers,
+               "threads": threads,
+               "worker_class": "gthread",
+               "keepalive": keepalive,
+               "timeout": timeout,
+               "graceful_timeout": graceful_timeout,
+               "max_requests": max_requests,
+               "max_requests_jitter": max_requests_jitter,
+               "preload_app": True,
+               "post_fork": lambda server, worker: rest_api.after_fork()}
+    _Application(rest_api.app, options).run()
+
+
+
+if BaseApplication is not None:
+
+    class _Application(BaseApplication):
+        """
+        Gunicorn application serving an already created WSGI app, configured
+        from a dictionary instead of the command line.
+        """
+
+        def __init__(self, app, options):
+            self.application = app
+            self.options = options
+            super(_Application, self).__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return self.application
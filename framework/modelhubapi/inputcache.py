@@ -0,0 +1,173 @@
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+
+class InputCache(object):
+    """
+    Size-capped LRU cache of downloaded input files.
+
+    Files are stored content-addressed, i.e. named by the SHA-256 digest of
+    their content, so several URLs serving the same content share one file.
+    Each URL is remembered together with the validators (ETag and
+    Last-Modified headers) the server sent, which are used to revalidate
+    the cached file with a conditional GET (see
+    :class:`~modelhubapi.downloads.DownloadManager`). Responses without any
+    validator are not cached.
+
+    Cached files are hard-linked into the request folders, so handing a cached
+    input to a request does not copy it (copying is the fallback if the
+    file system does not support hard links). Models must therefore not modify
+    their input files in place.
+
+    The cached files are kept in the subfolder :attr:`SUBFOLDER` of the
+    given folder, which the cache creates and owns. Files left in the
+    subfolder from earlier runs are removed, the rest of the folder is left
+    alone.
+
+    Args:
+        folder (str): Folder to create the cache's subfolder in.
+        max_bytes (int): Maximum total size of the cached files. The least
+            recently used files are removed if exceeded.
+    """
+
+    SUBFOLDER = "modelhub-input-cache"
+
+    def __init__(self, folder, max_bytes=10*1024**3):
+        self.folder = os.path.join(folder, self.SUBFOLDER)
+        self.max_bytes = max_bytes
+        self._urls = {}
+        self._files = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        shutil.rmtree(self.folder, ignore_errors=True)
+        os.makedirs(self.folder)
+
+
+    def lookup(self, url):
+        """
+        Returns:
+            dict or None:
+                None if url is not cached, otherwise a dictionary with the keys
+                "etag", "last_modified" and "digest" of the cached file.
+        """
+        with self._lock:
+            entry = self._urls.get(url)
+            return dict(entry) if entry is not None else None
+
+
+    def conditional_headers(self, entry):
+        """
+        Returns:
+            dict: Request headers to revalidate the cached entry as returned by
+            :func:`~lookup`.
+        """
+        headers = {}
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+
+    def link(self, entry, file_name):
+        """
+        Hard-links (or copies) the cached file of entry to file_name and marks
+        it as recently used.
+
+        Returns:
+            bool: False if the cached file does not exist anymore.
+        """
+        with self._lock:
+            if entry["digest"] not in self._files:
+                return False
+            self._files[entry["digest"]] = self._files.pop(entry["digest"])
+        try:
+            _link_or_copy(self._path(entry["digest"]), file_name)
+            return True
+        except (IOError, OSError):
+            return False
+
+
+    def store(self, url, file_name, digest, etag=None, last_modified=None):
+        """
+        Adds the downloaded file_name to the cache, unless the server sent no
+        validators or the file is larger than :attr:`max_bytes`.
+
+        Args:
+            url (str): URL the file was downloaded from.
+            file_name (str): Path of the downloaded file.
+            digest (str): Hex SHA-256 digest of the file's content.
+            etag (str or None): ETag header of the response.
+            last_modified (str or None): Last-Modified header of the response.
+
+        Returns:
+            bool: Whether the file was cached.
+        """
+        if not etag and not last_modified:
+            return False
+        size = os.path.getsize(file_name)
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            if digest not in self._files:
+                try:
+                    _link_or_copy(file_name, self._path(digest))
+                except (IOError, OSError):
+                    return False
+                self._files[digest] = size
+                self._size += size
+            self._urls[url] = {"etag": etag,
+                               "last_modified": last_modified,
+                               "digest": digest}
+            self._files[digest] = self._files.pop(digest)
+            self._evict()
+        return True
+
+
+    def discard(self, url):
+        """
+        Forgets url, e.g. because its cached file turned out to be unusable.
+        """
+        with self._lock:
+            self._urls.pop(url, None)
+
+
+    # -------------------------------------------------------------------------
+    # Private helper functions
+    # -------------------------------------------------------------------------
+
+    def _path(self, digest):
+        return os.path.join(self.folder, digest)
+
+
+    def _evict(self):
+        """
+        Removes least recently used files until the cache fits its size
+        limit. Must be called with the lock acquired.
+        """
+        while self._size > self.max_bytes and len(self._files) > 1:
+            digest, size = self._files.popitem(last=False)
+            self._size -= size
+            for url in [url for url, entry in self._urls.items()
+                        if entry["digest"] == digest]:
+                del self._urls[url]
+            try:
+                os.remove(self._path(digest))
+            except OSError:
+                pass
+
+
+
+def _link_or_copy(source, destination):
+    """
+    Hard-links source to destination, or copies it if hard links are not
+    supported (e.g. across file systems).
+    """
+    try:
+        os.link(source, destination)
+    except OSError:
+        if os.path.exists(destination):
+            os.remove(destination)
+        shutil.copyfile(source, destination)
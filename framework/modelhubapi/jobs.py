@@ -0,0 +1,203 @@
+import os
+import time
+import uuid
+import threading
+from collections import deque, OrderedDict
+
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class JobQueueFull(Exception):
+    """
+    Raised by :func:`~JobQueue.submit` if the queue does not accept any more
+    jobs.
+    """
+    pass
+
+
+
+class JobQueue(object):
+    """
+    Interface for queues processing asynchronous prediction jobs.
+
+    A job is described by a JSON-serializable dictionary (the job spec), which
+    the queue hands to its handler once a worker is free. The handler returns
+    the JSON-serializable job result (usually the dictionary returned by
+    :func:`~modelhubapi.pythonapi.ModelHubAPI.predict`). Keeping specs and
+    results JSON-serializable allows implementations that pass jobs through an
+    external broker (e.g. Redis) to workers in other processes.
+
+    Args:
+        handler (callable): Called with the job spec, returns the job result.
+    """
+
+    def __init__(self, handler):
+        self._handler = handler
+
+
+    def submit(self, spec):
+        """
+        Abstract method. Queues a new job.
+
+        Args:
+            spec (dict): JSON-serializable job description passed to the handler.
+
+        Returns:
+            str: Id of the new job.
+
+        Raises:
+            JobQueueFull if the queue does not accept any more jobs.
+        """
+        raise NotImplementedError("This is a method of an abstract class.")
+
+
+    def get(self, job_id):
+        """
+        Abstract method. Returns the state of a job.
+
+        Args:
+            job_id (str): Id as returned by :func:`~submit`.
+
+        Returns:
+            dict or None:
+                None if the job is unknown, otherwise a dictionary with the keys
+                "id", "status", "submitted", "started", "finished" and (once
+                the job is done or failed) "result". The status is one of
+                "queued", "running", "done", "failed" or "cancelled".
+        """
+        raise NotImplementedError("This is a method of an abstract class.")
+
+
+    def cancel(self, job_id):
+        """
+        Abstract method. Cancels a job that has not been started yet.
+
+        Args:
+            job_id (str): Id as returned by :func:`~submit`.
+
+        Returns:
+            dict or None:
+                The job's spec if the job was cancelled, None if the job is
+                unknown or cannot be cancelled anymore.
+        """
+        raise NotImplementedError("This is a method of an abstract class.")
+
+
+
+class InProcessJobQueue(JobQueue):
+    """
+    Job queue processing jobs with a bounded pool of worker threads in the
+    current process.
+
+    Args:
+        handler (callable): Called with the job spec, returns the job result.
+        num_workers (int): Number of worker threads.
+        max_pending (int): Maximum number of queued jobs waiting for a worker.
+        max_finished (int): Number of finished jobs whose results are kept.
+            If exceeded, the oldest finished jobs are forgotten.
+    """
+
+    def __init__(self, handler, num_workers=2, max_pending=64, max_finished=1000):
+        super(InProcessJobQueue, self).__init__(handler)
+        self.num_workers = num_workers
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self._jobs = {}
+        self._pending = deque()
+        self._finished = OrderedDict()
+        self._condition = threading.Condition()
+        self._workers = []
+        self._workers_pid = None
+
+
+    def submit(self, spec):
+        with self._condition:
+            if len(self._pending) >= self.max_pending:
+                raise JobQueueFull("Too many pending jobs, try again later.")
+            self._ensure_workers()
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {"id": job_id,
+                                  "status": QUEUED,
+                                  "submitted": time.time(),
+                                  "started": None,
+                                  "finished": None,
+                                  "spec": spec}
+            self._pending.append(job_id)
+            self._condition.notify()
+        return job_id
+
+
+    def get(self, job_id):
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return dict((key, value) for key, value in job.items()
+                        if key != "spec")
+
+
+    def cancel(self, job_id):
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != QUEUED:
+                return None
+            self._pending.remove(job_id)
+            self._set_finished(job, CANCELLED)
+            return job["spec"]
+
+
+    # -------------------------------------------------------------------------
+    # Private helper functions
+    # -------------------------------------------------------------------------
+
+    def _ensure_workers(self):
+        """
+        Starts the worker threads on first use. Also restarts them in forked
+        child processes, which do not inherit the parent's threads.
+        Must be called with the condition acquired.
+        """
+        if self._workers and self._workers_pid == os.getpid():
+            return
+        self._workers_pid = os.getpid()
+        self._workers = []
+        for _ in range(self.num_workers):
+            worker = threading.Thread(target=self._run)
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                job = self._jobs[self._pending.popleft()]
+                job["status"] = RUNNING
+                job["started"] = time.time()
+            try:
+                result = self._handler(job["spec"])
+                status = FAILED if isinstance(result, dict) and "error" in result else DONE
+            except Exception as e:
+                result = {"error": repr(e)}
+                status = FAILED
+            with self._condition:
+                job["result"] = result
+                self._set_finished(job, status)
+
+
+    def _set_finished(self, job, status):
+        """
+        Must be called with the condition acquired.
+        """
+        job["status"] = status
+        job["finished"] = time.time()
+        self._finished[job["id"]] = True
+        while len(self._finished) > self.max_finished:
+            old_job_id, _ = self._finished.popitem(last=False)
+            del self._jobs[old_job_id]
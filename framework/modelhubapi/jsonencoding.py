@@ -0,0 +1,63 @@
+import json
+import base64
+import numpy
+
+
+#: Encodings for numpy arrays in JSON responses.
+NUMPY_ENCODINGS = ("list", "base64")
+
+
+def encode_array(array, encoding="list"):
+    """
+    Encodes a numpy array as JSON-serializable object.
+
+    Args:
+        array (numpy array): Array to encode.
+        encoding (str): "list" for nested lists, or "base64" for a compact
+            dictionary with the keys "encoding" ("base64"), "dtype" (numpy
+            dtype string including byte order, e.g. "<f4"), "shape" and "data"
+            (base64 of the raw C-ordered buffer). Decode the latter with
+            ``numpy.frombuffer(base64.b64decode(data), dtype).reshape(shape)``.
+            The base64 encoding does not create any Python objects per
+            element. Arrays of Python objects are always encoded as lists.
+
+    Returns:
+        list or dict: The encoded array.
+
+    Raises:
+        ValueError if the encoding is unknown.
+    """
+    if encoding not in NUMPY_ENCODINGS:
+        raise ValueError("Unknown numpy encoding \"%s\", supported encodings are %s."
+                         % (encoding, ", ".join(NUMPY_ENCODINGS)))
+    if encoding == "list" or array.dtype.hasobject:
+        return array.tolist()
+    array = numpy.ascontiguousarray(array)
+    return {"encoding": "base64",
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "data": base64.b64encode(array.data).decode("ascii")}
+
+
+
+class NumpyJSONEncoder(json.JSONEncoder):
+    """
+    JSON encoder which also serializes numpy arrays (see :func:`encode_array`)
+    and numpy scalars (as the corresponding Python numbers), wherever they
+    are nested in the encoded object.
+
+    Args:
+        numpy_encoding (str): Encoding for numpy arrays, "list" or "base64".
+        kwargs: Further arguments of json.JSONEncoder.
+    """
+
+    def __init__(self, numpy_encoding="list", **kwargs):
+        super(NumpyJSONEncoder, self).__init__(**kwargs)
+        self.numpy_encoding = numpy_encoding
+
+    def default(self, o):
+        if isinstance(o, numpy.ndarray):
+            return encode_array(o, self.numpy_encoding)
+        if isinstance(o, numpy.generic):
+            return o.item()
+        return super(NumpyJSONEncoder, self).default(o)
@@ -0,0 +1,162 @@
+import os
+import json
+import hashlib
+import threading
+
+
+class MetadataSnapshot(object):
+    """
+    Immutable snapshot of a model's metadata, i.e. its configuration, legal
+    documents and sample data files, as served by the API.
+
+    Everything requests need is derived once when the snapshot is created:
+    the input schema, descriptors of the outputs, and the JSON encoding of
+    the metadata responses with their ETags. Snapshots must not be
+    modified; to change the metadata, replace the snapshot as a whole.
+
+    Args:
+        config (dict): Parsed model configuration, or a dictionary with the
+            key "error" if it could not be loaded.
+        legal (dict): Legal documents as returned by
+            :func:`~modelhubapi.pythonapi.ModelHubAPI.get_legal`.
+        samples (dict): Sample data as returned by
+            :func:`~modelhubapi.pythonapi.ModelHubAPI.get_samples`.
+        signature: Identifies the state of the files the snapshot was loaded
+            from (see :class:`~MetadataWatcher`).
+    """
+
+    def __init__(self, config, legal, samples, signature=None):
+        self.config = config
+        self.legal = legal
+        self.samples = samples
+        self.signature = signature
+        try:
+            self.model_io = config["model"]["io"] if "error" not in config \
+                else config
+        except (KeyError, TypeError) as e:
+            self.model_io = {"error": "Invalid model configuration: " + repr(e)}
+        inputs = self.model_io.get("input", {})
+        #: Keys every multi input dictionary must have.
+        self.input_keys = tuple(inputs.keys())
+        #: Mime types accepted as input files.
+        self.input_formats = tuple(inputs.get("format", ()))
+        #: Name, type, description and file_format of each output.
+        self.outputs = tuple({"name": output.get("name"),
+                              "type": output.get("type"),
+                              "description": output.get("description", ""),
+                              "file_format": output.get("file_format")}
+                             for output in self.model_io.get("output", []))
+        self.responses = dict((name, _encode(content)) for name, content in
+                              [("config", config), ("legal", legal),
+                               ("model_io", self.model_io)])
+
+
+    def response(self, name):
+        """
+        Args:
+            name (str): "config", "legal" or "model_io".
+
+        Returns:
+            tuple: The JSON encoded content (bytes) and its ETag.
+        """
+        return self.responses[name]
+
+
+
+class MetadataWatcher(object):
+    """
+    Polls the files a metadata snapshot is loaded from, and calls back when
+    they changed.
+
+    Args:
+        signature (callable): Returns a value that changes whenever the
+            metadata files change (e.g. their modification times).
+        on_change (callable): Called with the new signature when it changed.
+        interval (float): Seconds between two polls.
+    """
+
+    def __init__(self, signature, on_change, interval=2.0):
+        self._signature = signature
+        self._on_change = on_change
+        self.interval = interval
+        self._last = signature()
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._thread_pid = None
+
+
+    def start(self):
+        """
+        Starts polling. Also restarts the polling thread in forked child
+        processes, which do not inherit the parent's threads.
+        """
+        with self._lock:
+            if self._stopped.is_set() or \
+                    (self._thread is not None and self._thread_pid == os.getpid()):
+                return
+            self._thread_pid = os.getpid()
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+
+
+    def stop(self):
+        """
+        Stops polling for good.
+        """
+        self._stopped.set()
+
+
+    def poll(self):
+        """
+        Checks the files once, and calls back if they changed since the last
+        check.
+
+        Returns:
+            bool: Whether the files changed.
+        """
+        signature = self._signature()
+        if signature == self._last:
+            return False
+        self._last = signature
+        self._on_change(signature)
+        return True
+
+
+    # -------------------------------------------------------------------------
+    # Private helper functions
+    # -------------------------------------------------------------------------
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print("Reloading the model metadata failed: " + repr(e))
+
+
+
+def files_signature(paths):
+    """
+    Args:
+        paths (list): Paths of files or folders.
+
+    Returns:
+        tuple: Size and modification time of each path, None for missing
+        paths. Changes when a file is modified, or a file is added to or
+        removed from a folder.
+    """
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_size, stat.st_mtime))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def _encode(content):
+    encoded = json.dumps(content, sort_keys=True).encode("utf-8") + b"\n"
+    return encoded, hashlib.sha256(encoded).hexdigest()[:32]
@@ -0,0 +1,116 @@
+import os
+import zlib
+import uuid
+import zipfile
+import threading
+from .fingerprint import model_fingerprint
+
+
+#: Extensions of files which are compressed already and hence stored
+#: uncompressed in the model archive.
+COMPRESSED_EXTENSIONS = (".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".zst",
+                         ".lz4", ".npz", ".pt", ".pth", ".jpg", ".jpeg",
+                         ".png", ".gif", ".webp")
+
+
+class ModelArchive(object):
+    """
+    Zip archive of a model's contrib_src/model folder, as downloaded through
+    the REST API.
+
+    The archive is built once per model version and reused as long as
+    the names, sizes and modification times of the model files do not
+    change (see :func:`~modelhubapi.fingerprint.model_fingerprint`). Files
+    that are compressed already (by extension, or if a sample of a large
+    file does not compress) are stored without compression, so weights are
+    not pointlessly recompressed.
+
+    Args:
+        contrib_src_dir (str): Path to the contrib_src directory of the model.
+        sample_size (int): Bytes compressed on trial to detect incompressible
+            files without a known extension. Files smaller than this are
+            always compressed.
+    """
+
+    def __init__(self, contrib_src_dir, sample_size=1024**2):
+        self.contrib_src_dir = contrib_src_dir
+        self.sample_size = sample_size
+        self._lock = threading.Lock()
+
+
+    def get(self, folder):
+        """
+        Returns the archive of the current model version, and builds it
+        if it does not exist yet.
+
+        Args:
+            folder (str): Folder to store the archive in. Archives of
+                outdated model versions are removed from it.
+
+        Returns:
+            tuple: Path of the archive and its ETag (the model fingerprint).
+        """
+        fingerprint = model_fingerprint(os.path.join(self.contrib_src_dir,
+                                                     "model"))[:32]
+        path = os.path.join(folder, "model-%s.zip" % fingerprint)
+        if not os.path.isfile(path):
+            with self._lock:
+                if not os.path.isfile(path):
+                    self._build(path)
+                    self._remove_outdated(folder, path)
+        return path, fingerprint
+
+
+    # -------------------------------------------------------------------------
+    # Private helper functions
+    # -------------------------------------------------------------------------
+
+    def _build(self, path):
+        """
+        Writes the archive to a temporary file first and renames it then,
+        so concurrent requests (also from other processes) never see an
+        incomplete archive.
+        """
+        temp_path = "%s.%s.tmp" % (path, uuid.uuid4().hex[:8])
+        try:
+            with zipfile.ZipFile(temp_path, "w", zipfile.ZIP_DEFLATED,
+                                 allowZip64=True) as archive:
+                for root, dirs, files in os.walk(os.path.join(self.contrib_src_dir,
+                                                              "model")):
+                    dirs.sort()
+                    archive.write(root, self._archive_name(root))
+                    for name in sorted(files):
+                        file_path = os.path.join(root, name)
+                        compress_type = zipfile.ZIP_STORED \
+                            if self._is_compressed(file_path) \
+                            else zipfile.ZIP_DEFLATED
+                        archive.write(file_path, self._archive_name(file_path),
+                                      compress_type)
+            os.rename(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+    def _archive_name(self, path):
+        return os.path.relpath(path, self.contrib_src_dir).replace(os.sep, "/")
+
+
+    def _is_compressed(self, file_path):
+        if file_path.lower().endswith(COMPRESSED_EXTENSIONS):
+            return True
+        if os.path.getsize(file_path) < self.sample_size:
+            return False
+        with open(file_path, "rb") as f:
+            sample = f.read(self.sample_size)
+        return len(zlib.compress(sample, 1)) > 0.9 * len(sample)
+
+
+    def _remove_outdated(self, folder, path):
+        for name in os.listdir(folder):
+            if name.startswith("model-") and name.endswith(".zip") and \
+                    os.path.join(folder, name) != path:
+                try:
+                    os.remove(os.path.join(folder, name))
+                except OSError:
+                    pass
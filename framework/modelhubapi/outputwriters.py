@@ -0,0 +1,145 @@
+import numpy
+import h5py
+import six
+
+
+class OutputWriter(object):
+    """
+    Abstract base class for writers saving numpy outputs of a prediction
+    to files, which clients download through the REST API.
+    """
+
+    #: File extension of the written files, including the leading dot.
+    extension = None
+
+    def write(self, output, name, path):
+        """
+        Abstract method. Writes output to path.
+
+        Args:
+            output (numpy array): Output to write.
+            name (str): Name of the output as defined in the model
+                configuration.
+            path (str): Path of the file to write, ends with :attr:`extension`.
+        """
+        raise NotImplementedError("This is a method of an abstract class.")
+
+
+
+class H5OutputWriter(OutputWriter):
+    """
+    Writes the output as dataset named after the output into an HDF5 file. The
+    dataset's attribute "type" holds the output's dtype.
+
+    Args:
+        compression (str or None): "gzip", "lzf" or None for no compression.
+        compression_level (int or None): Level for gzip compression (0-9).
+        chunks (bool or tuple): Chunk shape of the dataset, True to let h5py
+            guess it, or None to store the dataset contiguously. Compressed
+            datasets are always chunked.
+    """
+
+    extension = ".h5"
+
+    def __init__(self, compression=None, compression_level=None, chunks=None):
+        self.compression = compression
+        self.compression_level = compression_level
+        self.chunks = chunks
+
+    def write(self, output, name, path):
+        # scalars cannot be chunked nor compressed
+        options = {}
+        if output.ndim > 0:
+            options = {"compression": self.compression,
+                       "compression_opts": self.compression_level,
+                       "chunks": self.chunks}
+            if self.compression is not None and self.chunks is None:
+                options["chunks"] = True
+        h5f = h5py.File(path, 'w')
+        try:
+            dataset = h5f.create_dataset(name, data=output, **options)
+            dataset.attrs["type"] = numpy.string_(str(output.dtype))
+        finally:
+            h5f.close()
+
+
+
+class NpyOutputWriter(OutputWriter):
+    """
+    Writes the output uncompressed in numpy's .npy format.
+    """
+
+    extension = ".npy"
+
+    def write(self, output, name, path):
+        numpy.save(path, output, allow_pickle=False)
+
+
+
+class NpzOutputWriter(OutputWriter):
+    """
+    Writes the output as array named after the output into a numpy .npz
+    archive.
+
+    Args:
+        compressed (bool): Whether to compress the archive (deflate).
+    """
+
+    extension = ".npz"
+
+    def __init__(self, compressed=True):
+        self.compressed = compressed
+
+    def write(self, output, name, path):
+        save = numpy.savez_compressed if self.compressed else numpy.savez
+        with open(path, "wb") as f:
+            save(f, **{name: output})
+
+
+
+#: Output formats selectable by name in the model configuration or per request.
+OUTPUT_FORMATS = {
+    "h5": lambda: H5OutputWriter(),
+    "h5-gzip": lambda: H5OutputWriter(compression="gzip", compression_level=4),
+    "h5-lzf": lambda: H5OutputWriter(compression="lzf"),
+    "npy": lambda: NpyOutputWriter(),
+    "npz": lambda: NpzOutputWriter(compressed=True),
+}
+
+DEFAULT_OUTPUT_FORMAT = "h5"
+
+
+def get_output_writer(output_format=None):
+    """
+    Creates the writer for an output format.
+
+    Args:
+        output_format (str, dict or None): Name of one of the
+            :data:`OUTPUT_FORMATS`, or a dictionary with the format's name
+            under "format" and further arguments of the format's writer
+            (e.g. ``{"format": "h5", "compression": "gzip", "chunks": [1, 256, 256]}``).
+            None selects the default format (uncompressed h5).
+
+    Returns:
+        OutputWriter: Writer for the format.
+
+    Raises:
+        ValueError if the format is unknown or its arguments are invalid.
+    """
+    if output_format is None:
+        output_format = DEFAULT_OUTPUT_FORMAT
+    options = {}
+    if isinstance(output_format, dict):
+        options = dict(output_format)
+        output_format = options.pop("format", DEFAULT_OUTPUT_FORMAT)
+    if not isinstance(output_format, six.string_types) or \
+            output_format.lower() not in OUTPUT_FORMATS:
+        raise ValueError("Unknown output format \"%s\", supported formats are %s."
+                         % (output_format, ", ".join(sorted(OUTPUT_FORMATS))))
+    writer = OUTPUT_FORMATS[output_format.lower()]()
+    for key, value in options.items():
+        if key not in vars(writer):
+            raise ValueError("Output format \"%s\" has no option \"%s\"."
+                             % (output_format, key))
+        setattr(writer, key, tuple(value) if isinstance(value, list) else value)
+    return writer
@@ -0,0 +1,278 @@
+import os
+import re
+import sys
+import time
+import uuid
+import pstats
+import cProfile
+import tempfile
+import threading
+
+
+#: Functions whose cumulative time is reported per stage, as pairs of file
+#: name and function name.
+STAGE_FUNCTIONS = {"load": [("processor.py", "_load")],
+                   "convert": [("processor.py", "_convertToNumpy")],
+                   "infer": [("pythonapi.py", "_infer")],
+                   "serialize": [("pythonapi.py", "_format_output"),
+                                 ("restapi.py", "_jsonify")]}
+
+PROFILE_FORMATS = {"pstats": ".pstats", "collapsed": ".collapsed"}
+
+_PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class ProfilerBusy(Exception):
+    """
+    Raised if a profile is requested while another one is recorded.
+    """
+    pass
+
+
+
+class ProfileStore(object):
+    """
+    Runs single calls under cProfile's deterministic profiler and keeps the
+    resulting profiles for download, both as pstats file (for
+    ``python -m pstats``, snakeviz and the like) and as collapsed stacks (for
+    flamegraph.pl, speedscope and the like).
+
+    Only one call is profiled at a time, since profiling slows it down
+    considerably. Only the calling thread is profiled, so work done by
+    other threads (e.g. batched inference) does not show up.
+
+    Args:
+        folder (str or None): Folder to keep the profiles in. A temporary
+            folder is created on first use if None.
+        max_profiles (int): Number of profiles kept, older ones are removed.
+        top (int): Number of hot functions listed in a profile's summary.
+    """
+
+    def __init__(self, folder=None, max_profiles=20, top=20):
+        self.folder = folder
+        self.max_profiles = max_profiles
+        self.top = top
+        self._ids = []
+        self._lock = threading.Lock()
+
+
+    def run(self, func, *args, **kwargs):
+        """
+        Calls func with the given arguments under the profiler and saves the
+        profile.
+
+        Returns:
+            tuple: The result of func and the profile's summary, a dict with
+            the profile "id", the profiled "total_s" seconds, the cumulative
+            seconds spent in each of the STAGE_FUNCTIONS as "stages", and the
+            functions with the most own time as "hot_functions".
+
+        Raises:
+            ProfilerBusy if another call is being profiled.
+        """
+        if not self._lock.acquire(False):
+            raise ProfilerBusy("Another request is being profiled.")
+        try:
+            profiler = cProfile.Profile()
+            result = profiler.runcall(func, *args, **kwargs)
+            stats = pstats.Stats(profiler)
+            profile_id = uuid.uuid4().hex
+            self._save(profile_id, stats)
+            return result, self._summarize(profile_id, stats)
+        finally:
+            self._lock.release()
+
+
+    def path(self, profile_id, format="pstats"):
+        """
+        Returns:
+            str or None: Path of the profile's file in the given format
+            ("pstats" or "collapsed"), None if there is no such profile.
+        """
+        if not _PROFILE_ID.match(str(profile_id)) or format not in PROFILE_FORMATS \
+                or self.folder is None:
+            return None
+        path = os.path.join(self.folder, profile_id + PROFILE_FORMATS[format])
+        return path if os.path.isfile(path) else None
+
+
+    # -------------------------------------------------------------------------
+    # Private helper functions
+    # -------------------------------------------------------------------------
+
+    def _save(self, profile_id, stats):
+        if self.folder is None:
+            self.folder = tempfile.mkdtemp(prefix="modelhub-profiles-")
+        elif not os.path.isdir(self.folder):
+            os.makedirs(self.folder)
+        stats.dump_stats(os.path.join(self.folder, profile_id + ".pstats"))
+        with open(os.path.join(self.folder, profile_id + ".collapsed"), "w") as f:
+            for stack, microseconds in sorted(collapsed_stacks(stats).items()):
+                f.write("%s %d\n" % (stack, microseconds))
+        self._ids.append(profile_id)
+        while len(self._ids) > self.max_profiles:
+            old_id = self._ids.pop(0)
+            for extension in PROFILE_FORMATS.values():
+                try:
+                    os.remove(os.path.join(self.folder, old_id + extension))
+                except OSError:
+                    pass
+
+
+    def _summarize(self, profile_id, stats):
+        stages = {}
+        for stage, functions in STAGE_FUNCTIONS.items():
+            stages[stage] = round(sum((entry[3] for func, entry in stats.stats.items()
+                                       if (os.path.basename(func[0]), func[2]) in functions),
+                                      0.0), 6)
+        hot = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)
+        return {"id": profile_id,
+                "total_s": round(stats.total_tt, 6),
+                "stages": stages,
+                "hot_functions": [{"function": _label(func),
+                                   "calls": entry[1],
+                                   "own_s": round(entry[2], 6),
+                                   "cumulative_s": round(entry[3], 6)}
+                                  for func, entry in hot[:self.top]]}
+
+
+
+class StackSampler(object):
+    """
+    Statistical profiler sampling the stacks of all threads of the process
+    at a fixed interval, e.g. to see where the time goes under production
+    traffic without restarting the server. Unlike
+    :class:`ProfileStore` this does not slow down the sampled threads; the
+    cost is one walk of all stacks per interval.
+
+    Stacks are aggregated into collapsed stacks rooted at the thread's name.
+    Threads waiting (for locks, sockets or new requests) are sampled as
+    well, which shows contention, but also means idle threads make up many
+    samples; filter by thread name to focus on request threads.
+
+    Args:
+        interval (float): Seconds between two samples.
+        max_seconds (float): Maximum sampling duration per call.
+        max_depth (int): Maximum number of frames per stack, the outermost
+            frames are dropped from deeper stacks.
+        min_interval (float): Shorter intervals requested per call are
+            raised to this, so sampling cannot keep a core busy.
+    """
+
+    def __init__(self, interval=0.01, max_seconds=60, max_depth=128, min_interval=0.001):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.max_depth = max_depth
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+
+
+    def sample(self, seconds, interval=None):
+        """
+        Samples the stacks of all threads except the calling one for the
+        given number of seconds (at most :attr:`max_seconds`), every
+        interval seconds (defaults to :attr:`interval`, at least
+        :attr:`min_interval`).
+
+        Returns:
+            dict: Number of samples keyed by collapsed stack.
+
+        Raises:
+            ValueError if seconds or interval is not a positive finite number.
+            ProfilerBusy if another call is sampling.
+        """
+        interval = interval or self.interval
+        # comparisons with nan are false, so this rejects it as well
+        if not 0 < seconds < float("inf") or not 0 < interval < float("inf"):
+            raise ValueError("seconds and interval must be positive finite numbers.")
+        interval = max(interval, self.min_interval)
+        if not self._lock.acquire(False):
+            raise ProfilerBusy("Another request is sampling stacks.")
+        try:
+            own_id = threading.current_thread().ident
+            end = time.time() + min(seconds, self.max_seconds)
+            stacks = {}
+            codes = {}
+            while True:
+                names = dict((thread.ident, thread.name) for thread in threading.enumerate())
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_id:
+                        continue
+                    labels = []
+                    while frame is not None and len(labels) < self.max_depth:
+                        code = frame.f_code
+                        label = codes.get(code)
+                        if label is None:
+                            label = codes[code] = _label((code.co_filename,
+                                                          code.co_firstlineno,
+                                                          code.co_name))
+                        labels.append(label)
+                        frame = frame.f_back
+                    labels.append(names.get(thread_id, "thread-%d" % thread_id).replace(";", ","))
+                    key = ";".join(reversed(labels))
+                    stacks[key] = stacks.get(key, 0) + 1
+                frame = None
+                if time.time() + interval > end:
+                    return stacks
+                time.sleep(interval)
+        finally:
+            self._lock.release()
+
+
+
+def collapsed_stacks(stats, max_depth=64, min_fraction=1e-4):
+    """
+    Builds collapsed stacks ("root;caller;callee microseconds" per line in
+    flame graph tools) from a deterministic profile.
+
+    Deterministic profiles only record caller-callee pairs, not full stacks.
+    A function's time is therefore split between the stacks it is reached by
+    in proportion to the time of each calling pair. Stacks with less than
+    min_fraction of the total time are dropped.
+
+    Args:
+        stats (pstats.Stats): The profile.
+        max_depth (int): Maximum stack depth.
+        min_fraction (float): Fraction of the total time below which stacks
+            are dropped.
+
+    Returns:
+        dict: Microseconds of own time keyed by collapsed stack.
+    """
+    callees = {}
+    roots = []
+    for func, (_, _, _, cumulative, callers) in stats.stats.items():
+        if not callers:
+            roots.append((func, cumulative))
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+    min_time = max(stats.total_tt * min_fraction, 1e-6)
+    stacks = {}
+
+    def walk(func, time, stack, labels):
+        entry = stats.stats[func]
+        fraction = time / entry[3] if entry[3] > 0 else 0.0
+        labels = labels + [_label(func)]
+        stack = stack | {func}
+        own = entry[2] * fraction
+        if own >= 1e-6:
+            key = ";".join(labels)
+            stacks[key] = stacks.get(key, 0) + int(round(own * 1e6))
+        if len(labels) >= max_depth:
+            return
+        for callee, callee_time in callees.get(func, []):
+            callee_time *= fraction
+            if callee not in stack and callee_time >= min_time:
+                walk(callee, callee_time, stack, labels)
+
+    for func, cumulative in roots:
+        if cumulative >= min_time:
+            walk(func, cumulative, frozenset(), [])
+    return stacks
+
+
+def _label(func):
+    filename, line, name = func
+    if filename == "~":
+        return name.replace(";", ",")
+    return ("%s (%s:%d)" % (name, os.path.basename(filename), line)).replace(";", ",")
@@ -1,10 +1,43 @@
 import os
 import io
+import copy
 import json
 import time
+import uuid
+import hashlib
 from datetime import datetime
+import six
 import numpy
-import h5py
+from .batching import BatchScheduler
+from .resultcache import ResultCache
+from .singleflight import SingleFlight
+from .fingerprint import input_digest, model_fingerprint
+from .outputwriters import get_output_writer
+from .retention import OutputRetention
+from .jsonencoding import encode_array
+from .metadata import MetadataSnapshot, MetadataWatcher, files_signature
+from modelhublib import metrics
+
+
+_stageSeconds = metrics.registry.histogram(
+    "modelhub_predict_stage_seconds",
+    "Time spent in the stages of ModelHubAPI.predict: \"unpack\" (reading "
+    "multi input json files), \"cache_lookup\", \"inference\", "
+    "\"format_output\" (including \"write_output\", the saving of numpy "
+    "outputs to files) and \"cache_store\".",
+    ("stage",))
+_predictions = metrics.registry.counter(
+    "modelhub_predictions_total",
+    "Calls of ModelHubAPI.predict, by outcome: \"success\", \"cached\" "
+    "(returned from the result cache) or \"error\".",
+    ("outcome",))
+_inFlight = metrics.registry.gauge(
+    "modelhub_predictions_in_flight",
+    "Calls of ModelHubAPI.predict in progress.")
+_outputBytes = metrics.registry.counter(
+    "modelhub_output_bytes_total",
+    "Bytes of numpy outputs saved to the output folder, by file format.",
+    ("format",))
 
 class ModelHubAPI:
     """
@@ -17,6 +50,173 @@ class ModelHubAPI:
         self.contrib_src_dir = contrib_src_dir
         this_dir = os.path.dirname(os.path.realpath(__file__))
         self.framework_dir = os.path.normpath(os.path.join(this_dir, ".."))
+        self.batch_scheduler = None
+        self.result_cache = None
+        self.single_flight = None
+        self.output_retention = None
+        self.metadata_watcher = None
+        self.warm_up_report = None
+        self._warming_up = False
+        self._model_fingerprint = None
+        self.reload_metadata()
+
+
+    def enable_batching(self, max_batch_size=8, max_wait_ms=10):
+        """
+        Gathers concurrent calls of :func:`~predict` into batches, which are run
+        through the model's
+        :func:`~modelhublib.model.ModelBase.infer_batch` method. Only useful if
+        predict is called from several threads (e.g. by the REST API) and the
+        model implements infer_batch efficiently.
+
+        Args:
+            max_batch_size (int): Maximum number of inputs in one batch.
+            max_wait_ms (float): Maximum time in milliseconds to wait for
+                further requests before an incomplete batch is run.
+        """
+        self.batch_scheduler = BatchScheduler(self.model, max_batch_size,
+                                              max_wait_ms)
+
+
+    def disable_batching(self):
+        """
+        Runs each call of :func:`~predict` directly through the model's
+        :func:`~modelhublib.model.ModelBase.infer` method again (default).
+        """
+        self.batch_scheduler = None
+
+
+    def enable_result_cache(self, max_memory_bytes=64*1024**2, disk_folder=None,
+                            max_disk_bytes=1024**3):
+        """
+        Caches prediction results, so that :func:`~predict` returns the stored
+        result for inputs it has seen before instead of running inference
+        again. Results are keyed by the content of the input file(s), the
+        model id and a fingerprint of the files in contrib_src, which is taken
+        when this is called. See :class:`~modelhubapi.resultcache.ResultCache`
+        for the arguments.
+        """
+        self._model_fingerprint = model_fingerprint(self.contrib_src_dir)
+        self.result_cache = ResultCache(max_memory_bytes, disk_folder,
+                                        max_disk_bytes)
+
+
+    def disable_result_cache(self):
+        """
+        Runs the inference on every call of :func:`~predict` again (default).
+        """
+        self.result_cache = None
+
+
+    def enable_request_coalescing(self):
+        """
+        Deduplicates concurrent calls of :func:`~predict` with identical
+        inputs (same content, see :func:`~enable_result_cache`): only one of
+        them runs the inference, the others wait for it and return its result.
+        Only useful if predict is called from several threads (e.g. by the
+        REST API).
+        """
+        self._model_fingerprint = model_fingerprint(self.contrib_src_dir)
+        self.single_flight = SingleFlight()
+
+
+    def disable_request_coalescing(self):
+        """
+        Runs the inference for each call of :func:`~predict` again (default).
+        """
+        self.single_flight = None
+
+
+    def enable_output_retention(self, max_bytes=None, ttl=None, interval=60):
+        """
+        Removes output files from :attr:`output_folder` in the background once
+        they exceed a total size or have not been accessed for some time.
+        See :class:`~modelhubapi.retention.OutputRetention` for the arguments.
+        Enable this after setting the output folder.
+        """
+        self.disable_output_retention()
+        self.output_retention = OutputRetention(self.output_folder, max_bytes,
+                                                ttl, interval)
+        self.output_retention.start()
+
+
+    def disable_output_retention(self):
+        """
+        Keeps all output files forever again (default).
+        """
+        if self.output_retention is not None:
+            self.output_retention.stop()
+        self.output_retention = None
+
+
+    def enable_metadata_reload(self, interval=2.0):
+        """
+        Watches the files the metadata is loaded from (configuration,
+        licenses and sample data) and swaps in a new :attr:`metadata`
+        snapshot when they change. Otherwise the metadata is loaded only
+        once on construction.
+
+        Args:
+            interval (float): Seconds between two checks of the files.
+        """
+        self.disable_metadata_reload()
+        self.metadata_watcher = MetadataWatcher(self._metadata_signature,
+                                                self.reload_metadata, interval)
+        self.metadata_watcher.start()
+
+
+    def disable_metadata_reload(self):
+        """
+        Stops watching the metadata files (default).
+        """
+        if self.metadata_watcher is not None:
+            self.metadata_watcher.stop()
+        self.metadata_watcher = None
+
+
+    def reload_metadata(self, signature=None):
+        """
+        Loads the metadata files again and replaces :attr:`metadata` by the
+        new snapshot. Requests in progress keep using the old one.
+
+        Args:
+            signature: Signature of the metadata files as returned by
+                :func:`~modelhubapi.metadata.files_signature`, computed
+                before the files are read if None.
+        """
+        if signature is None:
+            signature = self._metadata_signature()
+        contrib_license_dir = self.contrib_src_dir + "/license"
+        legal = self._load_txt_as_dict(self.framework_dir + "/LICENSE", "modelhub_license")
+        legal.update(self._load_txt_as_dict(self.framework_dir + "/NOTICE", "modelhub_acknowledgements"))
+        legal.update(self._load_txt_as_dict(contrib_license_dir + "/model", "model_license"))
+        legal.update(self._load_txt_as_dict(contrib_license_dir + "/sample_data", "sample_data_license"))
+        try:
+            sample_data_dir = self.contrib_src_dir + "/sample_data"
+            _, _, sample_files = next(os.walk(sample_data_dir))
+            samples = {"folder": sample_data_dir,
+                       "files": sample_files}
+        except Exception as e:
+            samples = {'error': repr(e)}
+        config = self._load_json(self.contrib_src_dir + "/model/config.json")
+        self.metadata = MetadataSnapshot(config, legal, samples, signature)
+
+
+    def after_fork(self):
+        """
+        Call this in a process forked from the one that created this API
+        (e.g. a server's worker process). Replaces the metadata watcher and
+        the output retention, whose threads do not survive the fork, by
+        fresh instances. Other background threads are restarted on first use.
+        """
+        metadata_watcher = self.metadata_watcher
+        if metadata_watcher is not None:
+            self.enable_metadata_reload(metadata_watcher.interval)
+        output_retention = self.output_retention
+        if output_retention is not None:
+            self.enable_output_retention(output_retention.max_bytes,
+                                         output_retention.ttl,
+                                         output_retention.interval)
 
 
     def get_config(self):
@@ -24,8 +224,7 @@ class ModelHubAPI:
         Returns:
             dict: Model configuration.
         """
-        config_file_path = self.contrib_src_dir + "/model/config.json"
-        return self._load_json(config_file_path)
+        return copy.deepcopy(self.metadata.config)
 
 
     def get_legal(self):
@@ -42,12 +241,7 @@ class ModelHubAPI:
                 - model_license
                 - sample_data_license
         """
-        contrib_license_dir = self.contrib_src_dir + "/license"
-        legal = self._load_txt_as_dict(self.framework_dir + "/LICENSE", "modelhub_license")
-        legal.update(self._load_txt_as_dict(self.framework_dir + "/NOTICE", "modelhub_acknowledgements"))
-        legal.update(self._load_txt_as_dict(contrib_license_dir + "/model", "model_license"))
-        legal.update(self._load_txt_as_dict(contrib_license_dir + "/sample_data", "sample_data_license"))
-        return legal
+        return copy.deepcopy(self.metadata.legal)
 
 
     def get_model_io(self):
@@ -58,12 +252,7 @@ class ModelHubAPI:
                 Convenience function, as this is a subset of what
                 :func:`~get_config` returns
         """
-        config_file_path = self.contrib_src_dir + "/model/config.json"
-        config = self._load_json(config_file_path)
-        if "error" in config:
-            return config
-        else:
-            return config["model"]["io"]
+        return copy.deepcopy(self.metadata.model_io)
 
 
     def get_samples(self):
@@ -76,31 +265,47 @@ class ModelHubAPI:
                 contains a list of all file names in that folder. Join these
                 together to get the full path to the sample files.
         """
-        try:
-            sample_data_dir = self.contrib_src_dir + "/sample_data"
-            _, _, sample_files = next(os.walk(sample_data_dir))
-            return  {"folder": sample_data_dir,
-                     "files": sample_files}
-        except Exception as e:
-            return {'error': repr(e)}
+        return copy.deepcopy(self.metadata.samples)
 
 
-    def predict(self, input_file_path, numpyToFile=True, url_root=""):
+    def predict(self, input_file_path, numpyToFile=True, url_root="",
+                output_format=None, numpy_encoding="list"):
         """
         Preforms the model's inference on the given input.
 
         Args:
-            input_file_path (str or dict): Path to input file to run inference on.
-                Either a direct input file or a json containing paths to all
-                input files needed for the model to predict. The appropriate
-                structure for the json can be found in the documentation.
-                If used directly, you can also pass a dict with the keys.
+            input_file_path (str, dict or file-like): Path to input file to run
+                inference on. Either a direct input file or a json containing
+                paths to all input files needed for the model to predict. The
+                appropriate structure for the json can be found in the
+                documentation. If used directly, you can also pass a dict with
+                the keys. A single input can also be passed in memory as a
+                file-like object (e.g. io.BytesIO), which is handed to the
+                model's infer method unchanged. Only do this if the model
+                loads its input through the modelhublib image loaders.
             numpyToFile (bool): Only effective if prediction is a numpy array.
                 Indicates if numpy outputs should be saved and a path to it is
-                returned. If false, a json-serializable list representation of
-                the numpy array is returned instead. List representations is
-                very slow with large numpy arrays.
+                returned. If false, a json-serializable representation of
+                the numpy array is returned instead (see numpy_encoding).
             url_root (str): Url root added by the rest api.
+            output_format (str, dict or None): File format for saving numpy
+                outputs (see
+                :func:`~modelhubapi.outputwriters.get_output_writer`), e.g.
+                "h5", "h5-gzip", "h5-lzf", "npy" or "npz". Applies to all
+                outputs. If None, each output is saved in the format given
+                by "file_format" in its model configuration, or as
+                uncompressed h5 if not configured.
+            numpy_encoding (str): Representation of numpy outputs if
+                numpyToFile is false. "list" returns nested lists, which is
+                very slow with large numpy arrays. "base64" returns the raw
+                buffer base64 encoded together with dtype and shape (see
+                :func:`~modelhubapi.jsonencoding.encode_array`).
+
+        If the result cache is enabled (see :func:`~enable_result_cache`),
+        the stored result is returned for inputs seen before, without
+        running the inference. If request coalescing is enabled (see
+        :func:`~enable_request_coalescing`), concurrent calls with identical
+        inputs share a single inference.
 
         Returns:
             dict, list, or numpy array:
@@ -109,27 +314,44 @@ class ModelHubAPI:
                 In case of an error, returns a dictionary
                 with error info.
         """
+        _inFlight.inc()
         try:
-            config = self.get_config()
+            metadata = self.metadata
+            config = metadata.config
             start = time.time()
-            input = self._unpack_inputs(input_file_path)
-            output = self.model.infer(input)
-            output = self._correct_output_list_wrapping(output, config)
+            numpy_output = "file" if numpyToFile else numpy_encoding
+            with _stageSeconds.time(stage="unpack"):
+                input = self._unpack_inputs(input_file_path)
+            result_cache = self.result_cache
+            single_flight = self.single_flight
+            key = None
+            cached = None
+            if result_cache is not None or single_flight is not None:
+                key = self._prediction_key(input, config, numpy_output,
+                                           output_format)
+            if result_cache is not None and key:
+                with _stageSeconds.time(stage="cache_lookup"):
+                    cached = result_cache.get(key)
+            if cached is not None:
+                output_list, files = cached
+                self._touch_outputs(output_list, files)
+            elif single_flight is not None and key:
+                output_list, files = single_flight.do(
+                    key, lambda: self._run_inference(input, metadata,
+                                                     numpy_output,
+                                                     output_format, key))
+            else:
+                output_list, files = self._run_inference(input, metadata,
+                                                         numpy_output,
+                                                         output_format, key)
             end = time.time()
-            output_list = []
-            for i, o in enumerate(output):
-                name = config["model"]["io"]["output"][i]["name"]
-                shape = list(o.shape) if isinstance(o, numpy.ndarray) else [len(o)]
-                if isinstance(o, numpy.ndarray):
-                    o = url_root + "api" + self._save_output(o, name) if numpyToFile else o.tolist()
-                output_list.append({
-                    'prediction': o,
-                    'shape': shape,
-                    'type': config["model"]["io"]["output"][i]["type"],
-                    'name': name,
-                    'description': config["model"]["io"]["output"][i]["description"]
-                    if "description" in config["model"]["io"]["output"][i].keys() else ""
-                })
+            _predictions.inc(outcome="success" if cached is None else "cached")
+            # results may be shared with coalesced calls, so never modify them
+            output_list = list(output_list)
+            for i in files:
+                output_list[i] = dict(output_list[i])
+                output_list[i]["prediction"] = url_root + "api" + \
+                    output_list[i]["prediction"]
             return {'output': output_list,
                     'timestamp': datetime.now().strftime("%Y-%m-%d-%H-%M-%S-%f"),
                     'processing_time': round(end-start, 3),
@@ -140,23 +362,195 @@ class ModelHubAPI:
                     }
         except Exception as e:
             print(e)
+            _predictions.inc(outcome="error")
             return {'error': repr(e)}
+        finally:
+            _inFlight.dec()
+
+
+    def warm_up(self, inputs=None, runs=2):
+        """
+        Runs the model's inference on some inputs, so that lazy
+        initialization of the model's framework, compilation on first call
+        and loading files into the disk cache do not slow down the first
+        real requests. :func:`~get_status` reports the API as not ready
+        while this runs. Inputs the model fails on are skipped.
+
+        Args:
+            inputs (list or None): Inputs as accepted by :func:`~predict`
+                (file paths, multi input json files or dicts, in-memory
+                files). Defaults to all files in contrib_src/sample_data.
+            runs (int): Number of inferences per input. The first inference
+                overall is the cold one, all others are warm.
+
+        Returns:
+            dict:
+                The warm-up report, also kept as :attr:`warm_up_report`, with
+                the number of "inputs" and "failed" inputs, the latency of the
+                first inference as "cold_ms" and the median latency of all
+                other inferences as "warm_ms" (None if there were none).
+        """
+        self._warming_up = True
+        try:
+            if inputs is None:
+                samples = self.metadata.samples
+                inputs = [os.path.join(samples["folder"], name)
+                          for name in sorted(samples.get("files", []))]
+            latencies = []
+            failed = 0
+            for input in inputs:
+                for _ in range(runs):
+                    start = time.time()
+                    try:
+                        self._infer(self._unpack_inputs(input))
+                    except Exception as e:
+                        print("Warm-up inference on %s failed: %r" % (input, e))
+                        failed += 1
+                        break
+                    latencies.append(time.time() - start)
+            warm = sorted(latencies[1:])
+            report = {"inputs": len(inputs),
+                      "failed": failed,
+                      "cold_ms": round(1000 * latencies[0], 1) if latencies else None,
+                      "warm_ms": round(1000 * warm[len(warm) // 2], 1) if warm else None}
+            print("Warm-up on %d inputs (%d failed): cold %s ms, warm %s ms"
+                  % (report["inputs"], report["failed"], report["cold_ms"],
+                     report["warm_ms"]))
+            self.warm_up_report = report
+            return report
+        finally:
+            self._warming_up = False
+
+
+    def get_status(self):
+        """
+        Returns:
+            dict:
+                The API's readiness to serve predictions, with the key "ready"
+                (bool) and "status", which is "ready", "warming_up" while
+                :func:`~warm_up` runs, or "error" if the model configuration
+                cannot be loaded (the error is under "error" then). The
+                report of the last warm-up is under "warm_up".
+        """
+        status = {"ready": False, "warm_up": self.warm_up_report}
+        config = self.metadata.config
+        if "error" in config:
+            status.update({"status": "error", "error": config["error"]})
+        elif self._warming_up:
+            status["status"] = "warming_up"
+        else:
+            status.update({"status": "ready", "ready": True})
+        return status
 
 
     # -------------------------------------------------------------------------
     # Private helper functions
     # -------------------------------------------------------------------------
 
+    def _infer(self, input):
+        """
+        Runs the inference either directly or through the batch scheduler,
+        if batching is enabled.
+        """
+        batch_scheduler = self.batch_scheduler
+        if batch_scheduler is None:
+            return self.model.infer(input)
+        return batch_scheduler.infer(input)
+
+
+    def _run_inference(self, input, metadata, numpy_output, output_format,
+                       key):
+        """
+        Runs the inference and returns the output list and file output
+        indices built by :func:`~_format_output`. Stores the result in the
+        result cache under key, if enabled.
+        """
+        with _stageSeconds.time(stage="inference"):
+            output = self._infer(input)
+        with _stageSeconds.time(stage="format_output"):
+            output = self._correct_output_list_wrapping(output, metadata.config)
+            output_list, files = self._format_output(output, metadata,
+                                                     numpy_output, output_format)
+        result_cache = self.result_cache
+        if result_cache is not None and key:
+            with _stageSeconds.time(stage="cache_store"):
+                result_cache.put(key, output_list, files)
+        return output_list, files
+
+
+    def _format_output(self, output, metadata, numpy_output="file",
+                       output_format=None):
+        """
+        Builds the output list returned by :func:`~predict`. Numpy outputs are
+        saved to the output folder if numpy_output is "file", their
+        predictions are the saved files' paths without url root then.
+        Otherwise numpy_output is the encoding for
+        :func:`~modelhubapi.jsonencoding.encode_array`. Returns the output
+        list and the indices of the file outputs.
+        """
+        output_list = []
+        files = []
+        for i, o in enumerate(output):
+            descriptor = metadata.outputs[i]
+            name = descriptor["name"]
+            shape = list(o.shape) if isinstance(o, numpy.ndarray) else [len(o)]
+            if isinstance(o, numpy.ndarray):
+                if numpy_output == "file":
+                    file_format = output_format if output_format is not None \
+                        else descriptor["file_format"]
+                    o = self._save_output(o, name, get_output_writer(file_format))
+                    files.append(i)
+                else:
+                    o = encode_array(o, numpy_output)
+            output_list.append({
+                'prediction': o,
+                'shape': shape,
+                'type': descriptor["type"],
+                'name': name,
+                'description': descriptor["description"]
+            })
+        return output_list, files
+
+
+    def _prediction_key(self, input, config, numpy_output, output_format=None):
+        """
+        Returns the key identifying the input's result in the result cache
+        and among coalesced requests, or None if the input cannot be hashed
+        (e.g. a missing file). Then the result is neither cached nor shared.
+        """
+        try:
+            key = "%s-%s-%s-%s" % (config["id"], self._model_fingerprint[:16],
+                                   input_digest(input), numpy_output)
+            if output_format is not None:
+                format_digest = hashlib.sha256(json.dumps(
+                    output_format, sort_keys=True).encode("utf-8"))
+                key += "-" + format_digest.hexdigest()[:16]
+            return key
+        except Exception:
+            return None
+
+
+    def _metadata_signature(self):
+        return files_signature([self.contrib_src_dir + "/model/config.json",
+                                self.contrib_src_dir + "/license/model",
+                                self.contrib_src_dir + "/license/sample_data",
+                                self.contrib_src_dir + "/sample_data",
+                                self.framework_dir + "/LICENSE",
+                                self.framework_dir + "/NOTICE"])
+
+
     def _unpack_inputs(self, file_path):
         """
         This utility function returns a dictionary with the inputs if a
         json file with multiple input files is specified, otherwise it just
-        returns the file_path unchanged for single inputs
+        returns the file_path (or in-memory file object) unchanged for single
+        inputs
         It also converts the fileurl to a valid string (avoids html escaping)
         """
         if isinstance(file_path, dict):
             return self._check_input_compliance(file_path)
-        elif file_path.lower().endswith('.json'):
+        elif isinstance(file_path, six.string_types) and \
+                file_path.lower().endswith('.json'):
             input_dict = self._load_json(file_path)
             for key, value in input_dict.items():
                 if key == "format":
@@ -173,8 +567,7 @@ class ModelHubAPI:
         in the model config file and returns an error if not.
         * TODO: Check the other way round?
         """
-        config = self.get_config()["model"]["io"]["input"]
-        for key in config.keys():
+        for key in self.metadata.input_keys:
             if key not in input_dict:
                 raise IOError("The input json does not match the input schema in the " \
                                 "configuration file")
@@ -215,13 +608,27 @@ class ModelHubAPI:
         else:
             return [{'error': "output formatting does not match output specifications in config file"}]
 
-    def _save_output(self, output, name):
+    def _save_output(self, output, name, writer):
+        # random suffix keeps names unique among concurrent predictions
         now = datetime.now()
         path = os.path.join(self.output_folder,
-                                 "%s.%s" % (now.strftime("%Y-%m-%d-%H-%M-%S-%f"),
-                                 "h5"))
-        h5f = h5py.File(path, 'w')
-        dataset = h5f.create_dataset(name, data=output)
-        dataset.attrs["type"] = numpy.string_(str(output.dtype))
-        h5f.close()
+                                 "%s-%s%s" % (now.strftime("%Y-%m-%d-%H-%M-%S-%f"),
+                                 uuid.uuid4().hex[:8], writer.extension))
+        with _stageSeconds.time(stage="write_output"):
+            writer.write(output, name, path)
+        _outputBytes.inc(os.path.getsize(path), format=writer.extension.lstrip("."))
+        output_retention = self.output_retention
+        if output_retention is not None:
+            output_retention.add(path)
         return path
+
+
+    def _touch_outputs(self, output_list, files):
+        """
+        Marks the output files of a result as accessed for the output
+        retention.
+        """
+        output_retention = self.output_retention
+        if output_retention is not None:
+            for i in files:
+                output_retention.touch(output_list[i]["prediction"])
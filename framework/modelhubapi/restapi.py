@@ -1,27 +1,94 @@
 from flask import Flask, jsonify, abort, make_response, \
-                    send_file, url_for, send_from_directory, request
+                    url_for, request, g
+from flask.json import JSONEncoder
 from .pythonapi import ModelHubAPI
+from .jsonencoding import NumpyJSONEncoder, NUMPY_ENCODINGS
+from .jobs import InProcessJobQueue, JobQueueFull
+from .downloads import DownloadManager
+from .modelarchive import ModelArchive
+from .staticfiles import StaticFiles
+from .profiling import ProfileStore, StackSampler, ProfilerBusy
+from . import gunicornserver
+from . import flaskcompat
+from modelhublib import metrics
 import os
 import io
 import json
 import shutil
+import tempfile
+from contextlib import contextmanager
 from mimetypes import MimeTypes
-import requests
-from datetime import datetime
 from flask_cors import CORS
 import magic
 import re
+import uuid
+import six
+import time
+import hmac
+
+
+_requests = metrics.registry.counter(
+    "modelhub_http_requests_total",
+    "HTTP requests handled by the REST API, by endpoint and outcome: "
+    "\"success\" (status below 400), \"client_error\" (4xx) or "
+    "\"server_error\" (5xx).",
+    ("endpoint", "outcome"))
+_requestSeconds = metrics.registry.histogram(
+    "modelhub_http_request_seconds",
+    "Time from receiving an HTTP request to returning its response, by "
+    "endpoint.",
+    ("endpoint",))
+_inFlight = metrics.registry.gauge(
+    "modelhub_http_requests_in_flight",
+    "HTTP requests in progress, by endpoint.",
+    ("endpoint",))
+_receivedBytes = metrics.registry.counter(
+    "modelhub_input_bytes_total",
+    "Bytes of input files received, by source: \"upload\" or \"download\".",
+    ("source",))
+_sentBytes = metrics.registry.counter(
+    "modelhub_http_response_bytes_total",
+    "Bytes of HTTP response bodies with known length, by endpoint.",
+    ("endpoint",))
+_stageSeconds = metrics.registry.histogram(
+    "modelhub_rest_predict_stage_seconds",
+    "Time spent in the stages of handling a prediction request: "
+    "\"download\" or \"save_upload\" of the input, \"mime_sniff\", "
+    "\"multi_inputs\" (downloading the inputs of multi input json files), "
+    "\"predict\" (ModelHubAPI.predict) and \"encode\" (the json response).",
+    ("stage",))
+
+
+class _FlaskNumpyJSONEncoder(NumpyJSONEncoder, JSONEncoder):
+    """
+    Flask's JSON encoder extended by numpy arrays and scalars.
+    """
+    pass
+
 
 
 class ModelHubRESTAPI:
 
     def __init__(self, model, contrib_src_dir):
         self.app = Flask(__name__)
+        self.app.json_encoder = _FlaskNumpyJSONEncoder
         CORS(self.app)
         self.model = model
         self.contrib_src_dir = contrib_src_dir
         self.working_folder = '/working'
+        # uploads up to this size (in bytes) are passed to the model in memory
+        # instead of being saved to the working folder, 0 disables this.
+        self.in_memory_upload_limit = 0
+        # admin token clients send to profile single predictions (see
+        # get_profile), None disables profiling.
+        self.profiling_token = None
         self.api = ModelHubAPI(model, contrib_src_dir)
+        self.downloads = DownloadManager()
+        self.model_archive = ModelArchive(contrib_src_dir)
+        self.static_files = StaticFiles()
+        self.jobs = InProcessJobQueue(self._run_job)
+        self.profiles = ProfileStore()
+        self.stack_sampler = StackSampler()
         # routes
         self.app.add_url_rule('/api/samples/<sample_name>', 'samples',
                               self._samples)
@@ -41,9 +108,28 @@ class ModelHubRESTAPI:
         self.app.add_url_rule('/api/get_samples', 'get_samples',
                               self.get_samples)
         self.app.add_url_rule('/api/predict', 'predict',
-                              self.predict, methods=['GET', 'POST'])
+                              self._profiled(self.predict),
+                              methods=['GET', 'POST'])
         self.app.add_url_rule('/api/predict_sample', 'predict_sample',
-                              self.predict_sample)
+                              self._profiled(self.predict_sample))
+        self.app.add_url_rule('/api/jobs', 'submit_job',
+                              self.submit_job, methods=['POST'])
+        self.app.add_url_rule('/api/jobs/<job_id>', 'get_job',
+                              self.get_job, methods=['GET'])
+        self.app.add_url_rule('/api/jobs/<job_id>', 'cancel_job',
+                              self.cancel_job, methods=['DELETE'])
+        # health checks
+        self.app.add_url_rule('/api/live', 'live', self.live)
+        self.app.add_url_rule('/api/ready', 'ready', self.ready)
+        # monitoring
+        self.app.add_url_rule('/api/metrics', 'metrics', self.get_metrics)
+        self.app.add_url_rule('/api/profiles/<profile_id>', 'get_profile',
+                              self.get_profile)
+        self.app.add_url_rule('/api/debug/profile', 'debug_profile',
+                              self.debug_profile)
+        self.app.before_request(self._before_request)
+        self.app.after_request(self._after_request)
+        self.app.teardown_request(self._teardown_request)
 
     def get_config(self):
         """
@@ -52,7 +138,7 @@ class ModelHubRESTAPI:
         Returns:
             application/json: Model configuration dictionary.
         """
-        return self._jsonify(self.api.get_config())
+        return self._metadata_response("config")
 
     def get_legal(self):
         """
@@ -70,7 +156,7 @@ class ModelHubRESTAPI:
                 - model_license
                 - sample_data_license
         """
-        return self._jsonify(self.api.get_legal())
+        return self._metadata_response("legal")
 
     def get_model_io(self):
         """
@@ -82,7 +168,7 @@ class ModelHubRESTAPI:
                 Convenience function, as this is a subset of what
                 :func:`~get_config` returns
         """
-        return self._jsonify(self.api.get_model_io())
+        return self._metadata_response("model_io")
 
     def get_model_files(self):
         """
@@ -92,20 +178,22 @@ class ModelHubRESTAPI:
             application/zip:
                 The trained deep learning model in its native format and
                 all its asscociated files in a single zip folder.
+
+        The archive is built once per model version. Responses carry an
+        ETag, so clients can revalidate with If-None-Match (304 if
+        unchanged), and support Range requests to resume downloads.
         """
         # TODO
         #    * This returns a error: [Errno 32] Broken pipe when url is typed
         #      into chrome and before hitting enter - chrome sends
         #      request earlier, and this messes up with flask.
-        #    * Currently no mechanism for catching errors (except what flask
-        #      will catch).
         try:
-            model_name = self.api.get_config()["meta"]["name"].lower()
-            archive_name = os.path.join(self.working_folder,
-                                        model_name + "_model")
-            shutil.make_archive(archive_name, "zip",
-                                self.contrib_src_dir, "model")
-            return send_file(archive_name + ".zip", as_attachment=True)
+            model_name = self.api.metadata.config["meta"]["name"].lower()
+            archive_path, etag = self.model_archive.get(self.working_folder)
+            return flaskcompat.send_file(archive_path, mimetype="application/zip",
+                                         as_attachment=True,
+                                         download_name=model_name + "_model.zip",
+                                         etag=etag)
         except Exception as e:
             return self._jsonify({'error': str(e)})
 
@@ -121,7 +209,7 @@ class ModelHubRESTAPI:
             url = request.url
             url = url.replace("api/get_samples", "api/samples/")
             samples = [url + sample_name
-                       for sample_name in self.api.get_samples()["files"]]
+                       for sample_name in self.api.metadata.samples["files"]]
             return self._jsonify(samples)
         except Exception as e:
             return self._jsonify({'error': str(e)})
@@ -145,6 +233,19 @@ class ModelHubRESTAPI:
                      (see :func:`~get_model_io`) URL must not contain any
                      arguments and should end with the file extension.
 
+            output_format: Optional file format for numpy outputs, one of
+                           "h5", "h5-gzip", "h5-lzf", "npy" or "npz". Defaults
+                           to the formats set in the model configuration.
+
+            output_encoding: Optional, "file" (default) saves numpy outputs
+                             to files and returns their URLs. "list" returns
+                             them inline as nested lists, "base64" inline as
+                             dictionary with "dtype", "shape" and the
+                             base64 encoded raw buffer as "data" (see
+                             :func:`~modelhubapi.jsonencoding.encode_array`).
+                             Alternatively send the header
+                             ``Accept: application/json; numpy=base64``.
+
         GET Example:
         :code:
         `curl -X GET http://localhost:80/api/predict?fileurl=<URL_OF_FILE>`
@@ -155,6 +256,8 @@ class ModelHubRESTAPI:
             file: Input file with data for prediction. Input type must match
                   specification in the model configuration
                   (see :func:`~get_model_io`)
+            output_format: Optional file format for numpy outputs (see GET).
+            output_encoding: Optional encoding of numpy outputs (see GET).
 
         POST Example:
         :code:
@@ -162,15 +265,23 @@ class ModelHubRESTAPI:
         `http://localhost:80/api/predict`
         """
         try:
-            file_name, mime_type = self._save_file_get_mime_type(request)
-            if str(mime_type) in self._get_allowed_extensions():
-                file_name = self._check_multi_inputs(file_name)
-                result = self._jsonify(self.api.predict(file_name,
-                                       url_root=request.url_root))
-                self._delete_temp_files(self.working_folder)
-                return result
-            else:
-                return self._jsonify({'error': 'Incorrect file type.'})
+            with self._request_folder() as folder:
+                file_name, mime_type = self._save_file_get_mime_type(request,
+                                                                     folder)
+                if str(mime_type) in self._get_allowed_extensions():
+                    with _stageSeconds.time(stage="multi_inputs"):
+                        file_name = self._check_multi_inputs(file_name, folder)
+                    numpy_encoding = self._get_numpy_encoding()
+                    with _stageSeconds.time(stage="predict"):
+                        result = self.api.predict(
+                            file_name, numpyToFile=numpy_encoding is None,
+                            url_root=request.url_root,
+                            output_format=request.values.get('output_format'),
+                            numpy_encoding=numpy_encoding)
+                    with _stageSeconds.time(stage="encode"):
+                        return self._jsonify(result)
+                else:
+                    return self._jsonify({'error': 'Incorrect file type.'})
         except Exception as e:
             return self._jsonify({'error': str(e)})
 
@@ -194,14 +305,22 @@ class ModelHubRESTAPI:
 
         Args:
             filename: File name of the sample data. No folders or URLs.
+            output_format: Optional file format for numpy outputs
+                           (see :func:`~predict`).
+            output_encoding: Optional encoding of numpy outputs
+                             (see :func:`~predict`).
         """
         try:
             if request.method == 'GET':
                 file_name = request.args.get('filename')
                 file_name = self.contrib_src_dir + "/sample_data/" + file_name
                 if os.path.isfile(file_name):
-                    result = self.api.predict(str(file_name),
-                                              url_root=request.url_root)
+                    numpy_encoding = self._get_numpy_encoding()
+                    result = self.api.predict(
+                        str(file_name), numpyToFile=numpy_encoding is None,
+                        url_root=request.url_root,
+                        output_format=request.args.get('output_format'),
+                        numpy_encoding=numpy_encoding)
                     return self._jsonify(result)
                 else:
                     return self._jsonify(
@@ -209,29 +328,386 @@ class ModelHubRESTAPI:
         except Exception as e:
             return self._jsonify({'error': str(e)})
 
-    def start(self):
+    def submit_job(self):
+        """
+        POST method
+
+        Submits an asynchronous prediction job. Accepts the same input as
+        :func:`~predict`, either an uploaded file or a fileurl, but returns
+        right after the job is queued. Poll :func:`~get_job` for the
+        job's status and result.
+
+        Returns:
+            application/json:
+                Dictionary with the "job_id", the job's "status" and the "url"
+                to poll for the job. Status code is 202 if the job was queued,
+                503 if the job queue is full, and 400 on any other error.
+
+        Args:
+            file: Input file with data for prediction (see :func:`~predict`).
+            fileurl: URL to input data for prediction (see :func:`~predict`).
+            output_format: File format for numpy outputs (see :func:`~predict`).
+            output_encoding: Encoding of numpy outputs (see :func:`~predict`).
+
+        POST Example:
+        :code:
+        `curl -i -X POST -F file=@<PATH_TO_FILE>
+        `http://localhost:80/api/jobs`
+        """
+        job_folder = None
+        try:
+            numpy_encoding = self._get_numpy_encoding()
+            job_folder = self._make_request_folder("job-")
+            # job specs must stay JSON-serializable, so never keep in memory
+            file_name, mime_type = self._save_file_get_mime_type(
+                request, job_folder, allow_in_memory=False)
+            if str(mime_type) not in self._get_allowed_extensions():
+                self._remove_request_folder(job_folder)
+                return self._jsonify({'error': 'Incorrect file type.'})
+            job_id = self.jobs.submit({"input": file_name,
+                                       "folder": job_folder,
+                                       "url_root": request.url_root,
+                                       "output_format":
+                                           request.values.get('output_format'),
+                                       "numpy_encoding": numpy_encoding})
+            return self._jsonify({"job_id": job_id,
+                                  "status": self.jobs.get(job_id)["status"],
+                                  "url": request.url_root + "api/jobs/" + job_id},
+                                 202)
+        except JobQueueFull as e:
+            self._remove_request_folder(job_folder)
+            return self._jsonify({'error': str(e)}, 503)
+        except Exception as e:
+            self._remove_request_folder(job_folder)
+            return self._jsonify({'error': str(e)})
+
+    def get_job(self, job_id):
+        """
+        GET method
+
+        Returns:
+            application/json:
+                Status of the job with the given id. Once the job has finished,
+                the key "result" holds the prediction result in the same format
+                :func:`~predict` returns it. Status code is 404 if the job is
+                unknown.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return self._jsonify({'error': 'Unknown job id.'}, 404)
+        return self._jsonify(job)
+
+    def cancel_job(self, job_id):
+        """
+        DELETE method
+
+        Cancels a job that has not started yet.
+
+        Returns:
+            application/json:
+                Status of the cancelled job. Status code is 404 if the job is
+                unknown and 409 if the job is already running or finished.
+        """
+        spec = self.jobs.cancel(job_id)
+        if spec is None:
+            if self.jobs.get(job_id) is None:
+                return self._jsonify({'error': 'Unknown job id.'}, 404)
+            return self._jsonify({'error': 'Job cannot be cancelled anymore.'},
+                                 409)
+        self._remove_request_folder(spec["folder"])
+        return self._jsonify(self.jobs.get(job_id))
+
+    def live(self):
+        """
+        GET method
+
+        Liveness check for orchestrators and load balancers. Succeeds as long
+        as the server handles requests at all.
+
+        Returns:
+            application/json:
+                Dictionary with "status" "live", always with status code 200.
+        """
+        return self._jsonify({"status": "live"}, 200)
+
+    def ready(self):
+        """
+        GET method
+
+        Readiness check for orchestrators and load balancers, which should
+        only send predictions once this succeeds.
+
+        Returns:
+            application/json:
+                Status dictionary as returned by
+                :func:`~modelhubapi.pythonapi.ModelHubAPI.get_status`. Status
+                code is 200 if the API is ready, 503 otherwise (e.g. while
+                warming up).
+        """
+        status = self.api.get_status()
+        return self._jsonify(status, 200 if status["ready"] else 503)
+
+    def get_metrics(self):
+        """
+        GET method
+
+        Metrics of the REST API, the Python API and modelhublib (see
+        :mod:`modelhublib.metrics`) for scraping by Prometheus: request
+        counts by outcome, requests in flight, received and sent bytes,
+        latency histograms of the stages of predictions and preprocessing,
+        and the statistics of caches and image loaders. With several gunicorn
+        workers, each worker reports its own metrics.
+
+        Returns:
+            text/plain:
+                All metrics in the Prometheus text exposition format.
+        """
+        response = make_response(metrics.registry.exposition())
+        response.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+        return response
+
+    def get_profile(self, profile_id):
+        """
+        GET method
+
+        Downloads the profile of a single prediction. Profiling is an admin
+        feature, disabled unless :attr:`profiling_token` is set. To profile a
+        call of :func:`~predict` or :func:`~predict_sample`, send the token
+        in the header ``X-Modelhub-Profile`` or as parameter ``profile``.
+        The prediction then runs under cProfile, and its json response gets
+        a "profile" with the profile's "id", the seconds spent in the
+        "stages" load, convert, infer and serialize, and the "hot_functions"
+        with the most own time. Only one request is profiled at a time,
+        others asking for a profile get 429. Results returned from the result
+        cache and batched inference are not covered.
+
+        Args:
+            profile_id: The profile's id.
+            format: Optional, "pstats" (default) for a file readable by
+                    python's pstats module, or "collapsed" for collapsed
+                    stacks as read by flame graph tools.
+            profile: The profiling token, unless sent in the header.
+
+        Returns:
+            application/octet-stream or text/plain:
+                The profile. 403 if profiling is disabled or the token is
+                wrong, 404 if the profile does not exist (anymore).
+        """
+        if not self._is_profiling_authorized():
+            return self._jsonify({'error': 'Profiling is disabled or the '
+                                  'profiling token is wrong.'}, 403)
+        profile_format = request.args.get('format', 'pstats')
+        path = self.profiles.path(profile_id, profile_format)
+        if path is None:
+            return self._jsonify({'error': 'The profile does not exist.'}, 404)
+        if profile_format == "collapsed":
+            return flaskcompat.send_file(path, mimetype="text/plain")
+        return flaskcompat.send_file(path, mimetype="application/octet-stream",
+                                     as_attachment=True,
+                                     download_name=profile_id + ".pstats")
+
+    def debug_profile(self):
         """
-        Starts the flask app.
+        GET method
+
+        Samples the stacks of all threads of the server process for some
+        seconds, while it keeps serving requests, and returns how often each
+        stack was seen (see :class:`~modelhubapi.profiling.StackSampler`).
+        Requires the profiling token like :func:`~get_profile`. Only one
+        request samples at a time, others get 429. With several gunicorn
+        workers, only the worker handling the request is sampled.
+
+        Args:
+            seconds: Optional sampling duration, defaults to 10, at most 60.
+            interval: Optional seconds between two samples, defaults to 0.01,
+                      at least 0.001.
+            profile: The profiling token, unless sent in the header
+                     ``X-Modelhub-Profile``.
+
+        Returns:
+            text/plain:
+                Collapsed stacks as read by flame graph tools, one
+                "thread;outer function;...;inner function samples" per line,
+                most frequent first. 403 if profiling is disabled or the
+                token is wrong.
+
+        Example:
+        :code:
+        `curl -H "X-Modelhub-Profile: <TOKEN>"
+        http://localhost:80/api/debug/profile?seconds=30 | flamegraph.pl`
         """
-        self.app.run(host='0.0.0.0', port=80, threaded=True)
+        if not self._is_profiling_authorized():
+            return self._jsonify({'error': 'Profiling is disabled or the '
+                                  'profiling token is wrong.'}, 403)
+        try:
+            seconds = float(request.args.get('seconds', 10))
+            interval = float(request.args.get('interval',
+                                              self.stack_sampler.interval))
+        except ValueError:
+            return self._jsonify({'error': 'seconds and interval must be '
+                                  'numbers.'})
+        # also rejects nan and inf
+        if not 0 < seconds < float('inf') or not 0 < interval < float('inf'):
+            return self._jsonify({'error': 'seconds and interval must be '
+                                  'positive.'})
+        try:
+            stacks = self.stack_sampler.sample(seconds, interval)
+        except ProfilerBusy as e:
+            return self._jsonify({'error': str(e)}, 429)
+        lines = ["%s %d\n" % (stack, count) for stack, count in
+                 sorted(stacks.items(), key=lambda item: item[1], reverse=True)]
+        response = make_response("".join(lines))
+        response.headers["Content-Type"] = "text/plain; charset=utf-8"
+        return response
+
+    def start(self, host='0.0.0.0', port=80):
+        """
+        Starts the flask app with flask's development server.
+        """
+        self.app.run(host=host, port=port, threaded=True)
+
+    def start_gunicorn(self, host='0.0.0.0', port=80, **options):
+        """
+        Starts the flask app with gunicorn's pre-forking server, which
+        shares the loaded model between its worker processes. Requires
+        gunicorn. See :func:`~modelhubapi.gunicornserver.serve` for the
+        options.
+        """
+        gunicornserver.serve(self, host, port, **options)
+
+    def after_fork(self):
+        """
+        Restarts background services in a forked worker process (see
+        :func:`~modelhubapi.pythonapi.ModelHubAPI.after_fork`).
+        """
+        self.api.after_fork()
 
     # -------------------------------------------------------------------------
     # Private helper functions
     # -------------------------------------------------------------------------
 
-    def _delete_temp_files(self, folder):
+    def _before_request(self):
+        g.metrics_start = time.time()
+        g.metrics_endpoint = request.endpoint or "unmatched"
+        _inFlight.inc(endpoint=g.metrics_endpoint)
+
+    def _after_request(self, response):
+        endpoint = g.metrics_endpoint
+        if response.status_code >= 500:
+            outcome = "server_error"
+        elif response.status_code >= 400:
+            outcome = "client_error"
+        else:
+            outcome = "success"
+        _requests.inc(endpoint=endpoint, outcome=outcome)
+        _requestSeconds.observe(time.time() - g.metrics_start, endpoint=endpoint)
+        if response.content_length:
+            _sentBytes.inc(response.content_length, endpoint=endpoint)
+        return response
+
+    def _teardown_request(self, exception):
+        if "metrics_endpoint" in g:
+            _inFlight.dec(endpoint=g.metrics_endpoint)
+
+    def _profiled(self, view):
         """
-        Removes all files in the given folder
+        Wraps a prediction view, so that requests sending the profiling token
+        are run under the profiler (see :func:`~get_profile`).
         """
+        def profiled_view():
+            if not self._is_profiling_requested():
+                return view()
+            if not self._is_profiling_authorized():
+                return self._jsonify({'error': 'Profiling is disabled or the '
+                                      'profiling token is wrong.'}, 403)
+            try:
+                response, summary = self.profiles.run(view)
+            except ProfilerBusy as e:
+                return self._jsonify({'error': str(e)}, 429)
+            if response.mimetype != "application/json":
+                return response
+            try:
+                content = json.loads(response.get_data(as_text=True))
+            except ValueError:
+                return response
+            if not isinstance(content, dict):
+                return response
+            content["profile"] = summary
+            return self._jsonify(content, response.status_code)
+        return profiled_view
+
+    def _is_profiling_requested(self):
+        return bool(request.headers.get('X-Modelhub-Profile') or
+                    request.values.get('profile'))
+
+    def _is_profiling_authorized(self):
+        token = request.headers.get('X-Modelhub-Profile') or \
+            request.values.get('profile') or ""
+        return self.profiling_token is not None and \
+            hmac.compare_digest(token.encode("utf-8"),
+                                self.profiling_token.encode("utf-8"))
+
+    def _make_request_folder(self, prefix="request-"):
+        """
+        Creates a uniquely named folder inside the working folder, which holds
+        all temporary files of a single request. Requests never touch each
+        other's folders, so they can run concurrently.
+        """
+        return tempfile.mkdtemp(prefix=prefix, dir=self.working_folder)
+
+    def _remove_request_folder(self, folder):
+        """
+        Removes a folder created by :func:`~_make_request_folder` including
+        all files in it.
+        """
+        if folder is not None:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    @contextmanager
+    def _request_folder(self):
+        """
+        Context manager providing a request folder, which is removed on exit,
+        no matter if the request succeeded or failed.
+        """
+        folder = self._make_request_folder()
         try:
-            for file in os.listdir(folder):
-                file_path = os.path.join(folder, file)
-                if os.path.isfile(file_path):
-                    os.unlink(file_path)
-        except Exception as e:
-            print(e)
+            yield folder
+        finally:
+            self._remove_request_folder(folder)
+
+    def _run_job(self, spec):
+        """
+        Job handler for :attr:`jobs`. Runs the prediction for a submitted job
+        and removes the job's working folder afterwards.
+        """
+        try:
+            file_name = self._check_multi_inputs(spec["input"], spec["folder"])
+            numpy_encoding = spec.get("numpy_encoding")
+            return self.api.predict(file_name,
+                                    numpyToFile=numpy_encoding is None,
+                                    url_root=spec["url_root"],
+                                    output_format=spec.get("output_format"),
+                                    numpy_encoding=numpy_encoding)
+        finally:
+            self._remove_request_folder(spec["folder"])
+
+    def _metadata_response(self, name):
+        """
+        Returns the pre-encoded metadata response name of the current
+        metadata snapshot (see :class:`~modelhubapi.metadata.MetadataSnapshot`)
+        with its ETag, or 304 if the client has it already. Errors are
+        returned as 400.
+        """
+        metadata = self.api.metadata
+        encoded, etag = metadata.response(name)
+        response = self.app.response_class(encoded,
+                                           mimetype="application/json")
+        response.set_etag(etag)
+        if "error" in getattr(metadata, name):
+            response.status_code = 400
+        return response.make_conditional(request)
 
-    def _jsonify(self, content):
+    def _jsonify(self, content, status_code=None):
         """
         This helper function wraps the flask jsonify function, and also allows
         for error checking. This is usedfor calls that use the
@@ -243,11 +719,36 @@ class ModelHubRESTAPI:
           error code based on the actual error.
         """
         response = jsonify(content)
-        if (type(content) is dict) and ("error" in content.keys()):
+        if status_code is not None:
+            response.status_code = status_code
+        elif (type(content) is dict) and ("error" in content.keys()):
             response.status_code = 400
         return response
 
-    def _check_multi_inputs(self, file_name):
+    def _get_numpy_encoding(self):
+        """
+        Returns the encoding of inline numpy outputs requested by the client,
+        or None if numpy outputs should be saved to files. The request
+        parameter "output_encoding" takes precedence over a "numpy"
+        parameter in the Accept header.
+
+        Raises:
+            ValueError if the requested encoding is unknown.
+        """
+        encoding = request.values.get('output_encoding')
+        if encoding is None:
+            match = re.search(r'application/json\s*;[^,]*\bnumpy=([\w-]+)',
+                              request.headers.get('Accept', ''))
+            encoding = match.group(1) if match else "file"
+        if encoding == "file":
+            return None
+        if encoding not in NUMPY_ENCODINGS:
+            raise ValueError("Unknown output encoding \"%s\", supported "
+                             "encodings are file, %s."
+                             % (encoding, ", ".join(NUMPY_ENCODINGS)))
+        return encoding
+
+    def _check_multi_inputs(self, file_name, folder):
         """
         If file_name is a path to a json file, the file is
         loaded and processed as follows:
@@ -262,25 +763,31 @@ class ModelHubRESTAPI:
 
         the path to the new json file is then returned.
 
-        If the passed path is no json file, it is simply
-        returned unchanged.
+        If the passed path is no json file (or an in-memory
+        upload), it is simply returned unchanged.
+
+        Downloaded files and the new json file are saved to the request's
+        folder.
         """
-        if file_name.lower().endswith('.json'):
+        if isinstance(file_name, six.string_types) and \
+                file_name.lower().endswith('.json'):
             input_dict = self.api._load_json(file_name)
+            keys = []
+            downloads = []
             for key, value in input_dict.items():
                 if key == "format":
                     continue
                 elif self._check_if_url(value["fileurl"]):
-                    input_dict[key]["fileurl"] = \
-                        self._save_input_from_url(value["fileurl"],
-                                                  value["type"])
+                    keys.append(key)
+                    downloads.append(self._get_input_download(
+                        value["fileurl"], value["type"], folder))
                 else:
                     print("Local path found: " + value["fileurl"])
-            now = datetime.now()
-            file_name = os.path.join(self.working_folder,
-                                     "%s%s" %
-                                     (now.strftime("%Y-%m-%d-%H-%M-%S-%f"),
-                                      '.json'))
+            # all remote inputs are fetched concurrently
+            for key, path in zip(keys, self.downloads.download_many(downloads)):
+                input_dict[key]["fileurl"] = path
+                _receivedBytes.inc(os.path.getsize(path), source="download")
+            file_name = os.path.join(folder, uuid.uuid4().hex + '.json')
             # dump to file
             self.api._write_json(file_name, input_dict)
         return file_name
@@ -302,103 +809,143 @@ class ModelHubRESTAPI:
         else:
             raise IOError("Multiple URLs detected in the input json!")
 
-    def _save_input_from_url(self, url, type):
+    def _save_input_from_url(self, url, type, folder):
         """
         This function downloads an arbitrary file from a URL and
-        saves it first without extension in its raw format and
-        then adds the right file extension after looking up its
-        mime type.
+        saves it with the file extension matching its mime type.
 
         Args:
             url (str): the url pointing to the file to download
             type (list): the mime type of the file
+            folder (str): the request folder to save the file to
+        """
+        return self.downloads.download(
+            *self._get_input_download(url, type, folder))
 
-        Issues:
-            if the resource at the url is unresponsive, get may
-            never time out and hang indefinitely.
+    def _get_input_download(self, url, type, folder):
+        """
+        Returns the arguments of :func:`DownloadManager.download` for an
+        input of a multi input json file (see :func:`~_save_input_from_url`).
+        Both the input's own mime type and the model's input formats are
+        accepted as content type of the remote file.
         """
-        now = datetime.now()
-        r = requests.get(url, stream=True)
-        file_name = str(url).split('/')[-1]
         file_ext = self._modify_mime_types_inv()[type[0]][0]
-        file_path = os.path.join(self.working_folder,
-                                 "%s" % (now.strftime("%Y-%m-%d-%H-%M-%S-%f")))
-        with open(file_path, 'wb') as f:
-            for chunk in r.iter_content(chunk_size=512):
-                f.write(chunk)
-        # add extension
-        file_path_with_ext = file_path + file_ext
-        os.rename(file_path, file_path_with_ext)
-        return file_path_with_ext
+        file_path = os.path.join(folder, uuid.uuid4().hex + file_ext)
+        return url, file_path, list(type) + self._get_allowed_extensions()
 
     def _samples(self, sample_name):
         """
         Routing function for sample files that exist in contrib_src.
         """
-        return send_from_directory(self.contrib_src_dir + "/sample_data/",
-                                   sample_name, cache_timeout=-1)
+        return self.static_files.send(self.contrib_src_dir + "/sample_data/",
+                                      sample_name, max_age=86400)
 
     def _output(self, output_name):
         """
         Routing function for output files that may exist in the output folder.
-        """
-        return send_from_directory(self.api.output_folder, output_name,
-                                   cache_timeout=-1)
+        Returns 410 for files removed by the output retention (see
+        :func:`~modelhubapi.pythonapi.ModelHubAPI.enable_output_retention`).
+        """
+        output_retention = self.api.output_retention
+        if output_retention is not None:
+            if output_retention.is_evicted(output_name):
+                return self._jsonify({'error': 'The output file has expired '
+                                      'and was removed, run the prediction '
+                                      'again.'}, 410)
+            output_retention.touch(output_name)
+        # output names are unique, so an output never changes
+        return self.static_files.send(self.api.output_folder, output_name,
+                                      max_age=31536000, private=True,
+                                      immutable=True)
 
     def _thumbnail(self, thumbnail_name):
         """
         Routing function for the thumbnail that exists in contrib_src. The
         thumbnail must be named "thumbnail.jpg".
         """
-        return send_from_directory(self.contrib_src_dir + "/model/",
-                                   thumbnail_name, cache_timeout=-1)
+        return self.static_files.send(self.contrib_src_dir + "/model/",
+                                      thumbnail_name, max_age=86400)
 
     def _get_allowed_extensions(self):
-        return self.api.get_model_io()["input"]["format"]
+        return list(self.api.metadata.input_formats)
 
-    def _get_file_name(self, mime_type=""):
+    def _get_file_name(self, folder, mime_type=""):
         """
-        This utility function get the current date/time and returns a full path
-        to save either an uploaded file or one grabbed through a url. If
-        mimetype is provided, it will grab the appropriate extension, If no
-        mimetype is provided, it will return the file without an extension.
+        This utility function returns a full path with a unique random name
+        inside the given request folder to save either an uploaded file or one
+        grabbed through a url. If mimetype is provided, it will grab the
+        appropriate extension, If no mimetype is provided, it will return the
+        file without an extension.
         """
-        now = datetime.now()
         extension = self._modify_mime_types_inv()[mime_type][0] \
             if mime_type != "" else mime_type
-        file_name = os.path.join(self.working_folder,
-                                 "%s%s" %
-                                 (now.strftime("%Y-%m-%d-%H-%M-%S-%f"),
-                                  extension))
+        file_name = os.path.join(folder, uuid.uuid4().hex + extension)
         return file_name
 
-    def _save_file_get_mime_type(self, request):
+    def _save_file_get_mime_type(self, request, folder, allow_in_memory=True):
         """
-        This utility checks first if the request method is POST or GET. It then
-        saves the file with a unique date/time name but without an extension.
+        This utility checks first if the request uploads a file (POST) or
+        passes a fileurl. It then saves the file to the request folder with a
+        unique random name but without an extension.
         Finally it uses magic to identify the mime type and change the filename
         to one with the correct extension. Returns both full path file name and
         mime type.
+
+        Uploads not larger than :attr:`in_memory_upload_limit` bytes are not
+        saved at all. Instead of the file name, an in-memory file object
+        (io.BytesIO) is returned, whose "name" attribute carries the correct
+        extension. Multi input json files are always saved, and so is
+        everything else if allow_in_memory is False.
         """
-        if request.method == 'GET':
-            file_url = request.args.get('fileurl')
+        if request.method == 'GET' or 'file' not in request.files:
+            file_url = request.values.get('fileurl')
             # cache file extension
             file_name_raw = str(file_url).split('/')[-1]
             file_ext_cache = file_name_raw.split(os.extsep, 1)[-1]
-            r = requests.get(file_url)
-            file_name = self._get_file_name()
-            with open(file_name, 'wb') as f:
-                f.write(r.content)
-        elif request.method == 'POST':
+            file_name = self._get_file_name(folder)
+            with _stageSeconds.time(stage="download"):
+                self.downloads.download(file_url, file_name,
+                                        self._get_allowed_extensions())
+            _receivedBytes.inc(os.path.getsize(file_name), source="download")
+        else:
             file = request.files.get('file')
             # cache file extension
             file_name_raw = str(file).split('/')[-1]
             file_ext_cache = file_name_raw.split(os.extsep, 1)[-1]
-            file_name = self._get_file_name()
-            file.save(file_name)
+            if allow_in_memory and self.in_memory_upload_limit > 0:
+                with _stageSeconds.time(stage="save_upload"):
+                    data = file.stream.read(self.in_memory_upload_limit + 1)
+                if len(data) <= self.in_memory_upload_limit:
+                    with _stageSeconds.time(stage="mime_sniff"):
+                        mime_type = self._get_mime_type(
+                            magic.Magic(mime=True).from_buffer(data),
+                            file_ext_cache)
+                    if mime_type != "application/json":
+                        _receivedBytes.inc(len(data), source="upload")
+                        buffer = io.BytesIO(data)
+                        buffer.name = "upload" + \
+                            self._modify_mime_types_inv()[mime_type][0]
+                        return buffer, mime_type
+                file.stream.seek(0)
+            file_name = self._get_file_name(folder)
+            with _stageSeconds.time(stage="save_upload"):
+                file.save(file_name)
+            _receivedBytes.inc(os.path.getsize(file_name), source="upload")
+
+        with _stageSeconds.time(stage="mime_sniff"):
+            mime_type = self._get_mime_type(
+                magic.Magic(mime=True).from_file(file_name), file_ext_cache)
+        file_name_with_extension = self._get_file_name(folder, mime_type)
+        os.rename(file_name, file_name_with_extension)
+        return file_name_with_extension, mime_type
 
-        _magic = magic.Magic(mime=True)
-        mime_type = _magic.from_file(file_name)
+    def _get_mime_type(self, magic_mime_type, file_ext_cache):
+        """
+        Returns the mime type identified by magic, unless magic only found a
+        catchall type. In that case, the mime type is looked up from the
+        file extension.
+        """
+        mime_type = magic_mime_type
         # checks if a catchall type has been set and takes action:
         if mime_type == "text/plain" or \
                 mime_type == "application/octet-stream":
@@ -406,12 +953,9 @@ class ModelHubRESTAPI:
             try:
                 mime_type = types["."+file_ext_cache]
             except KeyError as e:
-                raise KeyError("The file extension " + e +
+                raise KeyError("The file extension " + str(e) +
                                " is not supported.")
-
-        file_name_with_extension = self._get_file_name(mime_type)
-        os.rename(file_name, file_name_with_extension)
-        return file_name_with_extension, mime_type
+        return mime_type
 
     def _modify_mime_types(self):
         """
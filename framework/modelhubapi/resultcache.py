@@ -0,0 +1,206 @@
+import os
+import io
+import json
+import tempfile
+import threading
+from collections import OrderedDict
+from modelhublib import metrics
+from .jsonencoding import NumpyJSONEncoder
+
+
+_lookups = metrics.registry.counter(
+    "modelhub_result_cache_lookups_total",
+    "Prediction results looked up in the result cache, by result: "
+    "\"memory_hit\", \"disk_hit\" or \"miss\".",
+    ("result",))
+
+
+class ResultCache(object):
+    """
+    Two-tier LRU cache of prediction results (the output lists returned by
+    :func:`~modelhubapi.pythonapi.ModelHubAPI.predict`).
+
+    Results are kept JSON-encoded in memory and, if a disk folder is given,
+    also written to disk, where they survive restarts and are shared between
+    processes. Results found on disk only are moved back to memory. Results
+    that are not JSON-serializable are not cached.
+
+    Output files referenced by a result (saved numpy outputs) are not part of
+    the cache. Their paths are checked on every hit, and a result is
+    dropped if any of its files does not exist anymore.
+
+    Args:
+        max_memory_bytes (int): Maximum total size of the encoded results
+            kept in memory.
+        disk_folder (str or None): Folder for the disk tier, None disables it.
+        max_disk_bytes (int): Maximum total size of the results on disk.
+    """
+
+    def __init__(self, max_memory_bytes=64*1024**2, disk_folder=None,
+                 max_disk_bytes=1024**3):
+        self.max_memory_bytes = max_memory_bytes
+        self.disk_folder = disk_folder
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._disk = OrderedDict()
+        self._disk_size = 0
+        self._lock = threading.Lock()
+        if disk_folder is not None:
+            self._load_disk_index()
+
+
+    def get(self, key):
+        """
+        Args:
+            key (str): Key the result was stored under.
+
+        Returns:
+            tuple or None:
+                None if there is no valid result for key, otherwise the tuple
+                (output_list, files) as passed to :func:`~put`.
+        """
+        with self._lock:
+            encoded = self._memory.get(key)
+            if encoded is not None:
+                self._memory[key] = self._memory.pop(key)
+        tier = "memory_hit"
+        if encoded is None:
+            encoded = self._read_disk(key)
+            tier = "disk_hit"
+        if encoded is not None:
+            entry = json.loads(encoded)
+            if all(os.path.isfile(entry["output"][i]["prediction"])
+                   for i in entry["files"]):
+                if tier == "disk_hit":
+                    self._put_memory(key, encoded)
+                _lookups.inc(result=tier)
+                return entry["output"], entry["files"]
+            self.discard(key)
+        _lookups.inc(result="miss")
+        return None
+
+
+    def put(self, key, output_list, files):
+        """
+        Stores a prediction result.
+
+        Args:
+            key (str): Key to store the result under.
+            output_list (list): List of outputs as returned by predict
+                in the key "output".
+            files (list): Indices of the outputs whose prediction is the path
+                of a saved output file.
+        """
+        try:
+            encoded = json.dumps({"output": output_list, "files": files},
+                                 cls=NumpyJSONEncoder)
+        except (TypeError, ValueError):
+            return
+        self._put_memory(key, encoded)
+        if self.disk_folder is not None:
+            self._write_disk(key, encoded)
+
+
+    def discard(self, key):
+        """
+        Removes the result stored under key from both tiers.
+        """
+        with self._lock:
+            encoded = self._memory.pop(key, None)
+            if encoded is not None:
+                self._memory_size -= len(encoded)
+            size = self._disk.pop(key, None)
+            if size is not None:
+                self._disk_size -= size
+        if self.disk_folder is not None:
+            self._remove_disk_file(key)
+
+
+    # -------------------------------------------------------------------------
+    # Private helper functions
+    # -------------------------------------------------------------------------
+
+    def _put_memory(self, key, encoded):
+        if len(encoded) > self.max_memory_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_size -= len(old)
+            self._memory[key] = encoded
+            self._memory_size += len(encoded)
+            while self._memory_size > self.max_memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_size -= len(evicted)
+
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_folder, key + ".json")
+
+
+    def _load_disk_index(self):
+        """
+        Indexes results left on disk by earlier runs or other processes,
+        least recently used first.
+        """
+        if not os.path.isdir(self.disk_folder):
+            os.makedirs(self.disk_folder)
+        entries = []
+        for name in os.listdir(self.disk_folder):
+            if name.endswith(".json"):
+                stat = os.stat(os.path.join(self.disk_folder, name))
+                entries.append((stat.st_mtime, name[:-len(".json")], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_size += size
+
+
+    def _read_disk(self, key):
+        if self.disk_folder is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            with io.open(path, mode="r", encoding="utf-8") as f:
+                encoded = f.read()
+            os.utime(path, None)
+        except (IOError, OSError):
+            return None
+        with self._lock:
+            if key not in self._disk:
+                self._disk_size += len(encoded)
+            else:
+                self._disk.pop(key)
+            self._disk[key] = len(encoded)
+        return encoded
+
+
+    def _write_disk(self, key, encoded):
+        size = len(encoded)
+        if size > self.max_disk_bytes:
+            return
+        # write to a temporary file first, so readers never see partial results
+        handle, temp_path = tempfile.mkstemp(dir=self.disk_folder, suffix=".tmp")
+        with io.open(handle, mode="w", encoding="utf-8") as f:
+            f.write(encoded if isinstance(encoded, type(u"")) else encoded.decode("utf-8"))
+        os.rename(temp_path, self._disk_path(key))
+        evicted = []
+        with self._lock:
+            old = self._disk.pop(key, None)
+            if old is not None:
+                self._disk_size -= old
+            self._disk[key] = size
+            self._disk_size += size
+            while self._disk_size > self.max_disk_bytes:
+                evicted_key, evicted_size = self._disk.popitem(last=False)
+                self._disk_size -= evicted_size
+                evicted.append(evicted_key)
+        for evicted_key in evicted:
+            self._remove_disk_file(evicted_key)
+
+
+    def _remove_disk_file(self, key):
+        try:
+            os.remove(self._disk_path(key))
+        except OSError:
+            pass
@@ -0,0 +1,252 @@
+import os
+import time
+import stat as stat_module
+import threading
+from modelhublib import metrics
+
+
+_evictions = metrics.registry.counter(
+    "modelhub_output_files_evicted_total",
+    "Output files removed by the output retention, by reason (ttl or size).",
+    ("reason",))
+
+
+class OutputRetention(object):
+    """
+    Limits the files in the output folder by total size and age.
+
+    A file's last access (saved, downloaded or returned again from the result
+    cache) is kept on disk as its access time, which :func:`~touch` sets, so
+    that all worker processes serving the folder see the same order. The
+    modification time is left alone, as it keys the ETags of
+    :class:`~modelhubapi.staticfiles.StaticFiles`. A background reaper thread
+    periodically removes files that have not been accessed for longer than
+    ttl seconds, and then the least recently accessed files until the folder
+    fits max_bytes. Files left in the folder from an earlier run are
+    handled the same way.
+
+    Names of removed files are remembered (up to max_evicted) as empty
+    marker files in the subfolder :attr:`EVICTED_FOLDER` of the output
+    folder, so that requests for them can be answered with "410 Gone"
+    instead of "404 Not Found" by any worker process.
+
+    Args:
+        folder (str): The output folder.
+        max_bytes (int or None): Maximum total size of the output files. No
+            size limit if None.
+        ttl (float or None): Seconds after their last access files are
+            removed. Files never expire if None.
+        interval (float): Seconds between two runs of the reaper.
+        max_evicted (int): Number of removed file names remembered.
+    """
+
+    EVICTED_FOLDER = ".evicted"
+
+    def __init__(self, folder, max_bytes=None, ttl=None, interval=60,
+                 max_evicted=100000):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.interval = interval
+        self.max_evicted = max_evicted
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._reaper = None
+        self._reaper_pid = None
+
+
+    def start(self):
+        """
+        Starts the reaper thread. Otherwise it is started when the first file
+        is added.
+        """
+        with self._lock:
+            self._ensure_reaper()
+
+
+    def add(self, path):
+        """
+        Marks a newly saved output file as accessed.
+
+        Args:
+            path (str): Path of the file in the output folder.
+        """
+        with self._lock:
+            self._ensure_reaper()
+        try:
+            os.remove(self._evicted_path(os.path.basename(path)))
+        except OSError:
+            pass
+
+
+    def touch(self, path):
+        """
+        Marks an output file as accessed, which delays its removal.
+
+        Args:
+            path (str): Path or name of the file in the output folder.
+        """
+        path = os.path.join(self.folder, os.path.basename(path))
+        try:
+            os.utime(path, (time.time(), os.stat(path).st_mtime))
+        except OSError:
+            pass
+
+
+    def is_evicted(self, path):
+        """
+        Args:
+            path (str): Path or name of a file in the output folder.
+
+        Returns:
+            bool: Whether the file was removed by the retention.
+        """
+        return os.path.isfile(self._evicted_path(os.path.basename(path)))
+
+
+    def reap(self, now=None):
+        """
+        Removes expired files, then the least recently accessed files until
+        the output folder fits :attr:`max_bytes`. Called by the reaper thread,
+        but may also be called directly.
+
+        Args:
+            now (float or None): Current time, defaults to time.time().
+
+        Returns:
+            int: Number of removed files.
+        """
+        now = time.time() if now is None else now
+        files = self._scan()
+        size = sum(file_size for _, _, file_size in files)
+        removed = 0
+        # files are ordered by last access, oldest first
+        for accessed, name, file_size in files:
+            if self.ttl is not None and accessed < now - self.ttl:
+                reason = "ttl"
+            elif self.max_bytes is not None and size > self.max_bytes:
+                reason = "size"
+            else:
+                break
+            removed += self._evict(name, accessed, reason)
+            size -= file_size
+        if removed:
+            self._forget_evicted()
+        return removed
+
+
+    def stop(self):
+        """
+        Stops the reaper thread for good. Files are still only removed by
+        calling :func:`~reap` directly.
+        """
+        self._stopped.set()
+
+
+    # -------------------------------------------------------------------------
+    # Private helper functions
+    # -------------------------------------------------------------------------
+
+    def _ensure_reaper(self):
+        """
+        Starts the reaper thread on first use. Also restarts it in forked
+        child processes, which do not inherit the parent's threads.
+        Must be called with the lock acquired.
+        """
+        if self._stopped.is_set() or \
+                (self._reaper is not None and self._reaper_pid == os.getpid()):
+            return
+        self._reaper_pid = os.getpid()
+        self._reaper = threading.Thread(target=self._run)
+        self._reaper.daemon = True
+        self._reaper.start()
+
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.reap()
+            except Exception as e:
+                print("Output retention failed: " + repr(e))
+
+
+    def _scan(self):
+        """
+        Returns:
+            list: Tuples (last access, name, size) of the files in the output
+            folder, least recently accessed first.
+        """
+        try:
+            names = os.listdir(self.folder)
+        except OSError:
+            return []
+        files = []
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(self.folder, name))
+            except OSError:
+                continue
+            if stat_module.S_ISREG(stat.st_mode):
+                files.append((_last_access(stat), name, stat.st_size))
+        return sorted(files)
+
+
+    def _evict(self, name, accessed, reason):
+        """
+        Removes a file, unless another process accessed it since it was
+        scanned.
+
+        Returns:
+            int: 1 if the file was removed, 0 otherwise.
+        """
+        path = os.path.join(self.folder, name)
+        try:
+            if _last_access(os.stat(path)) > accessed:
+                return 0
+            os.remove(path)
+        except OSError:
+            return 0
+        try:
+            os.makedirs(os.path.join(self.folder, self.EVICTED_FOLDER))
+        except OSError:
+            # exists already
+            pass
+        try:
+            open(self._evicted_path(name), "w").close()
+        except (IOError, OSError):
+            pass
+        _evictions.inc(reason=reason)
+        return 1
+
+
+    def _forget_evicted(self):
+        """
+        Removes the oldest marker files beyond :attr:`max_evicted`.
+        """
+        evicted_folder = os.path.join(self.folder, self.EVICTED_FOLDER)
+        try:
+            names = os.listdir(evicted_folder)
+        except OSError:
+            return
+        if len(names) <= self.max_evicted:
+            return
+        markers = []
+        for name in names:
+            try:
+                markers.append((os.stat(os.path.join(evicted_folder, name)).st_mtime, name))
+            except OSError:
+                pass
+        for _, name in sorted(markers)[:len(markers) - self.max_evicted]:
+            try:
+                os.remove(os.path.join(evicted_folder, name))
+            except OSError:
+                pass
+
+
+    def _evicted_path(self, name):
+        return os.path.join(self.folder, self.EVICTED_FOLDER, name)
+
+
+
+def _last_access(stat):
+    return max(stat.st_atime, stat.st_mtime)
@@ -0,0 +1,78 @@
+import time
+import threading
+from modelhublib import metrics
+
+
+_coalesced = metrics.registry.counter(
+    "modelhub_predict_coalesced_total",
+    "Predictions which waited for an identical in-flight prediction instead "
+    "of running their own inference.")
+_secondsSaved = metrics.registry.counter(
+    "modelhub_predict_coalesced_seconds_saved_total",
+    "Inference time in seconds saved by waiting for identical in-flight "
+    "predictions.")
+
+
+class SingleFlight(object):
+    """
+    Deduplicates concurrent calls with the same key: while a call for a key
+    is running, further calls for that key do not run their own function, but
+    wait for the running call and receive its result (or its exception).
+    Calls made after the running call finished run again.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+
+    def do(self, key, function):
+        """
+        Args:
+            key (str): Identifies calls that return the same result.
+            function (callable): Called without arguments to compute the
+                result, unless a call for key is already running.
+
+        Returns:
+            The result of function, possibly computed for another caller.
+            Callers sharing a result must not modify it.
+
+        Raises:
+            The exception raised by function.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call()
+                self._calls[key] = call
+        if not is_leader:
+            call.done.wait()
+            _coalesced.inc()
+            _secondsSaved.inc(call.duration)
+            if call.error is not None:
+                raise call.error
+            return call.result
+        start = time.time()
+        try:
+            call.result = function()
+        except Exception as e:
+            call.error = e
+        finally:
+            call.duration = time.time() - start
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+
+
+class _Call(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.duration = 0.0
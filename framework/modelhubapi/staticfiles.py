@@ -0,0 +1,147 @@
+import os
+import io
+import gzip
+import threading
+import mimetypes
+from collections import OrderedDict
+from flask import Response, request, abort
+from .flaskcompat import send_file, safe_join
+from .fingerprint import file_digest
+from .modelarchive import COMPRESSED_EXTENSIONS
+
+
+class StaticFiles(object):
+    """
+    Serves files of the REST API's static routes (samples, thumbnail and
+    outputs).
+
+    Responses carry a strong ETag derived from the file's content, so it
+    stays the same across restarts and replicas of the container, and
+    honor If-None-Match (304) and Range (206) requests. Files that are not
+    compressed already are sent gzip-encoded to clients accepting it,
+    unless a range was requested. Gzipped files are kept in an in-memory LRU
+    cache, so they are compressed only once.
+
+    Args:
+        max_gzip_file_size (int): Larger files are never gzipped.
+        min_gzip_file_size (int): Smaller files are never gzipped, as the
+            saving does not pay off.
+        gzip_cache_bytes (int): Maximum total size of the gzipped files kept
+            in memory.
+        gzip_level (int): Compression level (1-9).
+        max_etags (int): Maximum number of file digests kept in memory.
+    """
+
+    def __init__(self, max_gzip_file_size=8*1024**2, min_gzip_file_size=1024,
+                 gzip_cache_bytes=64*1024**2, gzip_level=6, max_etags=10000):
+        self.max_gzip_file_size = max_gzip_file_size
+        self.min_gzip_file_size = min_gzip_file_size
+        self.gzip_cache_bytes = gzip_cache_bytes
+        self.gzip_level = gzip_level
+        self.max_etags = max_etags
+        self._etags = OrderedDict()
+        self._gzipped = OrderedDict()
+        self._gzipped_size = 0
+        self._lock = threading.Lock()
+
+
+    def send(self, folder, name, max_age=0, private=False, immutable=False):
+        """
+        Sends a file of folder in response to the current request.
+
+        Args:
+            folder (str): Folder to serve files from.
+            name (str): Requested file name. Paths leaving folder are
+                rejected.
+            max_age (int): Seconds clients and proxies may use the file without
+                revalidating it.
+            private (bool): Whether only the client, but no shared cache, may
+                store the file.
+            immutable (bool): Whether the file never changes under its name,
+                so that clients need not revalidate it even on reload.
+
+        Returns:
+            flask.Response: The response, 404 if the file does not exist.
+        """
+        path = safe_join(folder, name)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        stat = os.stat(path)
+        etag = self._etag(path, stat)
+        compressible = self.min_gzip_file_size <= stat.st_size <= self.max_gzip_file_size \
+            and not name.lower().endswith(COMPRESSED_EXTENSIONS)
+        data = None
+        if compressible and request.accept_encodings["gzip"] and \
+                "Range" not in request.headers:
+            data = self._gzip(path, etag)
+        if data is not None:
+            response = Response(data, mimetype=mimetypes.guess_type(name)[0]
+                                or "application/octet-stream")
+            response.content_encoding = "gzip"
+            response.set_etag(etag + "-gzip")
+            response.make_conditional(request)
+        else:
+            response = send_file(path, etag=etag)
+        if compressible:
+            response.vary.add("Accept-Encoding")
+        response.cache_control.max_age = max_age
+        if private:
+            response.cache_control.private = True
+        else:
+            response.cache_control.public = True
+        if immutable:
+            response.cache_control.immutable = True
+        return response
+
+
+    # -------------------------------------------------------------------------
+    # Private helper functions
+    # -------------------------------------------------------------------------
+
+    def _etag(self, path, stat):
+        """
+        Returns the digest of the file's content, which is only computed
+        again if the file's size or modification time changed.
+        """
+        key = (path, stat.st_size, stat.st_mtime, stat.st_ino)
+        with self._lock:
+            etag = self._etags.pop(key, None)
+            if etag is not None:
+                self._etags[key] = etag
+                return etag
+        etag = file_digest(path)[:32]
+        with self._lock:
+            self._etags[key] = etag
+            while len(self._etags) > self.max_etags:
+                self._etags.popitem(last=False)
+        return etag
+
+
+    def _gzip(self, path, etag):
+        """
+        Returns the gzipped content of the file, or None if gzip does not
+        make it notably smaller.
+        """
+        with self._lock:
+            if etag in self._gzipped:
+                data = self._gzipped.pop(etag)
+                self._gzipped[etag] = data
+                return data or None
+        with open(path, "rb") as f:
+            content = f.read()
+        buffer = io.BytesIO()
+        with gzip.GzipFile(fileobj=buffer, mode="wb",
+                           compresslevel=self.gzip_level, mtime=0) as f:
+            f.write(content)
+        data = buffer.getvalue()
+        if len(data) > 0.9 * len(content):
+            # remember incompressible files as empty entry
+            data = b""
+        with self._lock:
+            if etag not in self._gzipped:
+                self._gzipped[etag] = data
+                self._gzipped_size += len(data)
+            while self._gzipped_size > self.gzip_cache_bytes:
+                _, evicted = self._gzipped.popitem(last=False)
+                self._gzipped_size -= len(evicted)
+        return data or None
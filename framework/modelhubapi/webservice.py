@@ -1,14 +1,130 @@
 from .pythonapi import ModelHubAPI
 from .restapi import ModelHubRESTAPI
+from .inputcache import InputCache
 import sys
 import time
 from multiprocessing import Process
 import os
 import glob
 
-def start(model, contribSrcDir):
-    _startWebservice(model, contribSrcDir)
+def start(model, contribSrcDir, maxBatchSize=None, maxBatchWaitMs=10,
+          inMemoryUploadLimit=0, inputCacheDir=None, inputCacheSize=10*1024**3,
+          resultCacheSize=0, resultCacheDir=None, resultCacheDirSize=1024**3,
+          coalesceRequests=False, outputMaxSize=0, outputTtl=0,
+          metadataReloadInterval=2.0, server="flask", workers=2, threads=4,
+          keepAlive=5, workerTimeout=120, gracefulTimeout=30,
+          maxRequestsPerWorker=0, warmUp=False, warmUpInputs=None,
+          warmUpRuns=2, profilingToken=None):
+    """
+    Starts the REST API webservice for the given model.
 
-def _startWebservice(model, contribSrcDir):
+    Args:
+        model (ModelBase): The contributed model.
+        contribSrcDir (str): Path to the contrib_src directory of the model.
+        maxBatchSize (int or None): If set, concurrent predictions are
+            gathered into batches of up to this size and run through the
+            model's infer_batch method. Batching is disabled if None.
+        maxBatchWaitMs (float): Maximum time in milliseconds to wait for
+            further requests before an incomplete batch is run.
+        inMemoryUploadLimit (int): Uploads up to this size in bytes are passed
+            to the model in memory (as file-like object) instead of as file
+            name. Only enable this if the model loads its input through the
+            modelhublib image loaders. Disabled if 0.
+        inputCacheDir (str or None): If set, files downloaded from URLs are
+            cached in a subfolder of this folder and revalidated with
+            conditional GETs when requested again. The subfolder is cleared
+            on start.
+        inputCacheSize (int): Maximum size of the input cache in bytes.
+        resultCacheSize (int): If greater than 0, prediction results are
+            cached in memory up to this size in bytes, and returned for
+            inputs seen before without running inference again.
+        resultCacheDir (str or None): If set, prediction results are also
+            cached in this folder. Enables the result cache as well.
+        resultCacheDirSize (int): Maximum size of the results cached on disk
+            in bytes.
+        coalesceRequests (bool): If True, concurrent predictions on identical
+            inputs share a single inference.
+        outputMaxSize (int): If greater than 0, the least recently accessed
+            output files are removed once the output folder exceeds this size
+            in bytes. Requests for removed outputs return 410.
+        outputTtl (float): If greater than 0, output files are removed once
+            they have not been accessed for this many seconds.
+        metadataReloadInterval (float): Seconds between two checks whether
+            the model configuration, licenses or sample data changed, which
+            are reloaded then. Disabled if 0.
+        server (str): "flask" for flask's development server, or "gunicorn"
+            for gunicorn's pre-forking production server (requires gunicorn,
+            see :mod:`~modelhubapi.gunicornserver`). The following arguments
+            apply to gunicorn only.
+        workers (int): Number of worker processes, which share the model
+            loaded once before they are forked.
+        threads (int): Number of request threads per worker.
+        keepAlive (int): Seconds to keep idle client connections open.
+        workerTimeout (int): Seconds a worker may spend on a request without
+            responding, before it is killed and replaced. Raise this for
+            models whose inference takes longer.
+        gracefulTimeout (int): Seconds workers get to finish their requests
+            on shutdown, before they are killed.
+        maxRequestsPerWorker (int): Number of requests after which a worker is
+            replaced by a fresh one, 0 disables recycling.
+        warmUp (bool): If True, inference is run on warmUpInputs before the
+            server starts listening, and cold and warm latency are logged.
+            With gunicorn, this happens once before the workers are forked.
+        warmUpInputs (list or None): Inputs for the warm-up as accepted by
+            the model (file paths or multi input json files). Defaults to
+            all files in contrib_src/sample_data.
+        warmUpRuns (int): Number of warm-up inferences per input.
+        profilingToken (str or None): If set, clients sending this token
+            can profile single predictions and download the profiles (see
+            :func:`~modelhubapi.restapi.ModelHubRESTAPI.get_profile`). Keep
+            it secret, profiling slows requests down considerably.
+            Disabled if None.
+    """
+    _startWebservice(model, contribSrcDir, maxBatchSize, maxBatchWaitMs,
+                     inMemoryUploadLimit, inputCacheDir, inputCacheSize,
+                     resultCacheSize, resultCacheDir, resultCacheDirSize,
+                     coalesceRequests, outputMaxSize, outputTtl,
+                     metadataReloadInterval, server, workers, threads,
+                     keepAlive, workerTimeout, gracefulTimeout,
+                     maxRequestsPerWorker, warmUp, warmUpInputs, warmUpRuns,
+                     profilingToken)
+
+def _startWebservice(model, contribSrcDir, maxBatchSize, maxBatchWaitMs,
+                     inMemoryUploadLimit, inputCacheDir, inputCacheSize,
+                     resultCacheSize, resultCacheDir, resultCacheDirSize,
+                     coalesceRequests, outputMaxSize, outputTtl,
+                     metadataReloadInterval, server, workers, threads,
+                     keepAlive, workerTimeout, gracefulTimeout,
+                     maxRequestsPerWorker, warmUp, warmUpInputs, warmUpRuns,
+                     profilingToken):
     restApi = ModelHubRESTAPI(model, contribSrcDir)
-    restApi.start()
+    restApi.in_memory_upload_limit = inMemoryUploadLimit
+    restApi.profiling_token = profilingToken
+    if inputCacheDir:
+        restApi.downloads.cache = InputCache(inputCacheDir, inputCacheSize)
+    if maxBatchSize:
+        restApi.api.enable_batching(maxBatchSize, maxBatchWaitMs)
+    if resultCacheSize > 0 or resultCacheDir:
+        restApi.api.enable_result_cache(resultCacheSize, resultCacheDir,
+                                        resultCacheDirSize)
+    if coalesceRequests:
+        restApi.api.enable_request_coalescing()
+    if outputMaxSize > 0 or outputTtl > 0:
+        restApi.api.enable_output_retention(outputMaxSize or None,
+                                            outputTtl or None)
+    if metadataReloadInterval > 0:
+        restApi.api.enable_metadata_reload(metadataReloadInterval)
+    if warmUp:
+        restApi.api.warm_up(warmUpInputs, warmUpRuns)
+    if server == "gunicorn":
+        restApi.start_gunicorn(workers=workers, threads=threads,
+                               keepalive=keepAlive,
+                               timeout=workerTimeout,
+                               graceful_timeout=gracefulTimeout,
+                               max_requests=maxRequestsPerWorker,
+                               max_requests_jitter=maxRequestsPerWorker // 10)
+    elif server == "flask":
+        restApi.start()
+    else:
+        raise ValueError("Unknown server \"%s\", use \"flask\" or "
+                         "\"gunicorn\"." % server)
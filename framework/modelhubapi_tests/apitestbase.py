@@ -96,6 +96,7 @@ class TestRESTAPIBase(TestAPIBase):
         rest_api = ModelHubRESTAPI(model, self.contrib_src_dir)
         rest_api.working_folder = self.temp_work_dir
         rest_api.api.output_folder = self.temp_output_dir
+        self.rest_api = rest_api
         app = rest_api.app
         app.config["TESTING"] = True
         self.client = app.test_client()
@@ -0,0 +1,129 @@
+import unittest
+import os
+import shutil
+import threading
+from modelhubapi import ModelHubAPI
+from modelhubapi.batching import BatchScheduler
+from .apitestbase import TestAPIBase
+from .mockmodels.contrib_src_si.inference import Model, ModelWithBatchInference
+from .mockmodels.contrib_src_si.inference import ModelThrowingError
+
+
+class TestBatchScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.this_dir = os.path.dirname(os.path.realpath(__file__))
+        self.sample = os.path.join(self.this_dir, "mockmodels", "contrib_src_si",
+                                   "sample_data", "testimage_ramp_4x2.png")
+
+    def tearDown(self):
+        pass
+
+    def _infer_concurrently(self, scheduler, inputs):
+        results = [None] * len(inputs)
+        def run(i):
+            try:
+                results[i] = scheduler.infer(inputs[i])
+            except Exception as e:
+                results[i] = e
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(len(inputs))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_default_infer_batch_calls_infer_per_input(self):
+        model = Model()
+        outputs = model.infer_batch([self.sample, self.sample])
+        self.assertEqual(2, len(outputs))
+        self.assertEqual("class_0", outputs[0][0][0]["label"])
+
+    def test_concurrent_requests_are_batched(self):
+        model = ModelWithBatchInference()
+        scheduler = BatchScheduler(model, max_batch_size=8, max_wait_ms=500)
+        results = self._infer_concurrently(scheduler, [self.sample] * 4)
+        self.assertEqual(4, sum(model.batch_sizes))
+        self.assertGreater(max(model.batch_sizes), 1)
+        for result in results:
+            self.assertEqual("class_1", result[0][1]["label"])
+
+    def test_batch_size_is_bounded(self):
+        model = ModelWithBatchInference(delay=0.05)
+        scheduler = BatchScheduler(model, max_batch_size=2, max_wait_ms=200)
+        self._infer_concurrently(scheduler, [self.sample] * 5)
+        self.assertEqual(5, sum(model.batch_sizes))
+        self.assertLessEqual(max(model.batch_sizes), 2)
+
+    def test_faulty_input_does_not_fail_other_requests(self):
+        model = ModelWithBatchInference()
+        scheduler = BatchScheduler(model, max_batch_size=8, max_wait_ms=500)
+        results = self._infer_concurrently(scheduler, [self.sample, "NON_EXISTENT.png"])
+        self.assertEqual("class_0", results[0][0][0]["label"])
+        self.assertIsInstance(results[1], IOError)
+
+    def test_model_error_is_raised_to_caller(self):
+        scheduler = BatchScheduler(ModelThrowingError(), max_wait_ms=1)
+        self.assertRaises(NotImplementedError, scheduler.infer, self.sample)
+
+    def test_model_exiting_fails_batch_and_keeps_scheduler_running(self):
+        model = ModelWithBatchInference()
+        infer = model.infer
+        def exit_on_request(input):
+            if input == "EXIT":
+                raise SystemExit("Model exited.")
+            return infer(input)
+        model.infer = exit_on_request
+        scheduler = BatchScheduler(model, max_wait_ms=1)
+        self.assertRaises(SystemExit, scheduler.infer, "EXIT")
+        self.assertEqual("class_0", scheduler.infer(self.sample)[0][0]["label"])
+
+    def test_invalid_max_batch_size_raises(self):
+        self.assertRaises(ValueError, BatchScheduler, Model(), 0)
+
+
+
+class TestModelHubAPIBatching(TestAPIBase):
+
+    def setUp(self):
+        self.model = ModelWithBatchInference()
+        self.this_dir = os.path.dirname(os.path.realpath(__file__))
+        contrib_src_dir = os.path.join(self.this_dir, "mockmodels", "contrib_src_si")
+        self.api = ModelHubAPI(self.model, contrib_src_dir)
+        self.api.enable_batching(max_batch_size=4, max_wait_ms=200)
+        self.setup_self_temp_output_dir()
+        self.api.output_folder = self.temp_output_dir
+        self.sample = contrib_src_dir + "/sample_data/testimage_ramp_4x2.png"
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_output_dir, ignore_errors=True)
+
+    def test_predict_returns_expected_mock_prediction(self):
+        result = self.api.predict(self.sample)
+        self.assert_predict_contains_expected_mock_prediction(result)
+        self.assert_predict_contains_expected_mock_meta_info(result)
+        self.assertIn("processing_time", result)
+
+    def test_concurrent_predicts_return_own_results(self):
+        results = [None] * 4
+        def run(i):
+            results[i] = self.api.predict(self.sample, numpyToFile=False)
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertGreater(max(self.model.batch_sizes), 1)
+        for result in results:
+            self.assert_predict_contains_expected_mock_prediction(result, expectList=True)
+
+    def test_disable_batching_calls_model_directly(self):
+        self.api.disable_batching()
+        result = self.api.predict(self.sample)
+        self.assert_predict_contains_expected_mock_prediction(result)
+        self.assertListEqual([], self.model.batch_sizes)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+import unittest
+import os
+import json
+import time
+import shutil
+import tempfile
+import requests
+from modelhubapi.downloads import DownloadManager, DownloadError
+from modelhubapi_tests.mockmodels.contrib_src_si.inference import Model
+from modelhubapi_tests.mockmodels.contrib_src_mi.inference import ModelNeedsTwoInputs
+from .apitestbase import TestRESTAPIBase
+from .mockserver import MockFileServer
+
+
+class TestDownloadManager(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.server = MockFileServer({
+            "/image.png": {"body": b"png data", "content_type": "image/png"},
+            "/slow.png": {"body": b"png data", "content_type": "image/png", "delay": 0.3},
+            "/page.html": {"body": b"<html></html>", "content_type": "text/html; charset=utf-8"},
+            "/data.bin": {"body": b"binary data"},
+            "/image.jpg": {"body": b"jpeg data", "content_type": "image/jpg"},
+            "/image.nii": {"body": b"nifti data", "content_type": "image/x-nifti"},
+            "/big.png": {"body": b"", "content_type": "image/png", "content_length": 10**9},
+            "/nohead.png": {"body": b"png data", "content_type": "image/png", "head_status": 405},
+        }).start()
+        self.downloads = DownloadManager(max_size=1024)
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _file_name(self, name="download"):
+        return os.path.join(self.temp_dir, name)
+
+    def _requested_paths(self, method):
+        return [path for m, path, _ in self.server.requests if m == method]
+
+    def test_download_saves_content(self):
+        file_name = self.downloads.download(self.server.url("/image.png"), self._file_name())
+        with open(file_name, "rb") as f:
+            self.assertEqual(b"png data", f.read())
+
+    def test_download_checks_with_head_before_get(self):
+        self.downloads.download(self.server.url("/image.png"), self._file_name())
+        self.assertListEqual([("HEAD", "/image.png"), ("GET", "/image.png")],
+                             [(m, path) for m, path, _ in self.server.requests])
+
+    def test_oversized_input_is_rejected_before_transfer(self):
+        self.assertRaises(DownloadError, self.downloads.download,
+                          self.server.url("/big.png"), self._file_name())
+        self.assertListEqual([], self._requested_paths("GET"))
+        self.assertFalse(os.path.exists(self._file_name()))
+
+    def test_wrong_content_type_is_rejected_before_transfer(self):
+        self.assertRaises(DownloadError, self.downloads.download,
+                          self.server.url("/page.html"), self._file_name(), ["image/png"])
+        self.assertListEqual([], self._requested_paths("GET"))
+
+    def test_generic_content_type_is_accepted(self):
+        self.downloads.download(self.server.url("/data.bin"), self._file_name(), ["image/png"])
+        self.assertTrue(os.path.isfile(self._file_name()))
+
+    def test_aliases_of_allowed_content_types_are_accepted(self):
+        self.downloads.download(self.server.url("/image.jpg"), self._file_name("jpg"),
+                                ["image/jpeg"])
+        self.downloads.download(self.server.url("/image.nii"), self._file_name("nii"),
+                                ["application/nii-gzip"])
+        self.assertTrue(os.path.isfile(self._file_name("jpg")))
+        self.assertTrue(os.path.isfile(self._file_name("nii")))
+        self.assertRaises(DownloadError, self.downloads.download,
+                          self.server.url("/image.jpg"), self._file_name(), ["image/png"])
+
+    def test_server_without_head_support_is_asked_with_get(self):
+        self.downloads.download(self.server.url("/nohead.png"), self._file_name(), ["image/png"])
+        self.assertTrue(os.path.isfile(self._file_name()))
+
+    def test_missing_file_raises(self):
+        self.assertRaises(DownloadError, self.downloads.download,
+                          self.server.url("/missing.png"), self._file_name())
+
+    def test_read_timeout_raises(self):
+        self.downloads.read_timeout = 0.05
+        self.assertRaises(requests.exceptions.RequestException, self.downloads.download,
+                          self.server.url("/slow.png"), self._file_name())
+        self.assertFalse(os.path.exists(self._file_name()))
+
+    def test_connections_are_reused(self):
+        for i in range(3):
+            self.downloads.download(self.server.url("/image.png"), self._file_name(str(i)))
+        client_ports = set(port for _, _, port in self.server.requests)
+        self.assertEqual(1, len(client_ports))
+
+    def test_download_many_runs_concurrently(self):
+        downloads = [(self.server.url("/slow.png"), self._file_name(str(i)), None)
+                     for i in range(3)]
+        start = time.time()
+        file_names = self.downloads.download_many(downloads)
+        self.assertLess(time.time() - start, 0.8)
+        self.assertListEqual([args[1] for args in downloads], file_names)
+        for file_name in file_names:
+            self.assertTrue(os.path.isfile(file_name))
+
+    def test_download_many_raises_on_failed_download(self):
+        downloads = [(self.server.url("/image.png"), self._file_name("1"), None),
+                     (self.server.url("/missing.png"), self._file_name("2"), None)]
+        self.assertRaises(DownloadError, self.downloads.download_many, downloads)
+
+
+
+class TestModelHubRESTAPIDownloads(TestRESTAPIBase):
+
+    def setUp(self):
+        self.this_dir = os.path.dirname(os.path.realpath(__file__))
+        self.testdata_dir = os.path.join(self.this_dir, "..", "modelhublib_tests", "testdata")
+        self.setup_self_temp_work_dir()
+        self.setup_self_temp_output_dir()
+        with open(os.path.join(self.testdata_dir, "testimage_ramp_4x2.png"), "rb") as f:
+            png = f.read()
+        with open(os.path.join(self.testdata_dir, "testimage_nifti_91x109x91.nii.gz"), "rb") as f:
+            nifti = f.read()
+        self.server = MockFileServer({
+            "/testimage_ramp_4x2.png": {"body": png, "content_type": "image/png"},
+            "/page.html": {"body": b"<html></html>", "content_type": "text/html"},
+            "/testimage.nii.gz": {"body": nifti, "delay": 0.2},
+        }).start()
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.temp_work_dir, ignore_errors=True)
+        shutil.rmtree(self.temp_output_dir, ignore_errors=True)
+
+    def _setup_si_client(self):
+        self.contrib_src_dir = os.path.join(self.this_dir, "mockmodels", "contrib_src_si")
+        self.setup_self_test_client(Model(), self.contrib_src_dir)
+
+    def _setup_mi_client(self):
+        self.contrib_src_dir = os.path.join(self.this_dir, "mockmodels", "contrib_src_mi")
+        self.setup_self_test_client(ModelNeedsTwoInputs(), self.contrib_src_dir)
+
+    def test_predict_by_url_returns_expected_mock_prediction(self):
+        self._setup_si_client()
+        response = self.client.get("/api/predict?fileurl=" +
+                                   self.server.url("/testimage_ramp_4x2.png"))
+        self.assertEqual(200, response.status_code)
+        self.assert_predict_contains_expected_mock_prediction(json.loads(response.get_data()))
+        self.assertEqual(len(os.listdir(self.temp_work_dir)), 0)
+
+    def test_predict_by_url_rejects_wrong_content_type(self):
+        self._setup_si_client()
+        response = self.client.get("/api/predict?fileurl=" + self.server.url("/page.html"))
+        self.assertEqual(400, response.status_code)
+        error = json.loads(response.get_data())["error"]
+        self.assertIn("Incorrect file type.", error)
+        self.assertIn("text/html", error)
+
+    def test_multi_input_urls_are_downloaded_concurrently(self):
+        self._setup_mi_client()
+        input_dict = {"format": ["application/json"]}
+        for key in ["t1", "t1c", "t2", "flair"]:
+            input_dict[key] = {"type": ["application/nii-gzip"],
+                               "fileurl": self.server.url("/testimage.nii.gz")}
+        self.server.routes["/inputs.json"] = {"body": json.dumps(input_dict).encode("utf-8"),
+                                              "content_type": "application/json"}
+        start = time.time()
+        response = self.client.get("/api/predict?fileurl=" + self.server.url("/inputs.json"))
+        self.assertEqual(200, response.status_code)
+        self.assertLess(time.time() - start, 0.6)
+        self.assertEqual(len(os.listdir(self.temp_work_dir)), 0)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
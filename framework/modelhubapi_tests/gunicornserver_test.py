@@ -0,0 +1,113 @@
+import unittest
+import os
+import json
+import time
+import shutil
+import signal
+import socket
+import tempfile
+import multiprocessing
+import requests
+from modelhubapi import ModelHubAPI, ModelHubRESTAPI
+from modelhubapi import gunicornserver
+from .mockmodels.contrib_src_si.inference import Model
+
+
+def free_port():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def serve(contrib_src_dir, temp_dir, port):
+    rest_api = ModelHubRESTAPI(Model(), contrib_src_dir)
+    rest_api.working_folder = temp_dir
+    rest_api.api.output_folder = temp_dir
+    rest_api.api.enable_metadata_reload(interval=60)
+    gunicornserver.serve(rest_api, "127.0.0.1", port, workers=2, threads=2)
+
+
+
+class TestModelHubAPIAfterFork(unittest.TestCase):
+
+    def setUp(self):
+        self.this_dir = os.path.dirname(os.path.realpath(__file__))
+        self.contrib_src_dir = os.path.join(self.this_dir, "mockmodels", "contrib_src_si")
+        self.temp_dir = tempfile.mkdtemp()
+        self.api = ModelHubAPI(Model(), self.contrib_src_dir)
+        self.api.output_folder = self.temp_dir
+
+    def tearDown(self):
+        self.api.disable_metadata_reload()
+        self.api.disable_output_retention()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_after_fork_replaces_background_services(self):
+        self.api.enable_metadata_reload(interval=30)
+        self.api.enable_output_retention(max_bytes=100, ttl=60, interval=10)
+        metadata_watcher = self.api.metadata_watcher
+        output_retention = self.api.output_retention
+        self.api.after_fork()
+        self.assertIsNot(metadata_watcher, self.api.metadata_watcher)
+        self.assertIsNot(output_retention, self.api.output_retention)
+        self.assertEqual(30, self.api.metadata_watcher.interval)
+        self.assertEqual((100, 60, 10), (self.api.output_retention.max_bytes,
+                                         self.api.output_retention.ttl,
+                                         self.api.output_retention.interval))
+
+    def test_after_fork_keeps_disabled_services_disabled(self):
+        self.api.after_fork()
+        self.assertIsNone(self.api.metadata_watcher)
+        self.assertIsNone(self.api.output_retention)
+
+
+
+@unittest.skipIf(gunicornserver.BaseApplication is None, "gunicorn is not installed")
+class TestGunicornServer(unittest.TestCase):
+
+    def setUp(self):
+        self.this_dir = os.path.dirname(os.path.realpath(__file__))
+        self.contrib_src_dir = os.path.join(self.this_dir, "mockmodels", "contrib_src_si")
+        self.temp_dir = tempfile.mkdtemp()
+        self.port = free_port()
+        self.server = multiprocessing.Process(target=serve, args=(self.contrib_src_dir,
+                                                                  self.temp_dir, self.port))
+        self.server.start()
+        self.url = "http://127.0.0.1:%d/api/" % self.port
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            try:
+                requests.get(self.url + "get_config", timeout=1)
+                break
+            except requests.ConnectionError:
+                time.sleep(0.1)
+
+    def tearDown(self):
+        if self.server.is_alive():
+            self.server.terminate()
+            self.server.join(30)
+        if self.server.is_alive():
+            os.kill(self.server.pid, signal.SIGKILL)
+            self.server.join()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_workers_serve_predictions(self):
+        for _ in range(4):
+            response = requests.get(self.url + "predict_sample?filename=testimage_ramp_4x2.png",
+                                    timeout=10)
+            self.assertEqual(200, response.status_code)
+            result = json.loads(response.text)
+            self.assertEqual("MockId", result["model"]["id"])
+
+    def test_sigterm_shuts_down_gracefully(self):
+        os.kill(self.server.pid, signal.SIGTERM)
+        self.server.join(30)
+        self.assertFalse(self.server.is_alive())
+        self.assertEqual(0, self.server.exitcode)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
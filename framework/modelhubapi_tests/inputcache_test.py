@@ -0,0 +1,142 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from modelhublib import metrics
+from modelhubapi.downloads import DownloadManager
+from modelhubapi.inputcache import InputCache
+from modelhubapi_tests.mockmodels.contrib_src_si.inference import Model
+from .apitestbase import TestRESTAPIBase
+from .mockserver import MockFileServer
+
+
+class TestInputCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.temp_dir, "cache")
+        self.server = MockFileServer({
+            "/a.png": {"body": b"content a", "etag": '"a1"'},
+            "/a_copy.png": {"body": b"content a", "etag": '"a1"'},
+            "/b.png": {"body": b"content b", "etag": '"b1"'},
+            "/unversioned.png": {"body": b"content"},
+        }).start()
+        self.downloads = DownloadManager()
+        self.downloads.cache = InputCache(self.cache_dir, max_bytes=1024)
+        self.cache_requests = metrics.registry.counter(
+            "modelhub_input_cache_requests_total", "", ("result",))
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _download(self, path, name):
+        file_name = os.path.join(self.temp_dir, name)
+        self.downloads.download(self.server.url(path), file_name)
+        with open(file_name, "rb") as f:
+            return f.read()
+
+    def _requests(self):
+        return [(method, path) for method, path, _ in self.server.requests]
+
+    def test_cached_input_is_revalidated_instead_of_downloaded(self):
+        hits = self.cache_requests.get(result="hit")
+        self._download("/a.png", "first")
+        del self.server.requests[:]
+        self.assertEqual(b"content a", self._download("/a.png", "second"))
+        self.assertListEqual([("GET", "/a.png")], self._requests())
+        self.assertEqual(hits + 1, self.cache_requests.get(result="hit"))
+
+    def test_cached_input_is_linked_not_copied(self):
+        self._download("/a.png", "first")
+        self._download("/a.png", "second")
+        self.assertEqual(3, os.stat(os.path.join(self.temp_dir, "second")).st_nlink)
+
+    def test_changed_input_is_downloaded_again(self):
+        self._download("/a.png", "first")
+        self.server.routes["/a.png"] = {"body": b"content a2", "etag": '"a2"'}
+        stale = self.cache_requests.get(result="stale")
+        self.assertEqual(b"content a2", self._download("/a.png", "second"))
+        self.assertEqual(stale + 1, self.cache_requests.get(result="stale"))
+        self.assertEqual('"a2"', self.downloads.cache.lookup(self.server.url("/a.png"))["etag"])
+
+    def test_urls_with_same_content_share_cached_file(self):
+        self._download("/a.png", "first")
+        self._download("/a_copy.png", "second")
+        self.assertEqual(1, len(os.listdir(self.downloads.cache.folder)))
+
+    def test_input_without_validators_is_not_cached(self):
+        self._download("/unversioned.png", "first")
+        self.assertIsNone(self.downloads.cache.lookup(self.server.url("/unversioned.png")))
+        self.assertEqual(0, len(os.listdir(self.downloads.cache.folder)))
+
+    def test_least_recently_used_input_is_evicted(self):
+        self.downloads.cache.max_bytes = 2 * len(b"content a")
+        self.server.routes["/c.png"] = {"body": b"content c", "etag": '"c1"'}
+        self._download("/a.png", "1")
+        self._download("/b.png", "2")
+        self._download("/a.png", "3")
+        self._download("/c.png", "4")
+        self.assertIsNotNone(self.downloads.cache.lookup(self.server.url("/a.png")))
+        self.assertIsNone(self.downloads.cache.lookup(self.server.url("/b.png")))
+        self.assertEqual(2, len(os.listdir(self.downloads.cache.folder)))
+
+    def test_removed_cache_file_is_downloaded_again(self):
+        self._download("/a.png", "first")
+        for name in os.listdir(self.downloads.cache.folder):
+            os.remove(os.path.join(self.downloads.cache.folder, name))
+        self.assertEqual(b"content a", self._download("/a.png", "second"))
+
+    def test_cache_folder_is_cleared_on_creation(self):
+        self._download("/a.png", "first")
+        InputCache(self.cache_dir)
+        self.assertEqual(0, len(os.listdir(self.downloads.cache.folder)))
+
+    def test_other_files_in_folder_are_kept(self):
+        file_name = os.path.join(self.cache_dir, "data.nii")
+        with open(file_name, "w") as f:
+            f.write("not a cached input")
+        InputCache(self.cache_dir)
+        self.assertTrue(os.path.isfile(file_name))
+
+
+
+class TestModelHubRESTAPIInputCache(TestRESTAPIBase):
+
+    def setUp(self):
+        self.this_dir = os.path.dirname(os.path.realpath(__file__))
+        self.contrib_src_dir = os.path.join(self.this_dir, "mockmodels", "contrib_src_si")
+        self.setup_self_temp_work_dir()
+        self.setup_self_temp_output_dir()
+        self.setup_self_test_client(Model(), self.contrib_src_dir)
+        self.cache_dir = tempfile.mkdtemp()
+        self.rest_api.downloads.cache = InputCache(self.cache_dir)
+        with open(os.path.join(self.contrib_src_dir, "sample_data", "testimage_ramp_4x2.png"), "rb") as f:
+            self.server = MockFileServer({
+                "/testimage_ramp_4x2.png": {"body": f.read(), "content_type": "image/png",
+                                            "etag": '"ramp"'}
+            }).start()
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        shutil.rmtree(self.temp_work_dir, ignore_errors=True)
+        shutil.rmtree(self.temp_output_dir, ignore_errors=True)
+
+    def test_repeated_predict_by_url_uses_cached_input(self):
+        url = "/api/predict?fileurl=" + self.server.url("/testimage_ramp_4x2.png")
+        self.client.get(url)
+        del self.server.requests[:]
+        response = self.client.get(url)
+        self.assertEqual(200, response.status_code)
+        self.assert_predict_contains_expected_mock_prediction(json.loads(response.get_data()))
+        self.assertListEqual([("GET", "/testimage_ramp_4x2.png")],
+                             [(method, path) for method, path, _ in self.server.requests])
+        self.assertEqual(len(os.listdir(self.temp_work_dir)), 0)
+        self.assertEqual(1, len(os.listdir(self.rest_api.downloads.cache.folder)))
+
+
+
+if __name__ == '__main__':
+    unittest.main()
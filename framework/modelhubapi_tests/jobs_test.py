@@ -0,0 +1,169 @@
+import unittest
+import os
+import io
+import json
+import time
+import shutil
+import threading
+from modelhubapi.jobs import InProcessJobQueue, JobQueueFull, JobQueue
+from modelhubapi_tests.mockmodels.contrib_src_si.inference import Model
+from .apitestbase import TestRESTAPIBase
+
+
+def wait_for_job(get_job, job_id, timeout = 5.0):
+    deadline = time.time() + timeout
+    job = get_job(job_id)
+    while job["status"] in ("queued", "running") and time.time() < deadline:
+        time.sleep(0.01)
+        job = get_job(job_id)
+    return job
+
+
+
+class TestInProcessJobQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+
+    def _blocking_handler(self, spec):
+        self.release.wait()
+        return {"echo": spec["value"]}
+
+    def test_interface_is_abstract(self):
+        queue = JobQueue(None)
+        self.assertRaises(NotImplementedError, queue.submit, {})
+        self.assertRaises(NotImplementedError, queue.get, "id")
+        self.assertRaises(NotImplementedError, queue.cancel, "id")
+
+    def test_job_result_is_available_when_done(self):
+        queue = InProcessJobQueue(lambda spec: {"echo": spec["value"]})
+        job_id = queue.submit({"value": 42})
+        job = wait_for_job(queue.get, job_id)
+        self.assertEqual("done", job["status"])
+        self.assertEqual({"echo": 42}, job["result"])
+        self.assertIsNotNone(job["started"])
+        self.assertIsNotNone(job["finished"])
+
+    def test_error_result_marks_job_failed(self):
+        queue = InProcessJobQueue(lambda spec: {"error": "mock error"})
+        job = wait_for_job(queue.get, queue.submit({}))
+        self.assertEqual("failed", job["status"])
+        self.assertEqual("mock error", job["result"]["error"])
+
+    def test_handler_exception_marks_job_failed(self):
+        def handler(spec):
+            raise IOError("mock error")
+        queue = InProcessJobQueue(handler)
+        job = wait_for_job(queue.get, queue.submit({}))
+        self.assertEqual("failed", job["status"])
+        self.assertIn("mock error", job["result"]["error"])
+
+    def test_unknown_job_returns_none(self):
+        queue = InProcessJobQueue(self._blocking_handler)
+        self.assertIsNone(queue.get("unknown"))
+        self.assertIsNone(queue.cancel("unknown"))
+
+    def test_queued_job_can_be_cancelled(self):
+        queue = InProcessJobQueue(self._blocking_handler, num_workers=1)
+        queue.submit({"value": 1})
+        job_id = queue.submit({"value": 2})
+        self.assertEqual({"value": 2}, queue.cancel(job_id))
+        self.assertEqual("cancelled", queue.get(job_id)["status"])
+        self.assertIsNone(queue.cancel(job_id))
+
+    def test_running_job_cannot_be_cancelled(self):
+        queue = InProcessJobQueue(self._blocking_handler, num_workers=1)
+        job_id = queue.submit({"value": 1})
+        while queue.get(job_id)["status"] != "running":
+            time.sleep(0.01)
+        self.assertIsNone(queue.cancel(job_id))
+
+    def test_submit_raises_if_queue_is_full(self):
+        queue = InProcessJobQueue(self._blocking_handler, num_workers=1, max_pending=1)
+        first_job_id = queue.submit({"value": 1})
+        while queue.get(first_job_id)["status"] != "running":
+            time.sleep(0.01)
+        queue.submit({"value": 2})
+        self.assertRaises(JobQueueFull, queue.submit, {"value": 3})
+
+    def test_oldest_finished_jobs_are_forgotten(self):
+        queue = InProcessJobQueue(lambda spec: {}, num_workers=1, max_finished=2)
+        job_ids = [queue.submit({}) for _ in range(3)]
+        wait_for_job(queue.get, job_ids[-1])
+        self.assertIsNone(queue.get(job_ids[0]))
+        self.assertEqual("done", queue.get(job_ids[1])["status"])
+
+
+
+class TestModelHubRESTAPIJobs(TestRESTAPIBase):
+
+    def setUp(self):
+        self.this_dir = os.path.dirname(os.path.realpath(__file__))
+        self.contrib_src_dir = os.path.join(self.this_dir, "mockmodels", "contrib_src_si")
+        self.setup_self_temp_work_dir()
+        self.setup_self_temp_output_dir()
+        self.setup_self_test_client(Model(), self.contrib_src_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_work_dir, ignore_errors=True)
+        shutil.rmtree(self.temp_output_dir, ignore_errors=True)
+
+    def _submit_sample_image(self, sample_image_name):
+        test_filename = self.contrib_src_dir + "/sample_data/" + sample_image_name
+        with open(test_filename, "rb") as f:
+            image_data = io.BytesIO(f.read())
+        return self.client.post("/api/jobs",
+                                data = {'file': (image_data, 'test_image.png')},
+                                content_type = 'multipart/form-data')
+
+    def _get_job(self, job_id):
+        return json.loads(self.client.get("/api/jobs/" + job_id).get_data())
+
+    def test_submit_returns_job_id(self):
+        response = self._submit_sample_image("testimage_ramp_4x2.png")
+        self.assertEqual(202, response.status_code)
+        result = json.loads(response.get_data())
+        self.assertIn("job_id", result)
+        self.assertTrue(result["url"].endswith("/api/jobs/" + result["job_id"]))
+
+    def test_finished_job_returns_expected_mock_prediction(self):
+        response = self._submit_sample_image("testimage_ramp_4x2.png")
+        job_id = json.loads(response.get_data())["job_id"]
+        job = wait_for_job(self._get_job, job_id)
+        self.assertEqual("done", job["status"])
+        self.assert_predict_contains_expected_mock_prediction(job["result"])
+        self.assert_predict_contains_expected_mock_meta_info(job["result"])
+
+    def test_working_folder_empty_after_job(self):
+        response = self._submit_sample_image("testimage_ramp_4x2.png")
+        wait_for_job(self._get_job, json.loads(response.get_data())["job_id"])
+        self.assertEqual(len(os.listdir(self.temp_work_dir)), 0)
+
+    def test_submit_returns_error_on_unsupported_file_type(self):
+        response = self._submit_sample_image("testimage_ramp_4x2.jpg")
+        self.assertEqual(400, response.status_code)
+        self.assertIn("Incorrect file type.", json.loads(response.get_data())["error"])
+        self.assertEqual(len(os.listdir(self.temp_work_dir)), 0)
+
+    def test_get_unknown_job_returns_404(self):
+        response = self.client.get("/api/jobs/unknown")
+        self.assertEqual(404, response.status_code)
+
+    def test_cancel_unknown_job_returns_404(self):
+        response = self.client.delete("/api/jobs/unknown")
+        self.assertEqual(404, response.status_code)
+
+    def test_cancel_finished_job_returns_409(self):
+        response = self._submit_sample_image("testimage_ramp_4x2.png")
+        job_id = json.loads(response.get_data())["job_id"]
+        wait_for_job(self._get_job, job_id)
+        response = self.client.delete("/api/jobs/" + job_id)
+        self.assertEqual(409, response.status_code)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
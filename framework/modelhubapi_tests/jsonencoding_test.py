@@ -0,0 +1,168 @@
+import unittest
+import os
+import json
+import base64
+import shutil
+import tempfile
+import numpy as np
+from modelhubapi import ModelHubAPI
+from modelhubapi.jsonencoding import encode_array, NumpyJSONEncoder
+from .apitestbase import TestRESTAPIBase
+from .mockmodels.contrib_src_si.inference import Model
+
+
+def decode_array(encoded):
+    return np.frombuffer(base64.b64decode(encoded["data"]),
+                         encoded["dtype"]).reshape(encoded["shape"])
+
+
+class ModelReturnsNumpyScalars(Model):
+
+    def infer(self, input):
+        label_list, mask = super(ModelReturnsNumpyScalars, self).infer(input)
+        label_list[1]["probability"] = np.float32(0.75)
+        return [label_list, mask]
+
+
+
+class TestJSONEncoding(unittest.TestCase):
+
+    def test_list_encoding(self):
+        array = np.asarray([[0,1,1,0],[0,2,2,0]])
+        self.assertListEqual([[0,1,1,0],[0,2,2,0]], encode_array(array))
+
+    def test_base64_encoding_round_trips(self):
+        array = np.arange(24, dtype=np.float32).reshape((2, 3, 4))
+        encoded = encode_array(array, "base64")
+        self.assertEqual("base64", encoded["encoding"])
+        self.assertEqual("<f4", encoded["dtype"])
+        self.assertListEqual([2, 3, 4], encoded["shape"])
+        np.testing.assert_array_equal(array, decode_array(encoded))
+
+    def test_base64_encoding_of_non_contiguous_array(self):
+        array = np.arange(12, dtype=np.int16).reshape((3, 4)).T
+        np.testing.assert_array_equal(array, decode_array(encode_array(array, "base64")))
+
+    def test_base64_encoding_keeps_byte_order(self):
+        array = np.arange(4, dtype=">u2")
+        encoded = encode_array(array, "base64")
+        self.assertEqual(">u2", encoded["dtype"])
+        np.testing.assert_array_equal(array, decode_array(encoded))
+
+    def test_object_arrays_are_encoded_as_list(self):
+        array = np.asarray(["a", None], dtype=object)
+        self.assertListEqual(["a", None], encode_array(array, "base64"))
+
+    def test_unknown_encoding_raises(self):
+        self.assertRaises(ValueError, encode_array, np.zeros(2), "hex")
+
+    def test_encoder_handles_nested_numpy_values(self):
+        content = {"output": [{"probability": np.float32(0.5),
+                               "count": np.int64(3),
+                               "valid": np.bool_(True),
+                               "mask": np.zeros((2, 2), dtype=np.uint8)}]}
+        decoded = json.loads(json.dumps(content, cls=NumpyJSONEncoder))
+        self.assertDictEqual({"probability": 0.5, "count": 3, "valid": True,
+                              "mask": [[0, 0], [0, 0]]}, decoded["output"][0])
+        decoded = json.loads(json.dumps(content, cls=NumpyJSONEncoder,
+                                        numpy_encoding="base64"))
+        np.testing.assert_array_equal(content["output"][0]["mask"],
+                                      decode_array(decoded["output"][0]["mask"]))
+
+    def test_encoder_still_rejects_unknown_types(self):
+        self.assertRaises(TypeError, json.dumps, {"value": object()}, cls=NumpyJSONEncoder)
+
+
+
+class TestModelHubAPIJSONEncoding(unittest.TestCase):
+
+    def setUp(self):
+        self.this_dir = os.path.dirname(os.path.realpath(__file__))
+        self.contrib_src_dir = os.path.join(self.this_dir, "mockmodels", "contrib_src_si")
+        self.temp_dir = tempfile.mkdtemp()
+        self.api = ModelHubAPI(Model(), self.contrib_src_dir)
+        self.api.output_folder = self.temp_dir
+        self.input_file = self.contrib_src_dir + "/sample_data/testimage_ramp_4x2.png"
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_predict_returns_base64_encoded_numpy_output(self):
+        result = self.api.predict(self.input_file, numpyToFile=False,
+                                  numpy_encoding="base64")
+        prediction = result["output"][1]["prediction"]
+        self.assertListEqual([[0,1,1,0],[0,2,2,0]], decode_array(prediction).tolist())
+        self.assertListEqual([2,4], result["output"][1]["shape"])
+        self.assertListEqual([], os.listdir(self.temp_dir))
+
+    def test_predict_returns_list_by_default(self):
+        result = self.api.predict(self.input_file, numpyToFile=False)
+        self.assertListEqual([[0,1,1,0],[0,2,2,0]], result["output"][1]["prediction"])
+
+    def test_cached_results_depend_on_encoding(self):
+        self.api.enable_result_cache()
+        listed = self.api.predict(self.input_file, numpyToFile=False)
+        encoded = self.api.predict(self.input_file, numpyToFile=False,
+                                   numpy_encoding="base64")
+        self.assertIsInstance(listed["output"][1]["prediction"], list)
+        self.assertIsInstance(encoded["output"][1]["prediction"], dict)
+
+
+
+class TestModelHubRESTAPIJSONEncoding(TestRESTAPIBase):
+
+    def setUp(self):
+        self.this_dir = os.path.dirname(os.path.realpath(__file__))
+        self.contrib_src_dir = os.path.join(self.this_dir, "mockmodels", "contrib_src_si")
+        self.setup_self_temp_work_dir()
+        self.setup_self_temp_output_dir()
+        self.setup_self_test_client(ModelReturnsNumpyScalars(), self.contrib_src_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_work_dir, ignore_errors=True)
+        shutil.rmtree(self.temp_output_dir, ignore_errors=True)
+
+    def _predict_sample(self, query="", headers=None):
+        response = self.client.get("/api/predict_sample?filename=testimage_ramp_4x2.png" + query,
+                                   headers=headers)
+        return response.status_code, json.loads(response.get_data())
+
+    def test_numpy_outputs_are_saved_to_files_by_default(self):
+        status, result = self._predict_sample()
+        self.assertEqual(200, status)
+        self.assertTrue(result["output"][1]["prediction"].endswith(".h5"))
+
+    def test_numpy_scalars_are_encoded(self):
+        status, result = self._predict_sample()
+        self.assertEqual(200, status)
+        self.assertEqual(0.75, result["output"][0]["prediction"][1]["probability"])
+
+    def test_output_encoding_query_parameter(self):
+        status, result = self._predict_sample("&output_encoding=base64")
+        self.assertEqual(200, status)
+        prediction = decode_array(result["output"][1]["prediction"])
+        self.assertListEqual([[0,1,1,0],[0,2,2,0]], prediction.tolist())
+        status, result = self._predict_sample("&output_encoding=list")
+        self.assertListEqual([[0,1,1,0],[0,2,2,0]], result["output"][1]["prediction"])
+
+    def test_output_encoding_accept_header(self):
+        status, result = self._predict_sample(
+            headers={"Accept": "text/html, application/json; numpy=base64; q=0.9"})
+        self.assertEqual(200, status)
+        self.assertEqual("base64", result["output"][1]["prediction"]["encoding"])
+
+    def test_query_parameter_overrides_accept_header(self):
+        status, result = self._predict_sample("&output_encoding=file",
+                                              headers={"Accept": "application/json; numpy=list"})
+        self.assertEqual(200, status)
+        self.assertTrue(result["output"][1]["prediction"].endswith(".h5"))
+
+    def test_unknown_output_encoding_returns_error(self):
+        status, result = self._predict_sample("&output_encoding=hex")
+        self.assertEqual(400, status)
+        self.assertIn("error", result)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+import unittest
+import os
+import io
+import json
+import time
+import shutil
+import tempfile
+from modelhubapi import ModelHubAPI
+from modelhubapi.metadata import MetadataSnapshot, MetadataWatcher, files_signature
+from .apitestbase import TestRESTAPIBase
+from .mockmodels.contrib_src_si.inference import Model
+
+
+class TestMetadataSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.config = {"id": "MockId",
+                       "model": {"io": {"input": {"format": ["image/png"],
+                                                  "single": {"format": ["image/png"]}},
+                                        "output": [{"name": "mask", "type": "mask_image",
+                                                    "file_format": "npz"}]}}}
+
+    def test_input_schema_and_output_descriptors(self):
+        snapshot = MetadataSnapshot(self.config, {}, {})
+        self.assertListEqual(["format", "single"], sorted(snapshot.input_keys))
+        self.assertTupleEqual(("image/png",), snapshot.input_formats)
+        self.assertDictEqual({"name": "mask", "type": "mask_image", "description": "",
+                              "file_format": "npz"}, snapshot.outputs[0])
+
+    def test_responses_are_encoded_with_etag(self):
+        snapshot = MetadataSnapshot(self.config, {"model_license": "MIT"}, {})
+        encoded, etag = snapshot.response("model_io")
+        self.assertDictEqual(self.config["model"]["io"], json.loads(encoded.decode("utf-8")))
+        self.assertEqual(32, len(etag))
+        self.assertNotEqual(etag, snapshot.response("config")[1])
+        self.assertEqual(etag, MetadataSnapshot(self.config, {}, {}).response("model_io")[1])
+
+    def test_config_errors_are_kept(self):
+        snapshot = MetadataSnapshot({"error": "missing"}, {}, {})
+        self.assertIn("error", snapshot.model_io)
+        self.assertTupleEqual((), snapshot.input_formats)
+        snapshot = MetadataSnapshot({"id": "MockId"}, {}, {})
+        self.assertIn("error", snapshot.model_io)
+
+
+
+class TestMetadataWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "config.json")
+        self._write(b"{}")
+        self.changes = []
+        self.watcher = MetadataWatcher(lambda: files_signature([self.path, self.temp_dir]),
+                                       self.changes.append, interval=0.05)
+
+    def tearDown(self):
+        self.watcher.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, content, mtime=None):
+        with open(self.path, "wb") as f:
+            f.write(content)
+        if mtime is not None:
+            os.utime(self.path, (mtime, mtime))
+
+    def test_poll_detects_changes_only_once(self):
+        self.assertFalse(self.watcher.poll())
+        self._write(b"{\"id\": 1}", mtime=time.time() + 10)
+        self.assertTrue(self.watcher.poll())
+        self.assertFalse(self.watcher.poll())
+        self.assertEqual(1, len(self.changes))
+
+    def test_poll_detects_added_and_removed_files(self):
+        os.remove(self.path)
+        self.assertTrue(self.watcher.poll())
+        self.assertIsNone(self.changes[0][0])
+
+    def test_thread_polls_until_stopped(self):
+        self.watcher.start()
+        self._write(b"{\"id\": 1}", mtime=time.time() + 10)
+        deadline = time.time() + 5
+        while not self.changes and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(1, len(self.changes))
+
+
+
+class TestModelHubAPIMetadata(unittest.TestCase):
+
+    def setUp(self):
+        this_dir = os.path.dirname(os.path.realpath(__file__))
+        self.temp_dir = tempfile.mkdtemp()
+        self.contrib_src_dir = os.path.join(self.temp_dir, "contrib_src")
+        shutil.copytree(os.path.join(this_dir, "mockmodels", "contrib_src_si"),
+                        self.contrib_src_dir)
+        self.config_file = os.path.join(self.contrib_src_dir, "model", "config.json")
+        self.api = ModelHubAPI(Model(), self.contrib_src_dir)
+        self.api.output_folder = self.temp_dir
+
+    def tearDown(self):
+        self.api.disable_metadata_reload()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _change_config(self, name):
+        config = self.api.get_config()
+        config["meta"]["name"] = name
+        with io.open(self.config_file, "w", encoding="utf-8") as f:
+            f.write(json.dumps(config))
+        os.utime(self.config_file, (time.time() + 10, time.time() + 10))
+
+    def test_metadata_is_not_read_from_disk_again(self):
+        config = self.api.get_config()
+        os.remove(self.config_file)
+        self.assertDictEqual(config, self.api.get_config())
+        self.assertNotIn("error", self.api.get_model_io())
+        result = self.api.predict(self.contrib_src_dir + "/sample_data/testimage_ramp_4x2.png")
+        self.assertEqual("MockNet", result["model"]["name"])
+
+    def test_returned_metadata_are_copies(self):
+        self.api.get_config()["meta"]["name"] = "Changed"
+        self.api.get_samples()["files"].append("other.png")
+        self.assertEqual("MockNet", self.api.get_config()["meta"]["name"])
+        self.assertNotIn("other.png", self.api.get_samples()["files"])
+
+    def test_reload_metadata_swaps_snapshot(self):
+        snapshot = self.api.metadata
+        self._change_config("Changed")
+        self.assertEqual("MockNet", self.api.get_config()["meta"]["name"])
+        self.api.reload_metadata()
+        self.assertIsNot(snapshot, self.api.metadata)
+        self.assertEqual("Changed", self.api.get_config()["meta"]["name"])
+        self.assertEqual("MockNet", snapshot.config["meta"]["name"])
+
+    def test_metadata_reload_watches_files(self):
+        self.api.enable_metadata_reload(interval=0.05)
+        self._change_config("Changed")
+        deadline = time.time() + 5
+        while self.api.get_config()["meta"]["name"] != "Changed" and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual("Changed", self.api.get_config()["meta"]["name"])
+
+
+
+class TestModelHubRESTAPIMetadata(TestRESTAPIBase):
+
+    def setUp(self):
+        self.this_dir = os.path.dirname(os.path.realpath(__file__))
+        self.contrib_src_dir = os.path.join(self.this_dir, "mockmodels", "contrib_src_si")
+        self.setup_self_temp_work_dir()
+        self.setup_self_temp_output_dir()
+        self.setup_self_test_client(Model(), self.contrib_src_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_work_dir, ignore_errors=True)
+        shutil.rmtree(self.temp_output_dir, ignore_errors=True)
+
+    def test_metadata_responses_have_etags(self):
+        for call in ["/api/get_config", "/api/get_legal", "/api/get_model_io"]:
+            response = self.client.get(call)
+            self.assertEqual(200, response.status_code)
+            self.assertEqual("application/json", response.content_type)
+            response = self.client.get(call, headers={"If-None-Match": response.headers["ETag"]})
+            self.assertEqual(304, response.status_code)
+
+    def test_metadata_responses_match_python_api(self):
+        response = self.client.get("/api/get_model_io")
+        self.assertDictEqual(self.rest_api.api.get_model_io(), json.loads(response.get_data()))
+
+    def test_etag_changes_with_metadata(self):
+        etag = self.client.get("/api/get_config").headers["ETag"]
+        config = self.rest_api.api.get_config()
+        config["meta"]["name"] = "Changed"
+        self.rest_api.api.metadata = MetadataSnapshot(config, {}, {})
+        response = self.client.get("/api/get_config", headers={"If-None-Match": etag})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("Changed", json.loads(response.get_data())["meta"]["name"])
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,8 +10,10 @@ multiple outputs.
 """
 
 import os
+import time
 import numpy as np
 from modelhublib.model import ModelBase
+from modelhublib.processor import ImageProcessorBase
 
 
 class Model(ModelBase):
@@ -78,3 +80,52 @@ class ModelThrowingError(ModelBase):
 
     def infer(self, input):
         raise NotImplementedError
+
+
+class ModelWithBatchInference(Model):
+    """
+    Records the size of each batch it is called with.
+    """
+
+    def __init__(self, delay = 0.0):
+        self.delay = delay
+        self.batch_sizes = []
+
+    def infer_batch(self, inputs):
+        self.batch_sizes.append(len(inputs))
+        time.sleep(self.delay)
+        return [self.infer(input) for input in inputs]
+
+
+class ModelLoadingInput(ModelBase):
+    """
+    Loads its input through the modelhublib image loaders, so it also accepts
+    in-memory inputs. Records the inputs it was called with.
+    """
+
+    def __init__(self):
+        config = {"model": {"io": {"input": {"single": {"dim_limits": [{}, {}, {}]}}}}}
+        self.processor = ImageProcessorBase(config)
+        self.inputs = []
+
+    def infer(self, input):
+        self.inputs.append(input)
+        npArr = self.processor.loadAndPreprocess(input)
+        label_list = [{"label": "class_0", 'probability': 0.3},
+                      {"label": "class_1", 'probability': 0.7}]
+        return [label_list, npArr[0, 0].astype(np.int64)]
+
+
+class ModelCountingInferences(Model):
+    """
+    Counts how often its infer method was called.
+    """
+
+    def __init__(self, delay = 0.0):
+        self.delay = delay
+        self.num_inferences = 0
+
+    def infer(self, input):
+        self.num_inferences += 1
+        time.sleep(self.delay)
+        return super(ModelCountingInferences, self).infer(input)
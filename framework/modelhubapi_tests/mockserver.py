@@ -0,0 +1,85 @@
+"""
+Local stand-in for remote file servers, so that tests of URL inputs do not
+need to download anything from the internet.
+"""
+
+import threading
+import time
+from six.moves import BaseHTTPServer, socketserver
+
+
+class MockFileServer(object):
+    """
+    Serves files from memory on a free local port. Each route is a dictionary
+    with the keys "body" (bytes) and optionally "content_type", "delay"
+    (seconds to wait before sending the body), "head_status" (status code
+    returned for HEAD requests), "content_length" (overrides the announced
+    length) and "etag" (answers matching If-None-Match requests with 304).
+
+    All received requests are recorded in :attr:`requests` as tuples
+    (method, path, client port).
+    """
+
+    def __init__(self, routes=None):
+        self.routes = routes if routes is not None else {}
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_HEAD(self):
+                server._handle(self, send_body=False)
+
+            def do_GET(self):
+                server._handle(self, send_body=True)
+
+            def log_message(self, format, *args):
+                pass
+
+        class ThreadingServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+            daemon_threads = True
+
+        self._httpd = ThreadingServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, args=(0.05,))
+        self._thread.daemon = True
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def url(self, path):
+        return "http://127.0.0.1:%d%s" % (self._httpd.server_address[1], path)
+
+    def _handle(self, handler, send_body):
+        self.requests.append((handler.command, handler.path, handler.client_address[1]))
+        route = self.routes.get(handler.path)
+        if route is None:
+            handler.send_response(404)
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+        if not send_body and route.get("head_status"):
+            handler.send_response(route["head_status"])
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+        if route.get("etag") and handler.headers.get("If-None-Match") == route["etag"]:
+            handler.send_response(304)
+            handler.send_header("ETag", route["etag"])
+            handler.end_headers()
+            return
+        body = route["body"]
+        handler.send_response(200)
+        if route.get("etag"):
+            handler.send_header("ETag", route["etag"])
+        handler.send_header("Content-Type", route.get("content_type", "application/octet-stream"))
+        handler.send_header("Content-Length", str(route.get("content_length", len(body))))
+        handler.end_headers()
+        if send_body:
+            time.sleep(route.get("delay", 0))
+            handler.wfile.write(body)
@@ -0,0 +1,123 @@
+import unittest
+import os
+import time
+import shutil
+import zipfile
+import tempfile
+from modelhubapi.modelarchive import ModelArchive
+from .apitestbase import TestRESTAPIBase
+from .mockmodels.contrib_src_si.inference import Model
+
+
+class TestModelArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.contrib_src_dir = tempfile.mkdtemp()
+        self.archive_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.contrib_src_dir, "model", "weights"))
+        self._write("model/config.json", b"{}" * 1000)
+        self._write("model/weights/weights.pth", b"\0" * 1000)
+        self._write("model/weights/random.bin", os.urandom(2048))
+        self._write("sample_data/sample.png", b"sample")
+        self.archive = ModelArchive(self.contrib_src_dir, sample_size=1024)
+
+    def tearDown(self):
+        shutil.rmtree(self.contrib_src_dir, ignore_errors=True)
+        shutil.rmtree(self.archive_dir, ignore_errors=True)
+
+    def _write(self, name, content):
+        path = os.path.join(self.contrib_src_dir, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def test_archive_contains_model_folder_with_directory_entries(self):
+        path, _ = self.archive.get(self.archive_dir)
+        with zipfile.ZipFile(path) as archive:
+            self.assertListEqual(["model/", "model/config.json", "model/weights/",
+                                  "model/weights/random.bin", "model/weights/weights.pth"],
+                                 sorted(archive.namelist()))
+            self.assertEqual(b"{}" * 1000, archive.read("model/config.json"))
+
+    def test_compressed_files_are_stored(self):
+        path, _ = self.archive.get(self.archive_dir)
+        with zipfile.ZipFile(path) as archive:
+            self.assertEqual(zipfile.ZIP_DEFLATED,
+                             archive.getinfo("model/config.json").compress_type)
+            self.assertEqual(zipfile.ZIP_STORED,
+                             archive.getinfo("model/weights/weights.pth").compress_type)
+            self.assertEqual(zipfile.ZIP_STORED,
+                             archive.getinfo("model/weights/random.bin").compress_type)
+
+    def test_archive_is_built_once(self):
+        path, etag = self.archive.get(self.archive_dir)
+        os.utime(path, (0, 0))
+        self.assertTupleEqual((path, etag), self.archive.get(self.archive_dir))
+        self.assertEqual(0, os.path.getmtime(path))
+
+    def test_archive_is_rebuilt_when_model_changes(self):
+        old_path, old_etag = self.archive.get(self.archive_dir)
+        config = self._write("model/config.json", b"{\"changed\": true}")
+        os.utime(config, (time.time() + 10, time.time() + 10))
+        path, etag = self.archive.get(self.archive_dir)
+        self.assertNotEqual(old_etag, etag)
+        self.assertListEqual([os.path.basename(path)], os.listdir(self.archive_dir))
+
+    def test_sample_data_does_not_change_archive(self):
+        _, etag = self.archive.get(self.archive_dir)
+        self._write("sample_data/other.png", b"other")
+        self.assertEqual(etag, self.archive.get(self.archive_dir)[1])
+
+
+
+class TestModelHubRESTAPIModelArchive(TestRESTAPIBase):
+
+    def setUp(self):
+        self.this_dir = os.path.dirname(os.path.realpath(__file__))
+        self.contrib_src_dir = os.path.join(self.this_dir, "mockmodels", "contrib_src_si")
+        self.setup_self_temp_work_dir()
+        self.setup_self_temp_output_dir()
+        self.setup_self_test_client(Model(), self.contrib_src_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_work_dir, ignore_errors=True)
+        shutil.rmtree(self.temp_output_dir, ignore_errors=True)
+
+    def test_archive_is_sent_with_etag_and_file_name(self):
+        response = self.client.get("/api/get_model_files")
+        self.assertEqual(200, response.status_code)
+        self.assertIsNotNone(response.headers.get("ETag"))
+        self.assertIn("mocknet_model.zip", response.headers["Content-Disposition"])
+        response.close()
+
+    def test_conditional_get_returns_304(self):
+        response = self.client.get("/api/get_model_files")
+        etag = response.headers["ETag"]
+        response.close()
+        response = self.client.get("/api/get_model_files", headers={"If-None-Match": etag})
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(b"", response.get_data())
+
+    def test_range_request_returns_partial_content(self):
+        response = self.client.get("/api/get_model_files")
+        content = response.get_data()
+        response.close()
+        response = self.client.get("/api/get_model_files", headers={"Range": "bytes=10-19"})
+        self.assertEqual(206, response.status_code)
+        self.assertEqual(content[10:20], response.get_data())
+        response.close()
+
+    def test_repeated_requests_share_one_archive(self):
+        for _ in range(2):
+            self.client.get("/api/get_model_files").close()
+        self.assertEqual(1, len(os.listdir(self.temp_work_dir)))
+        with zipfile.ZipFile(os.path.join(self.temp_work_dir,
+                                          os.listdir(self.temp_work_dir)[0])) as archive:
+            self.assertIn("model/model.txt", archive.namelist())
+
+
+
+if __name__ == '__main__':
+    unittest.main()
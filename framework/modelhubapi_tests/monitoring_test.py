@@ -0,0 +1,77 @@
+import unittest
+import os
+import shutil
+from modelhublib import metrics
+from .apitestbase import TestRESTAPIBase
+from .mockmodels.contrib_src_si.inference import Model
+
+
+class TestModelHubRESTAPIMetrics(TestRESTAPIBase):
+
+    def setUp(self):
+        self.this_dir = os.path.dirname(os.path.realpath(__file__))
+        self.contrib_src_dir = os.path.join(self.this_dir, "mockmodels", "contrib_src_si")
+        self.setup_self_temp_work_dir()
+        self.setup_self_temp_output_dir()
+        self.setup_self_test_client(Model(), self.contrib_src_dir)
+        self.requests = metrics.registry.counter("modelhub_http_requests_total", "",
+                                                 ("endpoint", "outcome"))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_work_dir, ignore_errors=True)
+        shutil.rmtree(self.temp_output_dir, ignore_errors=True)
+
+    def _count(self, name, labelNames=(), **labels):
+        return metrics.registry.counter(name, "", labelNames).get(**labels)
+
+    def test_metrics_are_exposed_in_prometheus_format(self):
+        self.client.get("/api/predict_sample?filename=testimage_ramp_4x2.png")
+        response = self.client.get("/api/metrics")
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("text/plain; version=0.0.4; charset=utf-8",
+                         response.headers["Content-Type"])
+        text = response.get_data(as_text=True)
+        self.assertIn("# TYPE modelhub_http_requests_total counter", text)
+        self.assertIn("modelhub_http_requests_total{endpoint=\"predict_sample\","
+                      "outcome=\"success\"}", text)
+        self.assertIn("modelhub_predict_stage_seconds_bucket{le=\"+Inf\",stage=\"inference\"}",
+                      text)
+
+    def test_requests_are_counted_by_outcome(self):
+        success = self.requests.get(endpoint="get_config", outcome="success")
+        client_error = self.requests.get(endpoint="predict", outcome="client_error")
+        unmatched = self.requests.get(endpoint="unmatched", outcome="client_error")
+        self.client.get("/api/get_config")
+        self._post_predict_request_on_sample_image("testimage_ramp_4x2.jpg")
+        self.client.get("/api/missing")
+        self.assertEqual(success + 1, self.requests.get(endpoint="get_config",
+                                                        outcome="success"))
+        self.assertEqual(client_error + 1, self.requests.get(endpoint="predict",
+                                                             outcome="client_error"))
+        self.assertEqual(unmatched + 1, self.requests.get(endpoint="unmatched",
+                                                          outcome="client_error"))
+
+    def test_predict_records_stages_bytes_and_in_flight(self):
+        stageSeconds = metrics.registry.histogram("modelhub_rest_predict_stage_seconds", "",
+                                                  ("stage",))
+        inFlight = metrics.registry.gauge("modelhub_http_requests_in_flight", "",
+                                          ("endpoint",))
+        stages = ["save_upload", "mime_sniff", "multi_inputs", "predict", "encode"]
+        before = [stageSeconds.get(stage=stage)[0] for stage in stages]
+        uploaded = self._count("modelhub_input_bytes_total", ("source",), source="upload")
+        written = self._count("modelhub_output_bytes_total", ("format",), format="h5")
+        response = self._post_predict_request_on_sample_image("testimage_ramp_4x2.png")
+        self.assertEqual(200, response.status_code)
+        self.assertListEqual([count + 1 for count in before],
+                             [stageSeconds.get(stage=stage)[0] for stage in stages])
+        sample_size = os.path.getsize(self.contrib_src_dir + "/sample_data/testimage_ramp_4x2.png")
+        self.assertEqual(uploaded + sample_size,
+                         self._count("modelhub_input_bytes_total", ("source",), source="upload"))
+        self.assertLess(written, self._count("modelhub_output_bytes_total", ("format",),
+                                             format="h5"))
+        self.assertEqual(0, inFlight.get(endpoint="predict"))
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import unittest
+import os
+import io
+import json
+import shutil
+import tempfile
+import numpy as np
+import h5py
+from modelhubapi import ModelHubAPI
+from modelhubapi.outputwriters import get_output_writer, OutputWriter, H5OutputWriter
+from modelhubapi.metadata import MetadataSnapshot
+from .apitestbase import TestRESTAPIBase
+from .mockmodels.contrib_src_si.inference import Model
+
+
+class TestOutputWriters(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.output = np.zeros((3, 64, 64), dtype=np.uint8)
+        self.output[1, 10:30, 20:40] = 2
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, output_format):
+        writer = get_output_writer(output_format)
+        path = os.path.join(self.temp_dir, "output" + writer.extension)
+        writer.write(self.output, "mask", path)
+        return path
+
+    def _read_h5(self, path):
+        with h5py.File(path, "r") as h5f:
+            dataset = h5f["mask"]
+            return dataset[...], dataset.compression, dataset.chunks, dataset.attrs["type"]
+
+    def test_writer_is_abstract(self):
+        self.assertRaises(NotImplementedError, OutputWriter().write, self.output, "mask", "path")
+
+    def test_default_format_is_uncompressed_h5(self):
+        data, compression, chunks, dtype = self._read_h5(self._write(None))
+        np.testing.assert_array_equal(self.output, data)
+        self.assertIsNone(compression)
+        self.assertIsNone(chunks)
+        self.assertEqual(b"uint8", dtype)
+
+    def test_compressed_h5_formats_are_chunked(self):
+        for output_format in ["h5-gzip", "h5-lzf"]:
+            data, compression, chunks, _ = self._read_h5(self._write(output_format))
+            np.testing.assert_array_equal(self.output, data)
+            self.assertEqual(output_format[len("h5-"):], compression)
+            self.assertIsNotNone(chunks)
+
+    def test_h5_options_can_be_given_as_dict(self):
+        path = self._write({"format": "h5", "compression": "gzip", "chunks": [1, 64, 64]})
+        _, compression, chunks, _ = self._read_h5(path)
+        self.assertEqual("gzip", compression)
+        self.assertTupleEqual((1, 64, 64), chunks)
+
+    def test_npy_format(self):
+        path = self._write("npy")
+        self.assertTrue(path.endswith(".npy"))
+        np.testing.assert_array_equal(self.output, np.load(path))
+
+    def test_npz_format(self):
+        path = self._write("npz")
+        self.assertTrue(path.endswith(".npz"))
+        with np.load(path) as npz:
+            np.testing.assert_array_equal(self.output, npz["mask"])
+
+    def test_compression_reduces_file_size(self):
+        uncompressed = os.path.getsize(self._write("h5"))
+        for output_format in ["h5-gzip", "h5-lzf", "npz"]:
+            self.assertLess(os.path.getsize(self._write(output_format)), uncompressed)
+
+    def test_scalar_output_is_written_uncompressed(self):
+        self.output = np.float32(0.5) * np.ones(())
+        data, _, _, _ = self._read_h5(self._write("h5-gzip"))
+        self.assertEqual(0.5, data)
+
+    def test_unknown_format_raises(self):
+        self.assertRaises(ValueError, get_output_writer, "tiff")
+        self.assertRaises(ValueError, get_output_writer, {"format": "h5", "unknown": 1})
+
+    def test_format_names_are_case_insensitive(self):
+        self.assertIsInstance(get_output_writer("H5-GZIP"), H5OutputWriter)
+
+
+
+class TestModelHubAPIOutputFormats(unittest.TestCase):
+
+    def setUp(self):
+        self.this_dir = os.path.dirname(os.path.realpath(__file__))
+        self.contrib_src_dir = os.path.join(self.this_dir, "mockmodels", "contrib_src_si")
+        self.temp_dir = tempfile.mkdtemp()
+        self.api = ModelHubAPI(Model(), self.contrib_src_dir)
+        self.api.output_folder = self.temp_dir
+        self.input_file = self.contrib_src_dir + "/sample_data/testimage_ramp_4x2.png"
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_output_is_saved_as_h5_by_default(self):
+        result = self.api.predict(self.input_file)
+        self.assertTrue(result["output"][1]["prediction"].endswith(".h5"))
+
+    def test_output_format_can_be_selected_per_request(self):
+        result = self.api.predict(self.input_file, output_format="npy")
+        prediction = result["output"][1]["prediction"]
+        self.assertTrue(prediction.endswith(".npy"))
+        self.assertListEqual([[0,1,1,0],[0,2,2,0]], np.load(prediction[len("api"):]).tolist())
+        self.assertListEqual([2,4], result["output"][1]["shape"])
+        self.assertEqual("mask_image", result["output"][1]["type"])
+
+    def test_output_format_can_be_configured_per_output(self):
+        config = self.api.get_config()
+        config["model"]["io"]["output"][1]["file_format"] = "npz"
+        self.api.metadata = MetadataSnapshot(config, {}, {})
+        result = self.api.predict(self.input_file)
+        self.assertTrue(result["output"][1]["prediction"].endswith(".npz"))
+        result = self.api.predict(self.input_file, output_format="h5-gzip")
+        self.assertTrue(result["output"][1]["prediction"].endswith(".h5"))
+
+    def test_unknown_output_format_returns_error(self):
+        result = self.api.predict(self.input_file, output_format="tiff")
+        self.assertIn("error", result)
+
+
+
+class TestModelHubRESTAPIOutputFormats(TestRESTAPIBase):
+
+    def setUp(self):
+        self.this_dir = os.path.dirname(os.path.realpath(__file__))
+        self.contrib_src_dir = os.path.join(self.this_dir, "mockmodels", "contrib_src_si")
+        self.setup_self_temp_work_dir()
+        self.setup_self_temp_output_dir()
+        self.setup_self_test_client(Model(), self.contrib_src_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_work_dir, ignore_errors=True)
+        shutil.rmtree(self.temp_output_dir, ignore_errors=True)
+
+    def test_predict_sample_saves_output_in_requested_format(self):
+        response = self.client.get("/api/predict_sample?filename=testimage_ramp_4x2.png"
+                                   "&output_format=npz")
+        self.assertEqual(200, response.status_code)
+        prediction = json.loads(response.get_data())["output"][1]["prediction"]
+        self.assertTrue(prediction.endswith(".npz"))
+        response = self.client.get("/api/output/" + os.path.basename(prediction))
+        self.assertEqual(200, response.status_code)
+        with np.load(io.BytesIO(response.get_data())) as npz:
+            self.assertListEqual([[0,1,1,0],[0,2,2,0]], npz["mask"].tolist())
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,216 @@
+import unittest
+import os
+import json
+import time
+import shutil
+import pstats
+import tempfile
+import threading
+from modelhubapi.profiling import ProfileStore, StackSampler, ProfilerBusy, collapsed_stacks
+from .apitestbase import TestRESTAPIBase
+from .mockmodels.contrib_src_si.inference import Model
+
+
+def busy_work(n):
+    return sum(i * i for i in range(n))
+
+
+
+class TestProfileStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.profiles = ProfileStore(self.temp_dir, max_profiles=2, top=3)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_run_returns_result_and_summary(self):
+        result, summary = self.profiles.run(busy_work, 1000)
+        self.assertEqual(busy_work(1000), result)
+        self.assertEqual(3, len(summary["hot_functions"]))
+        self.assertIn("busy_work", " ".join(f["function"] for f in summary["hot_functions"]))
+        self.assertListEqual(["convert", "infer", "load", "serialize"], sorted(summary["stages"]))
+        stats = pstats.Stats(self.profiles.path(summary["id"]))
+        self.assertGreater(stats.total_tt, 0)
+        with open(self.profiles.path(summary["id"], "collapsed")) as f:
+            self.assertIn("busy_work (profiling_test.py", f.read())
+
+    def test_old_profiles_are_removed(self):
+        ids = [self.profiles.run(busy_work, 10)[1]["id"] for _ in range(3)]
+        self.assertIsNone(self.profiles.path(ids[0]))
+        self.assertIsNotNone(self.profiles.path(ids[2], "collapsed"))
+        self.assertEqual(4, len(os.listdir(self.temp_dir)))
+
+    def test_path_rejects_invalid_ids_and_formats(self):
+        profile_id = self.profiles.run(busy_work, 10)[1]["id"]
+        self.assertIsNone(self.profiles.path("../" + profile_id))
+        self.assertIsNone(self.profiles.path(profile_id, "svg"))
+
+    def test_only_one_call_is_profiled_at_a_time(self):
+        started = threading.Event()
+        release = threading.Event()
+        def blocking():
+            started.set()
+            release.wait(5)
+        thread = threading.Thread(target=self.profiles.run, args=(blocking,))
+        thread.start()
+        started.wait(5)
+        try:
+            self.assertRaises(ProfilerBusy, self.profiles.run, busy_work, 10)
+        finally:
+            release.set()
+            thread.join()
+
+    def test_collapsed_stacks_split_time_by_caller(self):
+        profile = ProfileStore(self.temp_dir)
+        summary = profile.run(lambda: [busy_work(10000) for _ in range(3)])[1]
+        stacks = collapsed_stacks(pstats.Stats(profile.path(summary["id"])))
+        genexpr_stacks = [stack for stack in stacks
+                          if stack.split(";")[-1].startswith("<genexpr> (profiling_test.py")]
+        self.assertEqual(1, len(genexpr_stacks))
+        self.assertIn(";busy_work (profiling_test.py", genexpr_stacks[0])
+
+
+
+class TestStackSampler(unittest.TestCase):
+
+    def setUp(self):
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._spin, name="spinner")
+        self.thread.start()
+
+    def tearDown(self):
+        self.stop.set()
+        self.thread.join()
+
+    def _spin(self):
+        while not self.stop.is_set():
+            busy_work(1000)
+
+    def test_sample_aggregates_stacks_of_other_threads(self):
+        stacks = StackSampler(max_seconds=0.2).sample(10, interval=0.01)
+        spinner = dict((stack, count) for stack, count in stacks.items()
+                       if stack.startswith("spinner;"))
+        self.assertGreater(sum(spinner.values()), 0)
+        self.assertTrue(any(";_spin (profiling_test.py" in stack for stack in spinner))
+        self.assertFalse(any("test_sample_aggregates" in stack for stack in stacks))
+
+    def test_sample_rejects_invalid_durations_and_intervals(self):
+        sampler = StackSampler()
+        for seconds, interval in [(float("nan"), None), (float("inf"), None), (0, None),
+                                  (0.1, float("nan")), (0.1, float("inf")), (0.1, -1)]:
+            self.assertRaises(ValueError, sampler.sample, seconds, interval)
+        # the lock is not held after rejecting
+        sampler.sample(0.01)
+
+    def test_short_intervals_are_raised_to_min_interval(self):
+        sampler = StackSampler(min_interval=0.05)
+        stacks = sampler.sample(0.2, interval=1e-9)
+        spinner = [count for stack, count in stacks.items() if stack.startswith("spinner;")]
+        self.assertLessEqual(sum(spinner), 5)
+
+    def test_only_one_call_samples_at_a_time(self):
+        sampler = StackSampler()
+        thread = threading.Thread(target=sampler.sample, args=(0.5,))
+        thread.start()
+        time.sleep(0.1)
+        try:
+            self.assertRaises(ProfilerBusy, sampler.sample, 0.1)
+        finally:
+            thread.join()
+
+
+
+class TestModelHubRESTAPIProfiling(TestRESTAPIBase):
+
+    def setUp(self):
+        self.this_dir = os.path.dirname(os.path.realpath(__file__))
+        self.contrib_src_dir = os.path.join(self.this_dir, "mockmodels", "contrib_src_si")
+        self.setup_self_temp_work_dir()
+        self.setup_self_temp_output_dir()
+        self.setup_self_test_client(Model(), self.contrib_src_dir)
+        self.profile_dir = tempfile.mkdtemp()
+        self.rest_api.profiles = ProfileStore(self.profile_dir)
+        self.rest_api.profiling_token = "secret"
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_work_dir, ignore_errors=True)
+        shutil.rmtree(self.temp_output_dir, ignore_errors=True)
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+    def _predict_sample(self, headers=None, query=""):
+        return self.client.get("/api/predict_sample?filename=testimage_ramp_4x2.png" + query,
+                               headers=headers)
+
+    def test_predict_without_token_is_not_profiled(self):
+        response = self._predict_sample()
+        self.assertEqual(200, response.status_code)
+        self.assertNotIn("profile", json.loads(response.get_data()))
+        self.assertListEqual([], os.listdir(self.profile_dir))
+
+    def test_profiling_is_forbidden_when_disabled_or_token_wrong(self):
+        response = self._predict_sample(headers={"X-Modelhub-Profile": "wrong"})
+        self.assertEqual(403, response.status_code)
+        self.rest_api.profiling_token = None
+        response = self._predict_sample(query="&profile=secret")
+        self.assertEqual(403, response.status_code)
+        self.assertListEqual([], os.listdir(self.profile_dir))
+
+    def test_profiled_predict_lists_stages_and_hot_functions(self):
+        response = self._predict_sample(headers={"X-Modelhub-Profile": "secret"})
+        self.assertEqual(200, response.status_code)
+        result = json.loads(response.get_data())
+        self.assert_predict_contains_expected_mock_prediction(result)
+        profile = result["profile"]
+        self.assertGreater(profile["stages"]["infer"], 0)
+        self.assertGreater(profile["stages"]["serialize"], 0)
+        self.assertEqual(20, len(profile["hot_functions"]))
+
+    def test_profiles_are_downloadable_with_token(self):
+        response = self._predict_sample(query="&profile=secret")
+        profile_id = json.loads(response.get_data())["profile"]["id"]
+        response = self.client.get("/api/profiles/%s?profile=secret" % profile_id)
+        self.assertEqual(200, response.status_code)
+        self.assertIn(profile_id + ".pstats", response.headers["Content-Disposition"])
+        response.close()
+        response = self.client.get("/api/profiles/%s?format=collapsed" % profile_id,
+                                   headers={"X-Modelhub-Profile": "secret"})
+        self.assertEqual(200, response.status_code)
+        self.assertIn("predict (pythonapi.py", response.get_data(as_text=True))
+        response.close()
+        self.assertEqual(403, self.client.get("/api/profiles/" + profile_id).status_code)
+        self.assertEqual(404, self.client.get("/api/profiles/%s?profile=secret"
+                                              % ("0" * 32)).status_code)
+
+    def test_debug_profile_returns_collapsed_stacks(self):
+        stop = threading.Event()
+        thread = threading.Thread(target=lambda: stop.wait(5), name="waiting")
+        thread.start()
+        try:
+            response = self.client.get("/api/debug/profile?seconds=0.1&interval=0.02",
+                                       headers={"X-Modelhub-Profile": "secret"})
+        finally:
+            stop.set()
+            thread.join()
+        self.assertEqual(200, response.status_code)
+        self.assertIn("text/plain", response.content_type)
+        lines = response.get_data(as_text=True).splitlines()
+        waiting = [line for line in lines if line.startswith("waiting;")]
+        self.assertEqual(1, len(waiting))
+        self.assertGreater(int(waiting[0].rsplit(" ", 1)[1]), 0)
+
+    def test_debug_profile_requires_token_and_valid_arguments(self):
+        self.assertEqual(403, self.client.get("/api/debug/profile?seconds=0.1").status_code)
+        response = self.client.get("/api/debug/profile?seconds=abc&profile=secret")
+        self.assertEqual(400, response.status_code)
+        response = self.client.get("/api/debug/profile?seconds=-1&profile=secret")
+        self.assertEqual(400, response.status_code)
+        for query in ["seconds=nan", "seconds=inf", "seconds=0.1&interval=nan"]:
+            response = self.client.get("/api/debug/profile?%s&profile=secret" % query)
+            self.assertEqual(400, response.status_code)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
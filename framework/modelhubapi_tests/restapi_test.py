@@ -3,7 +3,8 @@ import io
 from zipfile import ZipFile
 import shutil
 import json
-from modelhubapi_tests.mockmodels.contrib_src_si.inference import Model
+import threading
+from modelhubapi_tests.mockmodels.contrib_src_si.inference import Model, ModelLoadingInput
 from modelhubapi_tests.mockmodels.contrib_src_mi.inference import ModelNeedsTwoInputs
 from .apitestbase import TestRESTAPIBase
 from modelhubapi import ModelHubAPI
@@ -127,6 +128,43 @@ class TestModelHubRESTAPI_SI(TestRESTAPIBase):
         self.assertEqual(len(os.listdir(self.temp_work_dir) ), 0)
 
 
+    def test_working_folder_empty_after_failed_predict_by_post(self):
+        response = self._post_predict_request_on_sample_image("testimage_ramp_4x2.jpg")
+        self.assertEqual(400, response.status_code)
+        self.assertEqual(len(os.listdir(self.temp_work_dir) ), 0)
+
+
+    def test_predict_by_post_keeps_other_files_in_working_folder(self):
+        other_file_name = os.path.join(self.temp_work_dir, "other_request_input.png")
+        with open(other_file_name, "wb") as f:
+            f.write(b"OTHER REQUEST")
+        response = self._post_predict_request_on_sample_image("testimage_ramp_4x2.png")
+        self.assertEqual(200, response.status_code)
+        self.assertListEqual(["other_request_input.png"], os.listdir(self.temp_work_dir))
+
+
+    def test_concurrent_predicts_by_post_return_expected_mock_prediction(self):
+        results = [None] * 8
+        def run(i):
+            test_filename = self.contrib_src_dir + "/sample_data/testimage_ramp_4x2.png"
+            with open(test_filename, "rb") as f:
+                image_data = io.BytesIO(f.read())
+            response = self.rest_api.app.test_client().post(
+                "/api/predict",
+                data = {'file': (image_data, 'test_image.png')},
+                content_type = 'multipart/form-data')
+            results[i] = (response.status_code, json.loads(response.get_data()))
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(len(results))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for status_code, result in results:
+            self.assertEqual(200, status_code)
+            self.assert_predict_contains_expected_mock_prediction(result)
+        self.assertEqual(len(os.listdir(self.temp_work_dir) ), 0)
+
+
     # TODO this is not so nice yet, test should not require a download from the inet
     # should probably use a mock server for this
     def test_predict_by_url_returns_expected_mock_prediction(self):
@@ -172,6 +210,55 @@ class TestModelHubRESTAPI_SI(TestRESTAPIBase):
         response = self.client.get("/api/predict_sample?filename=NON_EXISTENT.png")
         self.assertEqual(400, response.status_code)
 
+class TestModelHubRESTAPIInMemoryUpload(TestRESTAPIBase):
+
+    def setUp(self):
+        self.this_dir = os.path.dirname(os.path.realpath(__file__))
+        self.contrib_src_dir = os.path.join(self.this_dir, "mockmodels", "contrib_src_si")
+        self.setup_self_temp_work_dir()
+        self.setup_self_temp_output_dir()
+        self.model = ModelLoadingInput()
+        self.setup_self_test_client(self.model, self.contrib_src_dir)
+        self.rest_api.in_memory_upload_limit = 1024 * 1024
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_work_dir, ignore_errors=True)
+        shutil.rmtree(self.temp_output_dir, ignore_errors=True)
+
+    def test_small_upload_is_passed_to_model_in_memory(self):
+        response = self._post_predict_request_on_sample_image("testimage_ramp_4x2.png")
+        self.assertEqual(200, response.status_code)
+        result = json.loads(response.get_data())
+        self.assert_predict_contains_expected_mock_prediction(result)
+        self.assertIsInstance(self.model.inputs[0], io.BytesIO)
+        self.assertTrue(self.model.inputs[0].name.endswith(".png"))
+
+    def test_small_upload_is_not_saved_to_working_folder(self):
+        original_remove_request_folder = self.rest_api._remove_request_folder
+        saved_files = []
+        def remove_request_folder(folder):
+            saved_files.extend(os.listdir(folder))
+            original_remove_request_folder(folder)
+        self.rest_api._remove_request_folder = remove_request_folder
+        response = self._post_predict_request_on_sample_image("testimage_ramp_4x2.png")
+        self.assertEqual(200, response.status_code)
+        self.assertListEqual([], saved_files)
+        self.assertEqual(len(os.listdir(self.temp_work_dir) ), 0)
+
+    def test_upload_above_limit_is_saved_to_file(self):
+        self.rest_api.in_memory_upload_limit = 10
+        response = self._post_predict_request_on_sample_image("testimage_ramp_4x2.png")
+        self.assertEqual(200, response.status_code)
+        self.assertIsInstance(self.model.inputs[0], str)
+        self.assertEqual(len(os.listdir(self.temp_work_dir) ), 0)
+
+    def test_in_memory_upload_returns_error_on_unsupported_file_type(self):
+        response = self._post_predict_request_on_sample_image("testimage_ramp_4x2.jpg")
+        self.assertEqual(400, response.status_code)
+        self.assertIn("Incorrect file type.", json.loads(response.get_data())["error"])
+
+
+
 class TestModelHubRESTAPI_MI(TestRESTAPIBase):
 
     def setUp(self):
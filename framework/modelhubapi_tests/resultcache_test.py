@@ -0,0 +1,180 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from modelhublib import metrics
+from modelhubapi import ModelHubAPI
+from modelhubapi.resultcache import ResultCache
+from modelhubapi.fingerprint import input_digest, model_fingerprint
+from modelhubapi_tests.mockmodels.contrib_src_si.inference import ModelCountingInferences
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.disk_folder = os.path.join(self.temp_dir, "results")
+        self.output_file = os.path.join(self.temp_dir, "output.h5")
+        open(self.output_file, "w").close()
+        self.output_list = [{"prediction": [1, 2], "name": "labels"},
+                            {"prediction": self.output_file, "name": "mask"}]
+        # room for two results in the tests of LRU eviction
+        self.two_results_size = 5 * len(json.dumps({"output": self.output_list, "files": []})) // 2
+        self.lookups = metrics.registry.counter("modelhub_result_cache_lookups_total",
+                                                "", ("result",))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_stored_result_is_returned(self):
+        cache = ResultCache()
+        cache.put("key", self.output_list, [1])
+        self.assertEqual((self.output_list, [1]), cache.get("key"))
+        self.assertIsNone(cache.get("other key"))
+
+    def test_least_recently_used_result_is_evicted_from_memory(self):
+        cache = ResultCache(max_memory_bytes=self.two_results_size)
+        cache.put("a", self.output_list, [])
+        cache.put("b", self.output_list, [])
+        cache.get("a")
+        cache.put("c", self.output_list, [])
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+
+    def test_result_is_found_on_disk_after_restart(self):
+        ResultCache(disk_folder=self.disk_folder).put("key", self.output_list, [1])
+        disk_hits = self.lookups.get(result="disk_hit")
+        cache = ResultCache(disk_folder=self.disk_folder)
+        self.assertEqual((self.output_list, [1]), cache.get("key"))
+        self.assertEqual(disk_hits + 1, self.lookups.get(result="disk_hit"))
+        memory_hits = self.lookups.get(result="memory_hit")
+        cache.get("key")
+        self.assertEqual(memory_hits + 1, self.lookups.get(result="memory_hit"))
+
+    def test_least_recently_used_result_is_evicted_from_disk(self):
+        cache = ResultCache(max_memory_bytes=0, disk_folder=self.disk_folder,
+                            max_disk_bytes=self.two_results_size)
+        cache.put("a", self.output_list, [])
+        cache.put("b", self.output_list, [])
+        cache.get("a")
+        cache.put("c", self.output_list, [])
+        self.assertListEqual(["a.json", "c.json"], sorted(os.listdir(self.disk_folder)))
+
+    def test_result_with_missing_output_file_is_dropped(self):
+        cache = ResultCache(disk_folder=self.disk_folder)
+        cache.put("key", self.output_list, [1])
+        os.remove(self.output_file)
+        self.assertIsNone(cache.get("key"))
+        self.assertListEqual([], os.listdir(self.disk_folder))
+
+    def test_result_that_is_not_json_serializable_is_not_cached(self):
+        cache = ResultCache()
+        cache.put("key", [{"prediction": object()}], [])
+        self.assertIsNone(cache.get("key"))
+
+
+
+class TestFingerprint(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_a = self._write("a.png", b"content a")
+        self.file_b = self._write("b.png", b"content b")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, name, content):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def test_input_digest_depends_on_content_only(self):
+        copy = self._write("copy.png", b"content a")
+        self.assertEqual(input_digest(self.file_a), input_digest(copy))
+        self.assertNotEqual(input_digest(self.file_a), input_digest(self.file_b))
+
+    def test_input_digest_of_multi_input_dict(self):
+        inputs = {"format": ["application/json"],
+                  "t1": {"type": ["image/png"], "fileurl": self.file_a},
+                  "t2": {"type": ["image/png"], "fileurl": self.file_b}}
+        swapped = {"format": ["application/json"],
+                   "t1": {"type": ["image/png"], "fileurl": self.file_b},
+                   "t2": {"type": ["image/png"], "fileurl": self.file_a}}
+        self.assertEqual(input_digest(inputs), input_digest(dict(inputs)))
+        self.assertNotEqual(input_digest(inputs), input_digest(swapped))
+
+    def test_model_fingerprint_changes_with_model_files(self):
+        fingerprint = model_fingerprint(self.temp_dir)
+        self.assertEqual(fingerprint, model_fingerprint(self.temp_dir))
+        self._write("model.txt", b"weights")
+        self.assertNotEqual(fingerprint, model_fingerprint(self.temp_dir))
+
+    def test_model_fingerprint_ignores_sample_data(self):
+        fingerprint = model_fingerprint(self.temp_dir)
+        os.makedirs(os.path.join(self.temp_dir, "sample_data"))
+        self._write(os.path.join("sample_data", "sample.png"), b"sample")
+        self.assertEqual(fingerprint, model_fingerprint(self.temp_dir))
+
+
+
+class TestModelHubAPIResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.this_dir = os.path.dirname(os.path.realpath(__file__))
+        self.contrib_src_dir = os.path.join(self.this_dir, "mockmodels", "contrib_src_si")
+        self.temp_dir = tempfile.mkdtemp()
+        self.model = ModelCountingInferences()
+        self.api = ModelHubAPI(self.model, self.contrib_src_dir)
+        self.api.output_folder = self.temp_dir
+        self.api.enable_result_cache()
+        self.input_file = self.contrib_src_dir + "/sample_data/testimage_ramp_4x2.png"
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_repeated_input_is_not_inferred_again(self):
+        first = self.api.predict(self.input_file)
+        second = self.api.predict(self.input_file)
+        self.assertEqual(1, self.model.num_inferences)
+        self.assertEqual(first["output"], second["output"])
+
+    def test_input_with_same_content_is_not_inferred_again(self):
+        copy = os.path.join(self.temp_dir, "copy.png")
+        shutil.copyfile(self.input_file, copy)
+        self.api.predict(self.input_file)
+        self.api.predict(copy)
+        self.assertEqual(1, self.model.num_inferences)
+
+    def test_cached_output_file_url_gets_current_url_root(self):
+        self.api.predict(self.input_file, url_root="http://first/")
+        result = self.api.predict(self.input_file, url_root="http://second/")
+        prediction = result["output"][1]["prediction"]
+        self.assertTrue(prediction.startswith("http://second/api" + self.temp_dir))
+        self.assertTrue(os.path.isfile(prediction[len("http://second/api"):]))
+
+    def test_input_is_inferred_again_if_output_file_was_removed(self):
+        result = self.api.predict(self.input_file)
+        os.remove(result["output"][1]["prediction"][len("api"):])
+        result = self.api.predict(self.input_file)
+        self.assertEqual(2, self.model.num_inferences)
+        self.assertTrue(os.path.isfile(result["output"][1]["prediction"][len("api"):]))
+
+    def test_numpy_to_file_setting_is_part_of_key(self):
+        self.api.predict(self.input_file)
+        result = self.api.predict(self.input_file, numpyToFile=False)
+        self.assertEqual(2, self.model.num_inferences)
+        self.assertListEqual([[0,1,1,0],[0,2,2,0]], result["output"][1]["prediction"])
+
+    def test_disabled_cache_infers_every_input(self):
+        self.api.disable_result_cache()
+        self.api.predict(self.input_file)
+        self.api.predict(self.input_file)
+        self.assertEqual(2, self.model.num_inferences)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
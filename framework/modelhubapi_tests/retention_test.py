@@ -0,0 +1,227 @@
+import unittest
+import os
+import json
+import time
+import shutil
+import tempfile
+from modelhublib import metrics
+from modelhubapi import ModelHubAPI
+from modelhubapi.retention import OutputRetention
+from .apitestbase import TestRESTAPIBase
+from .mockmodels.contrib_src_si.inference import Model, ModelCountingInferences
+
+
+class TestOutputRetention(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.evictions = metrics.registry.counter("modelhub_output_files_evicted_total", "",
+                                                  ("reason",))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, name, size=100, mtime=None):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, "wb") as f:
+            f.write(b"x" * size)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def _exists(self, name):
+        return os.path.exists(os.path.join(self.temp_dir, name))
+
+    def _retention(self, **kwargs):
+        retention = OutputRetention(self.temp_dir, **kwargs)
+        retention.stop()
+        return retention
+
+    def test_least_recently_accessed_files_are_removed_beyond_max_bytes(self):
+        retention = self._retention(max_bytes=250)
+        evictions = self.evictions.get(reason="size")
+        for name in ["a", "b", "c"]:
+            retention.add(self._write(name))
+        retention.touch("a")
+        self.assertEqual(1, retention.reap())
+        self.assertFalse(self._exists("b"))
+        self.assertTrue(self._exists("a"))
+        self.assertTrue(self._exists("c"))
+        self.assertTrue(retention.is_evicted("b"))
+        self.assertFalse(retention.is_evicted("a"))
+        self.assertEqual(evictions + 1, self.evictions.get(reason="size"))
+
+    def test_files_expire_after_ttl_since_last_access(self):
+        retention = self._retention(ttl=60)
+        retention.add(self._write("a"))
+        retention.add(self._write("b"))
+        self.assertEqual(0, retention.reap())
+        retention.touch(os.path.join(self.temp_dir, "b"))
+        self.assertEqual(2, retention.reap(now=time.time() + 61))
+        self.assertTrue(retention.is_evicted("a"))
+        self.assertTrue(retention.is_evicted("b"))
+
+    def test_untracked_files_are_tracked_from_their_modification_time(self):
+        now = time.time()
+        self._write("old", mtime=now - 120)
+        self._write("new", mtime=now - 10)
+        retention = self._retention(ttl=60)
+        self.assertEqual(1, retention.reap(now=now))
+        self.assertFalse(self._exists("old"))
+        self.assertTrue(self._exists("new"))
+
+    def test_untracked_older_files_are_removed_first(self):
+        now = time.time()
+        retention = self._retention(max_bytes=100)
+        retention.add(self._write("tracked"))
+        self._write("untracked", mtime=now - 120)
+        self.assertEqual(1, retention.reap(now=now))
+        self.assertFalse(self._exists("untracked"))
+        self.assertTrue(self._exists("tracked"))
+
+    def test_files_removed_by_others_are_forgotten(self):
+        retention = self._retention(max_bytes=150)
+        retention.add(self._write("a"))
+        os.remove(os.path.join(self.temp_dir, "a"))
+        retention.add(self._write("b"))
+        self.assertEqual(0, retention.reap())
+        self.assertFalse(retention.is_evicted("a"))
+
+    def test_no_limits_keep_all_files(self):
+        retention = self._retention()
+        retention.add(self._write("a"))
+        self.assertEqual(0, retention.reap(now=time.time() + 10**6))
+        self.assertTrue(self._exists("a"))
+
+    def test_reaper_thread_removes_files(self):
+        retention = OutputRetention(self.temp_dir, ttl=0, interval=0.05)
+        try:
+            retention.add(self._write("a"))
+            deadline = time.time() + 5
+            while self._exists("a") and time.time() < deadline:
+                time.sleep(0.05)
+            self.assertFalse(self._exists("a"))
+        finally:
+            retention.stop()
+
+    def test_evicted_names_are_bounded(self):
+        retention = self._retention(max_bytes=0, max_evicted=2)
+        for name in ["a", "b", "c"]:
+            retention.add(self._write(name))
+        self.assertEqual(3, retention.reap())
+        self.assertFalse(retention.is_evicted("a"))
+        self.assertTrue(retention.is_evicted("c"))
+
+    def test_accesses_are_shared_between_processes(self):
+        # e.g. two gunicorn workers serving the same output folder
+        now = time.time()
+        worker = self._retention(ttl=60)
+        reaper = self._retention(ttl=60)
+        self._write("a", mtime=now - 120)
+        self._write("b", mtime=now - 120)
+        worker.touch("a")
+        self.assertEqual(1, reaper.reap(now=now))
+        self.assertTrue(self._exists("a"))
+        self.assertFalse(self._exists("b"))
+
+    def test_evictions_are_shared_between_processes(self):
+        worker = self._retention(max_bytes=250)
+        reaper = self._retention(max_bytes=250)
+        for name in ["a", "b", "c"]:
+            worker.add(self._write(name))
+        worker.touch("a")
+        self.assertEqual(1, reaper.reap())
+        self.assertTrue(worker.is_evicted("b"))
+        self.assertFalse(worker.is_evicted("a"))
+        worker.add(self._write("b"))
+        self.assertFalse(reaper.is_evicted("b"))
+
+
+
+class TestModelHubAPIOutputRetention(unittest.TestCase):
+
+    def setUp(self):
+        self.this_dir = os.path.dirname(os.path.realpath(__file__))
+        self.contrib_src_dir = os.path.join(self.this_dir, "mockmodels", "contrib_src_si")
+        self.temp_dir = tempfile.mkdtemp()
+        self.model = ModelCountingInferences()
+        self.api = ModelHubAPI(self.model, self.contrib_src_dir)
+        self.api.output_folder = self.temp_dir
+        self.api.enable_output_retention(ttl=60)
+        self.input_file = self.contrib_src_dir + "/sample_data/testimage_ramp_4x2.png"
+
+    def tearDown(self):
+        self.api.disable_output_retention()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_saved_outputs_are_tracked(self):
+        result = self.api.predict(self.input_file)
+        mask_file = result["output"][1]["prediction"][len("api"):]
+        self.api.output_retention.reap(now=time.time() + 61)
+        self.assertFalse(os.path.exists(mask_file))
+        self.assertTrue(self.api.output_retention.is_evicted(mask_file))
+
+    def test_result_cache_hits_touch_output_files(self):
+        self.api.enable_result_cache()
+        result = self.api.predict(self.input_file)
+        mask_file = result["output"][1]["prediction"][len("api"):]
+        self.api.output_retention.touch = lambda path: touched.append(path)
+        touched = []
+        self.api.predict(self.input_file)
+        self.assertListEqual([mask_file], touched)
+
+    def test_result_cache_misses_evicted_outputs(self):
+        self.api.enable_result_cache()
+        self.api.predict(self.input_file)
+        self.api.output_retention.reap(now=time.time() + 61)
+        result = self.api.predict(self.input_file)
+        self.assertEqual(2, self.model.num_inferences)
+        self.assertTrue(os.path.exists(result["output"][1]["prediction"][len("api"):]))
+
+
+
+class TestModelHubRESTAPIOutputRetention(TestRESTAPIBase):
+
+    def setUp(self):
+        self.this_dir = os.path.dirname(os.path.realpath(__file__))
+        self.contrib_src_dir = os.path.join(self.this_dir, "mockmodels", "contrib_src_si")
+        self.setup_self_temp_work_dir()
+        self.setup_self_temp_output_dir()
+        self.setup_self_test_client(Model(), self.contrib_src_dir)
+        self.rest_api.api.enable_output_retention(ttl=60)
+
+    def tearDown(self):
+        self.rest_api.api.disable_output_retention()
+        shutil.rmtree(self.temp_work_dir, ignore_errors=True)
+        shutil.rmtree(self.temp_output_dir, ignore_errors=True)
+
+    def _predict_sample_output_url(self):
+        response = self.client.get("/api/predict_sample?filename=testimage_ramp_4x2.png")
+        prediction = json.loads(response.get_data())["output"][1]["prediction"]
+        return "/api/output/" + os.path.basename(prediction)
+
+    def test_evicted_output_returns_410(self):
+        url = self._predict_sample_output_url()
+        self.assertEqual(200, self.client.get(url).status_code)
+        self.rest_api.api.output_retention.reap(now=time.time() + 61)
+        response = self.client.get(url)
+        self.assertEqual(410, response.status_code)
+        self.assertIn("error", json.loads(response.get_data()))
+
+    def test_unknown_output_returns_404(self):
+        self.assertEqual(404, self.client.get("/api/output/unknown.h5").status_code)
+
+    def test_downloading_output_delays_expiry(self):
+        url = self._predict_sample_output_url()
+        retention = self.rest_api.api.output_retention
+        retention.ttl = 0.5
+        time.sleep(0.3)
+        self.client.get(url)
+        time.sleep(0.3)
+        retention.reap()
+        self.assertEqual(200, self.client.get(url).status_code)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
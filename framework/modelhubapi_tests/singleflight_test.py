@@ -0,0 +1,120 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import time
+from modelhublib import metrics
+from modelhubapi import ModelHubAPI
+from modelhubapi.singleflight import SingleFlight
+from .mockmodels.contrib_src_si.inference import ModelCountingInferences
+
+
+def run_concurrently(function, args_list):
+    results = [None] * len(args_list)
+    def run(i):
+        try:
+            results[i] = function(*args_list[i])
+        except Exception as e:
+            results[i] = e
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(args_list))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.coalesced = metrics.registry.counter("modelhub_predict_coalesced_total", "")
+        self.seconds_saved = metrics.registry.counter(
+            "modelhub_predict_coalesced_seconds_saved_total", "")
+
+    def tearDown(self):
+        pass
+
+    def _slow_function(self, value):
+        def function():
+            self.calls.append(value)
+            time.sleep(0.2)
+            return value
+        return function
+
+    def test_concurrent_calls_with_same_key_share_one_call(self):
+        single_flight = SingleFlight()
+        coalesced = self.coalesced.get()
+        seconds_saved = self.seconds_saved.get()
+        results = run_concurrently(single_flight.do,
+                                   [("key", self._slow_function(i)) for i in range(4)])
+        self.assertEqual(1, len(self.calls))
+        self.assertListEqual([self.calls[0]] * 4, results)
+        self.assertEqual(coalesced + 3, self.coalesced.get())
+        self.assertGreater(self.seconds_saved.get(), seconds_saved + 0.5)
+
+    def test_calls_with_different_keys_are_not_shared(self):
+        single_flight = SingleFlight()
+        results = run_concurrently(single_flight.do,
+                                   [(str(i), self._slow_function(i)) for i in range(3)])
+        self.assertListEqual([0, 1, 2], results)
+        self.assertEqual(3, len(self.calls))
+
+    def test_calls_after_finished_call_run_again(self):
+        single_flight = SingleFlight()
+        single_flight.do("key", self._slow_function(1))
+        self.assertEqual(2, single_flight.do("key", self._slow_function(2)))
+
+    def test_exception_is_raised_for_all_callers(self):
+        single_flight = SingleFlight()
+        def failing_function():
+            time.sleep(0.2)
+            raise IOError("mock error")
+        results = run_concurrently(single_flight.do, [("key", failing_function)] * 3)
+        for result in results:
+            self.assertIsInstance(result, IOError)
+
+
+
+class TestModelHubAPIRequestCoalescing(unittest.TestCase):
+
+    def setUp(self):
+        self.this_dir = os.path.dirname(os.path.realpath(__file__))
+        self.contrib_src_dir = os.path.join(self.this_dir, "mockmodels", "contrib_src_si")
+        self.temp_dir = tempfile.mkdtemp()
+        self.model = ModelCountingInferences(delay=0.2)
+        self.api = ModelHubAPI(self.model, self.contrib_src_dir)
+        self.api.output_folder = self.temp_dir
+        self.api.enable_request_coalescing()
+        self.input_file = self.contrib_src_dir + "/sample_data/testimage_ramp_4x2.png"
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_concurrent_identical_predictions_run_one_inference(self):
+        results = run_concurrently(self.api.predict,
+                                   [(self.input_file, True, "http://host%d/" % i)
+                                    for i in range(4)])
+        self.assertEqual(1, self.model.num_inferences)
+        mask_file = results[0]["output"][1]["prediction"][len("http://host0/api"):]
+        for i, result in enumerate(results):
+            self.assertEqual("http://host%d/api%s" % (i, mask_file),
+                             result["output"][1]["prediction"])
+
+    def test_sequential_predictions_run_own_inference(self):
+        self.api.predict(self.input_file)
+        self.api.predict(self.input_file)
+        self.assertEqual(2, self.model.num_inferences)
+
+    def test_predictions_on_unreadable_inputs_are_not_coalesced(self):
+        results = run_concurrently(self.api.predict, [("missing.png",)] * 3)
+        self.assertEqual(3, self.model.num_inferences)
+        for result in results:
+            self.assertIn("error", result)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
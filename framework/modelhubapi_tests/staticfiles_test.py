@@ -0,0 +1,105 @@
+import unittest
+import os
+import io
+import gzip
+import shutil
+from .apitestbase import TestRESTAPIBase
+from .mockmodels.contrib_src_si.inference import Model
+
+
+class TestModelHubRESTAPIStaticFiles(TestRESTAPIBase):
+
+    def setUp(self):
+        self.this_dir = os.path.dirname(os.path.realpath(__file__))
+        self.contrib_src_dir = os.path.join(self.this_dir, "mockmodels", "contrib_src_si")
+        self.setup_self_temp_work_dir()
+        self.setup_self_temp_output_dir()
+        self.setup_self_test_client(Model(), self.contrib_src_dir)
+        self.content = b"0123456789abcdef" * 1024
+        with open(os.path.join(self.temp_output_dir, "output.txt"), "wb") as f:
+            f.write(self.content)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_work_dir, ignore_errors=True)
+        shutil.rmtree(self.temp_output_dir, ignore_errors=True)
+
+    def _get(self, url, **headers):
+        response = self.client.get(url, headers=headers)
+        data = response.get_data()
+        response.close()
+        return response, data
+
+    def test_thumbnail_is_cacheable_with_strong_etag(self):
+        response, _ = self._get("/api/thumbnail/thumbnail.jpg")
+        self.assertEqual(200, response.status_code)
+        etag, weak = response.get_etag()
+        self.assertFalse(weak)
+        self.assertEqual(32, len(etag))
+        self.assertTrue(response.cache_control.public)
+        self.assertEqual(86400, response.cache_control.max_age)
+
+    def test_if_none_match_returns_304(self):
+        response, _ = self._get("/api/samples/testimage_ramp_4x2.png")
+        response, data = self._get("/api/samples/testimage_ramp_4x2.png",
+                                   **{"If-None-Match": response.headers["ETag"]})
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(b"", data)
+
+    def test_etag_depends_on_content_only(self):
+        response, _ = self._get("/api/output/output.txt")
+        path = os.path.join(self.temp_output_dir, "output.txt")
+        os.utime(path, (0, 0))
+        self.assertEqual(response.headers["ETag"],
+                         self._get("/api/output/output.txt")[0].headers["ETag"])
+        with open(path, "wb") as f:
+            f.write(b"changed")
+        self.assertNotEqual(response.headers["ETag"],
+                            self._get("/api/output/output.txt")[0].headers["ETag"])
+
+    def test_range_request_returns_partial_content(self):
+        response, data = self._get("/api/output/output.txt", Range="bytes=16-31",
+                                   **{"Accept-Encoding": "gzip"})
+        self.assertEqual(206, response.status_code)
+        self.assertEqual(self.content[16:32], data)
+        self.assertIsNone(response.content_encoding)
+
+    def test_compressible_files_are_gzipped(self):
+        response, data = self._get("/api/output/output.txt", **{"Accept-Encoding": "gzip"})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("gzip", response.content_encoding)
+        self.assertIn("Accept-Encoding", response.vary)
+        self.assertLess(len(data), len(self.content) / 10)
+        self.assertEqual(self.content, gzip.GzipFile(fileobj=io.BytesIO(data)).read())
+        response, data = self._get("/api/output/output.txt",
+                                   **{"Accept-Encoding": "gzip",
+                                      "If-None-Match": response.headers["ETag"]})
+        self.assertEqual(304, response.status_code)
+
+    def test_files_are_not_gzipped_without_accept_encoding(self):
+        response, data = self._get("/api/output/output.txt")
+        self.assertIsNone(response.content_encoding)
+        self.assertEqual(self.content, data)
+
+    def test_compressed_and_incompressible_files_are_not_gzipped(self):
+        response, _ = self._get("/api/thumbnail/thumbnail.jpg", **{"Accept-Encoding": "gzip"})
+        self.assertIsNone(response.content_encoding)
+        with open(os.path.join(self.temp_output_dir, "random.bin"), "wb") as f:
+            f.write(os.urandom(4096))
+        response, _ = self._get("/api/output/random.bin", **{"Accept-Encoding": "gzip"})
+        self.assertIsNone(response.content_encoding)
+
+    def test_outputs_are_private_and_immutable(self):
+        response, _ = self._get("/api/output/output.txt")
+        self.assertTrue(response.cache_control.private)
+        self.assertTrue(response.cache_control.immutable)
+
+    def test_paths_outside_folder_are_rejected(self):
+        response, _ = self._get("/api/samples/..%2Finference.py")
+        self.assertEqual(404, response.status_code)
+        response, _ = self._get("/api/output/missing.h5")
+        self.assertEqual(404, response.status_code)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from modelhubapi import ModelHubAPI
+from .apitestbase import TestRESTAPIBase
+from .mockmodels.contrib_src_si.inference import Model, ModelCountingInferences
+
+
+class ModelRecordingStatus(Model):
+    """
+    Records the API's status during each inference.
+    """
+
+    def __init__(self):
+        self.api = None
+        self.statuses = []
+
+    def infer(self, input):
+        self.statuses.append(self.api.get_status())
+        return super(ModelRecordingStatus, self).infer(input)
+
+
+
+class TestModelHubAPIWarmUp(unittest.TestCase):
+
+    def setUp(self):
+        self.this_dir = os.path.dirname(os.path.realpath(__file__))
+        self.contrib_src_dir = os.path.join(self.this_dir, "mockmodels", "contrib_src_si")
+        self.temp_dir = tempfile.mkdtemp()
+        self.model = ModelCountingInferences()
+        self.api = ModelHubAPI(self.model, self.contrib_src_dir)
+        self.api.output_folder = self.temp_dir
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_warm_up_runs_on_sample_data(self):
+        report = self.api.warm_up(runs=3)
+        self.assertEqual(6, self.model.num_inferences)
+        self.assertEqual(2, report["inputs"])
+        self.assertEqual(0, report["failed"])
+        self.assertIsNotNone(report["cold_ms"])
+        self.assertIsNotNone(report["warm_ms"])
+        self.assertIs(report, self.api.warm_up_report)
+        self.assertListEqual([], os.listdir(self.temp_dir))
+
+    def test_warm_up_on_given_inputs(self):
+        report = self.api.warm_up([self.contrib_src_dir + "/sample_data/testimage_ramp_4x2.png"],
+                                  runs=1)
+        self.assertEqual(1, self.model.num_inferences)
+        self.assertIsNone(report["warm_ms"])
+
+    def test_failing_inputs_are_skipped(self):
+        report = self.api.warm_up(["missing.png",
+                                   self.contrib_src_dir + "/sample_data/testimage_ramp_4x2.png"])
+        self.assertEqual(1, report["failed"])
+        self.assertEqual(3, self.model.num_inferences)
+        self.assertTrue(self.api.get_status()["ready"])
+
+    def test_api_is_not_ready_while_warming_up(self):
+        model = ModelRecordingStatus()
+        api = ModelHubAPI(model, self.contrib_src_dir)
+        model.api = api
+        self.assertTrue(api.get_status()["ready"])
+        api.warm_up(runs=1)
+        self.assertEqual("warming_up", model.statuses[0]["status"])
+        self.assertFalse(model.statuses[0]["ready"])
+        status = api.get_status()
+        self.assertEqual("ready", status["status"])
+        self.assertEqual(2, status["warm_up"]["inputs"])
+
+    def test_invalid_config_is_not_ready(self):
+        api = ModelHubAPI(self.model, os.path.join(self.this_dir, "mockmodels",
+                                                   "void_contrib_src"))
+        status = api.get_status()
+        self.assertFalse(status["ready"])
+        self.assertEqual("error", status["status"])
+
+
+
+class TestModelHubRESTAPIHealthChecks(TestRESTAPIBase):
+
+    def setUp(self):
+        self.this_dir = os.path.dirname(os.path.realpath(__file__))
+        self.contrib_src_dir = os.path.join(self.this_dir, "mockmodels", "contrib_src_si")
+        self.setup_self_temp_work_dir()
+        self.setup_self_temp_output_dir()
+        self.model = ModelRecordingStatus()
+        self.setup_self_test_client(self.model, self.contrib_src_dir)
+        self.model.api = self.rest_api.api
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_work_dir, ignore_errors=True)
+        shutil.rmtree(self.temp_output_dir, ignore_errors=True)
+
+    def test_live_returns_200(self):
+        response = self.client.get("/api/live")
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("live", json.loads(response.get_data())["status"])
+
+    def test_ready_returns_200_after_warm_up(self):
+        self.rest_api.api.warm_up(runs=1)
+        response = self.client.get("/api/ready")
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(2, json.loads(response.get_data())["warm_up"]["inputs"])
+
+    def test_ready_returns_503_while_warming_up(self):
+        responses = []
+        self.model.infer = lambda input: responses.append(self.client.get("/api/ready"))
+        self.rest_api.api.warm_up(runs=1)
+        self.assertEqual(503, responses[0].status_code)
+        self.assertEqual("warming_up", json.loads(responses[0].get_data())["status"])
+
+
+
+if __name__ == '__main__':
+    unittest.main()
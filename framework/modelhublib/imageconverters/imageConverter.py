@@ -4,13 +4,32 @@ class ImageConverter(object):
     For each image loader derived from :class:`~modelhublib.imageloaders.imageLoader.ImageLoader`
     you should implement a corresponding image converter using this as base class.
 
+    Converters may support a copy-free mode, in which they read the image's
+    pixel buffer through views where possible and allocate the final 4D array only
+    once. This lowers peak memory and conversion time on large volumes. The values
+    of the converted array are the same in both modes.
+
     Args:
         sucessor (ImageConverter): Next converter in chain to attempt loading the image if this one fails.
+        copyFree (bool): Whether to convert in copy-free mode.
     """
-    def __init__(self, successor = None):
+    def __init__(self, successor = None, copyFree = False):
         self._successor = successor
+        self.copyFree = copyFree
     
 
+    def setCopyFree(self, copyFree):
+        """
+        Enables or disables copy-free mode for this converter and all its successors.
+
+        Args:
+            copyFree (bool): Whether to convert in copy-free mode.
+        """
+        self.copyFree = copyFree
+        if self._successor:
+            self._successor.setCopyFree(copyFree)
+
+
     def setSuccessor(self, successor):
         """
         Setting the next converter in chain of responsibility.
@@ -21,7 +40,7 @@ class ImageConverter(object):
         self._successor = successor
 
 
-    def convert(self, image):
+    def convert(self, image, skip=None):
         """
         Tries to convert image to numpy and on fail forwards convert request to next handler
         until sucess or final fail.
@@ -32,6 +51,8 @@ class ImageConverter(object):
         
         Args:
             image: Image object to convert.
+            skip (type or None): Converters of exactly this type are not asked,
+                e.g. because one of them already failed on image.
         
         Returns:
             Numpy array as converted by :func:`~_convert` or a successor converter.
@@ -40,10 +61,12 @@ class ImageConverter(object):
             IOError if image could not be converted by any converter in the chain.
         """
         try:
+            if type(self) is skip:
+                raise IOError("Skipped converter.")
             npArr = self._convert(image)
         except:
             if self._successor:
-                return self._successor.convert(image)
+                return self._successor.convert(image, skip=skip)
             else:
                 raise IOError("Could not convert image of type \"%s\" to Numpy array." % type(image).__name__)
         return npArr
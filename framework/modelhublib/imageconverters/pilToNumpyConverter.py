@@ -21,6 +21,8 @@ class PilToNumpyConverter(ImageConverter):
             IOError if input is not of type PIL.Image or cannot be converted for other reasons.
         """
         if isinstance(image, PIL.Image.Image):
+            if self.copyFree:
+                return self.__convertToNumpyCopyFree(image)
             return self.__convertToNumpy(image)
         else:
             raise IOError("Image is not of type \"PIL.Image.Image\".")
@@ -35,3 +37,16 @@ class PilToNumpyConverter(ImageConverter):
         npArr = npArr[np.newaxis,:].astype(np.float32)
         return npArr
 
+
+    def __convertToNumpyCopyFree(self, image):
+        # np.asarray wraps the pixel data exported by PIL without copying it
+        # again, moveaxis only creates a view. The final array is allocated
+        # once and filled with a single casting copy.
+        npArr = np.asarray(image)
+        if npArr.ndim == 2:
+            npArr = npArr[np.newaxis,:]
+        else:
+            npArr = np.moveaxis(npArr, -1, 0)
+        result = np.empty((1,) + npArr.shape, dtype=np.float32)
+        result[0] = npArr
+        return result
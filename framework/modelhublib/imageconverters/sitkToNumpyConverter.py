@@ -21,6 +21,8 @@ class SitkToNumpyConverter(ImageConverter):
             IOError if input is not of type SimpleITK.Image or cannot be converted for other reasons.
         """
         if isinstance(image, SimpleITK.Image):
+            if self.copyFree:
+                return self.__convertToNumpyCopyFree(image)
             return self.__convertToNumpy(image)
         else:
             raise IOError("Image is not of type \"SimpleITK.Image\".")
@@ -33,3 +35,13 @@ class SitkToNumpyConverter(ImageConverter):
         npArr = npArr[np.newaxis,:].astype(np.float32)
         return npArr
 
+
+    def __convertToNumpyCopyFree(self, image):
+        # The view shares the image's buffer, so the only copy made is the
+        # (casting) copy into the final array, which cannot alias the image.
+        view = SimpleITK.GetArrayViewFromImage(image)
+        if view.ndim == 2:
+            view = view[np.newaxis,:]
+        npArr = np.empty((1,) + view.shape, dtype=np.float32)
+        npArr[0] = view
+        return npArr
@@ -3,3 +3,4 @@ from .imageLoader import ImageLoader
 from .pilImageLoader import PilImageLoader
 from .sitkImageLoader import SitkImageLoader
 from .numpyImageLoader import NumpyImageLoader
+from .loaderRegistry import LoaderRegistry
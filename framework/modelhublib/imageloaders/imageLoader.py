@@ -1,3 +1,8 @@
+import io
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
 import six
 
 
@@ -25,7 +30,7 @@ class ImageLoader(object):
         self._successor = successor
 
 
-    def load(self, input, id=None):
+    def load(self, input, id=None, skip=None):
         """
         Tries to load input and on fail forwards load request to next handler
         until success or final fail.
@@ -34,8 +39,16 @@ class ImageLoader(object):
         :func:`~_load` to load the image type you want to support and
         let this function as it is to handle the chain of responsibility and errors.
 
+        Besides a file name, input can also be the file's content, either as
+        bytes or as a seekable file-like object (e.g. io.BytesIO). Set the
+        "name" attribute of a file-like object to a file name with the
+        correct extension, since some loaders need it to identify the format.
+
         Args:
-            input (str): Name of the input file to be loaded.
+            input (str, bytes or file-like): Name or content of the input file to be loaded.
+            id (str or None): ID of the input when handling multiple inputs
+            skip (type or None): Loaders of exactly this type are not asked, e.g.
+                because one of them already failed on input.
 
         Returns:
             Image object as loaded by :func:`~_load` or a successor load handler.
@@ -43,16 +56,53 @@ class ImageLoader(object):
         Raises:
             IOError if input could not be loaded by any load handler in the chain.
         """
-        try:
-            image = self._load(input)
-        except:
+        if isinstance(input, six.binary_type) and not isinstance(input, six.string_types):
+            input = io.BytesIO(input)
+        image = self._loadSingle(input, id) if type(self) is not skip else None
+        if image is None:
             if self._successor:
-                return self._successor.load(input, id=id)
+                return self._successor.load(input, id=id, skip=skip)
             else:
                 if isinstance(input, six.string_types):
                     raise IOError("Was not able to load the file \"%s\"." % input)
                 else:
                     raise IOError("Was not able to load input of type \"%s\"." % type(input).__name__)
+        return image
+
+
+    def _loadSingle(self, input, id=None):
+        """
+        Loads input with this loader only, ignoring the chain of responsibility.
+
+        Args:
+            input (str or file-like): Name or content of the input file to be loaded.
+            id (str or None): ID of the input when handling multiple inputs
+
+        If the loader can read the image dimensions from the input's header
+        (see :func:`~_probeImageDimensions`), they are checked against the
+        configuration before any pixel data is decoded.
+
+        Returns:
+            Image object as loaded by :func:`~_load` or None if this loader
+            cannot load input.
+
+        Raises:
+            IOError if the image does not comply with the configuration.
+        """
+        try:
+            if hasattr(input, "seek"):
+                input.seek(0)
+            imageDims = self._probeImageDimensions(input)
+        except:
+            imageDims = None
+        if imageDims is not None:
+            self._checkDimensionsCompliance(imageDims, id)
+        try:
+            if hasattr(input, "seek"):
+                input.seek(0)
+            image = self._load(input)
+        except:
+            return None
         self._checkConfigCompliance(image, id)
         return image
 
@@ -62,10 +112,12 @@ class ImageLoader(object):
         Abstract method. Overwrite to implement loading of the input format you want to support.
 
         When overwriting this, make sure to raise IOError if input cannot
-        be loaded.
+        be loaded. Input is either a file name or a seekable file-like object
+        positioned at its start. If the library you use can only read from files,
+        use :func:`~_inputAsFile` to get a file name in both cases.
 
         Args:
-            input (str): Name of the input file to be loaded.
+            input (str or file-like): Name or content of the input file to be loaded.
 
         Returns:
             Should return image object in the native format of the library using to load it.
@@ -73,6 +125,56 @@ class ImageLoader(object):
         raise NotImplementedError("This is a method of an abstract class.")
 
 
+    def _probeImageDimensions(self, input):
+        """
+        Reads the image dimensions from the input's header without decoding
+        any pixel data, so inputs not complying with the configuration can be
+        rejected before they are loaded.
+
+        Overwrite this if the library you use supports reading only the header
+        of your image format. The default implementation returns None, in which
+        case the dimensions are only checked after :func:`~_load`.
+
+        Args:
+            input (str or file-like): Name or content of the input file.
+
+        Returns:
+            Image dimensions as 3 tuple (z, y, x), the same as
+            :func:`~_getImageDimensions` would return for the loaded image,
+            or None if the dimensions cannot be read without loading the image.
+        """
+        return None
+
+
+    @contextmanager
+    def _inputAsFile(self, input):
+        """
+        Context manager providing a file name for input. If input is a file-like
+        object, its content is written to a temporary file, which is removed on
+        exit. The temporary file gets the same extension as the name of the
+        file-like object (if any), so libraries relying on the extension to
+        identify the format can read it.
+
+        Args:
+            input (str or file-like): Name or content of the input file.
+
+        Returns:
+            Name of a file with the input's content.
+        """
+        if isinstance(input, six.string_types):
+            yield input
+            return
+        baseName = os.path.basename(str(getattr(input, "name", "")))
+        suffix = baseName[baseName.find(os.extsep):] if os.extsep in baseName else ""
+        fileHandle, fileName = tempfile.mkstemp(suffix=suffix)
+        try:
+            with os.fdopen(fileHandle, "wb") as f:
+                shutil.copyfileobj(input, f)
+            yield fileName
+        finally:
+            os.remove(fileName)
+
+
     def _checkConfigCompliance(self, image, id=None):
         """
         Checks if image complies with configuration.
@@ -88,6 +190,20 @@ class ImageLoader(object):
             IOError if image dimensions do not comply with configuration.
         """
         imageDims = self._getImageDimensions(image)
+        self._checkDimensionsCompliance(imageDims, id)
+
+
+    def _checkDimensionsCompliance(self, imageDims, id=None):
+        """
+        Checks if image dimensions comply with configuration.
+
+        Args:
+            imageDims: Image dimensions (z, y, x) as returned by :func:`~_getImageDimensions`
+                or :func:`~_probeImageDimensions`
+
+        Raises:
+            IOError if image dimensions do not comply with configuration.
+        """
         if id is None:
             limits = self._config["model"]["io"]["input"]["single"]["dim_limits"]
         else:
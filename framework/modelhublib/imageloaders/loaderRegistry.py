@@ -0,0 +1,198 @@
+import io
+import os
+import six
+
+from .. import metrics
+
+
+_routedLoads = metrics.registry.counter(
+    "modelhub_image_loader_routed_total",
+    "Inputs loaded directly by the loader their format was routed to.",
+    ("loader",))
+_fallbacks = metrics.registry.counter(
+    "modelhub_image_loader_fallbacks_total",
+    "Inputs and images handed to the chain of responsibility, because "
+    "routing did not find a loader or converter or the routed one failed.",
+    ("stage", "reason"))
+
+
+class LoaderRegistry(object):
+    """
+    Routes inputs directly to the one image loader able to read their format,
+    instead of trying all loaders of a chain of responsibility one after another.
+    The format is identified by the input's magic bytes, file extension or
+    mime type (in this order). For each loader, the registry also holds the
+    matching image converter, which is picked by the type of the loaded image.
+
+    Loaders registered here should have no successor. If routing fails,
+    the caller is expected to fall back to its chain of responsibility.
+    Each fallback is counted in the metric "modelhub_image_loader_fallbacks_total"
+    (see :mod:`modelhublib.metrics`).
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._headerSize = 0
+
+
+    def register(self, loader, converter, imageType, mimeTypes=(), extensions=(), magicBytes=()):
+        """
+        Registers a loader and its matching converter. Formats claimed by
+        several loaders are routed to the one registered first.
+
+        Args:
+            loader (ImageLoader): Loader for the formats given below.
+            converter (ImageConverter): Converter for images loaded by loader.
+            imageType (type): Type of the image objects loader returns.
+            mimeTypes (list): Mime types of the supported formats.
+            extensions (list): File extensions of the supported formats, including
+                the leading dot (e.g. ".nii.gz").
+            magicBytes (list): Tuples (offset, bytes) identifying the supported
+                formats by their file content.
+        """
+        entry = _Entry(loader, converter, imageType,
+                       [mimeType.lower() for mimeType in mimeTypes],
+                       [extension.lower() for extension in extensions],
+                       list(magicBytes))
+        self._entries.append(entry)
+        for offset, magic in entry.magicBytes:
+            self._headerSize = max(self._headerSize, offset + len(magic))
+
+
+    def route(self, input, mimeType=None):
+        """
+        Args:
+            input (str, bytes or file-like): Name or content of the input file.
+            mimeType (str or None): Mime type of the input, if known.
+
+        Returns:
+            The loader registered for the input's format or None if the format
+            is not known.
+        """
+        entry = self._routeEntry(input, mimeType)
+        return entry.loader if entry is not None else None
+
+
+    def load(self, input, id=None, mimeType=None):
+        """
+        Loads input with the loader its format is routed to.
+
+        Args:
+            input (str, bytes or file-like): Name or content of the input file.
+            id (str or None): ID of the input when handling multiple inputs
+            mimeType (str or None): Mime type of the input, if known.
+
+        Returns:
+            Loaded image object or None if no loader was found or the routed
+            loader failed to load input.
+
+        Raises:
+            IOError if the loaded image does not comply with the configuration.
+        """
+        if isinstance(input, six.binary_type) and not isinstance(input, six.string_types):
+            input = io.BytesIO(input)
+        entry = self._routeEntry(input, mimeType)
+        if entry is None:
+            _fallbacks.inc(stage="load", reason="unknown_format")
+            return None
+        image = entry.loader._loadSingle(input, id)
+        if image is None:
+            _fallbacks.inc(stage="load", reason="routed_loader_failed")
+            return None
+        _routedLoads.inc(loader=type(entry.loader).__name__)
+        return image
+
+
+    def converterFor(self, image):
+        """
+        Returns:
+            The converter registered for the type of image or None if unknown.
+        """
+        for entry in self._entries:
+            if isinstance(image, entry.imageType):
+                return entry.converter
+        return None
+
+
+    def converters(self):
+        """
+        Returns:
+            list: All registered converters in order of registration.
+        """
+        return [entry.converter for entry in self._entries]
+
+
+    def convert(self, image):
+        """
+        Converts image with the converter registered for its type.
+
+        Returns:
+            Numpy array as returned by the converter or None if no converter was
+            found or the converter failed.
+        """
+        converter = self.converterFor(image)
+        if converter is None:
+            _fallbacks.inc(stage="convert", reason="unknown_image_type")
+            return None
+        try:
+            return converter.convert(image)
+        except IOError:
+            _fallbacks.inc(stage="convert", reason="routed_converter_failed")
+            return None
+
+
+    # -------------------------------------------------------------------------
+    # Private helper functions
+    # -------------------------------------------------------------------------
+
+    def _routeEntry(self, input, mimeType):
+        header = self._readHeader(input)
+        if header:
+            for entry in self._entries:
+                for offset, magic in entry.magicBytes:
+                    if header[offset:offset + len(magic)] == magic:
+                        return entry
+        name = input if isinstance(input, six.string_types) else getattr(input, "name", None)
+        if isinstance(name, six.string_types):
+            name = name.lower()
+            for entry in self._entries:
+                for extension in entry.extensions:
+                    if name.endswith(extension):
+                        return entry
+        if mimeType:
+            mimeType = mimeType.lower()
+            for entry in self._entries:
+                if mimeType in entry.mimeTypes:
+                    return entry
+        return None
+
+
+    def _readHeader(self, input):
+        """
+        Reads the first bytes of input needed to check all registered magic
+        bytes. File-like inputs are rewound afterwards.
+        """
+        try:
+            if isinstance(input, six.string_types):
+                with open(input, "rb") as f:
+                    return f.read(self._headerSize)
+            if hasattr(input, "read") and hasattr(input, "seek"):
+                input.seek(0)
+                header = input.read(self._headerSize)
+                input.seek(0)
+                return header
+        except (IOError, OSError):
+            pass
+        return b""
+
+
+
+class _Entry(object):
+
+    def __init__(self, loader, converter, imageType, mimeTypes, extensions, magicBytes):
+        self.loader = loader
+        self.converter = converter
+        self.imageType = imageType
+        self.mimeTypes = mimeTypes
+        self.extensions = extensions
+        self.magicBytes = magicBytes
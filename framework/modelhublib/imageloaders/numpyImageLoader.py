@@ -1,3 +1,4 @@
+import six
 import numpy as np
 from .imageLoader import ImageLoader
 
@@ -12,7 +13,7 @@ class NumpyImageLoader(ImageLoader):
         Loads input using numpy
 
         Args:
-            input (str): Name of the input file to be loaded
+            input (str or file-like): Name or content of the input file to be loaded
 
         Returns:
             numpy ndarray
@@ -20,6 +21,37 @@ class NumpyImageLoader(ImageLoader):
         return np.load(input)
 
 
+    def _probeImageDimensions(self, input):
+        """
+        Reads the array shape from the header of a .npy file, without
+        reading the array data. Other formats (.npz, pickles) are not probed.
+
+        Args:
+            input (str or file-like): Name or content of the input file
+
+        Returns:
+            Array shape read from the .npy header or None for other formats
+        """
+        if isinstance(input, six.string_types):
+            with open(input, "rb") as f:
+                return self._readNpyShape(f)
+        return self._readNpyShape(input)
+
+
+    def _readNpyShape(self, f):
+        if f.read(len(np.lib.format.MAGIC_PREFIX)) != np.lib.format.MAGIC_PREFIX:
+            return None
+        f.seek(-len(np.lib.format.MAGIC_PREFIX), 1)
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, _, _ = np.lib.format.read_array_header_1_0(f)
+        elif version == (2, 0):
+            shape, _, _ = np.lib.format.read_array_header_2_0(f)
+        else:
+            return None
+        return shape
+
+
     def _getImageDimensions(self, image):
         """
         Args:
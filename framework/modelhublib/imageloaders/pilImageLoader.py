@@ -7,6 +7,11 @@ from .imageLoader import ImageLoader
 class PilImageLoader(ImageLoader):
     """
     Loads common 2d image formats (png, jpg, ...) using Pillow (PIL).
+
+    PIL opens images lazily, only the header is read by :func:`_load`. Pixel data
+    is decoded on first access, i.e. during conversion to numpy. Hence the
+    dimensions are already checked against the configuration before any pixel
+    data is decoded, and no separate header probe is needed.
     """
 
     def _load(self, input):
@@ -14,7 +19,7 @@ class PilImageLoader(ImageLoader):
         Loads input using PIL.
 
         Args:
-            input (str): Name of the input file to be loaded
+            input (str or file-like): Name or content of the input file to be loaded
 
         Returns:
             PIL.Image object
@@ -1,3 +1,4 @@
+import six
 import SimpleITK as sitk
 
 from .imageLoader import ImageLoader
@@ -10,15 +11,38 @@ class SitkImageLoader(ImageLoader):
 
     def _load(self, input):
         """
-        Loads input using SimpleITK.
+        Loads input using SimpleITK. SimpleITK can only read from files,
+        so file-like inputs are written to a temporary file first.
 
         Args:
-            input (str): Name of the input file to be loaded
+            input (str or file-like): Name or content of the input file to be loaded
 
         Returns:
             SimpleITK.Image object
         """
-        return sitk.ReadImage(input)
+        with self._inputAsFile(input) as fileName:
+            return sitk.ReadImage(fileName)
+
+
+    def _probeImageDimensions(self, input):
+        """
+        Reads the image dimensions from the file header using
+        SimpleITK.ImageFileReader.ReadImageInformation, without reading
+        the pixel data. File-like inputs are not probed, since SimpleITK
+        would need them written to a file first.
+
+        Args:
+            input (str or file-like): Name or content of the input file
+
+        Returns:
+            Image dimensions read from the file header or None for file-like inputs
+        """
+        if not isinstance(input, six.string_types):
+            return None
+        reader = sitk.ImageFileReader()
+        reader.SetFileName(input)
+        reader.ReadImageInformation()
+        return self._sizeToDimensions(reader.GetSize())
 
 
     def _getImageDimensions(self, image):
@@ -29,7 +53,11 @@ class SitkImageLoader(ImageLoader):
         Returns:
             Image dimensions from SimpleITK image object
         """
-        imageDims = list(image.GetSize())
+        return self._sizeToDimensions(image.GetSize())
+
+
+    def _sizeToDimensions(self, size):
+        imageDims = list(size)
         if len(imageDims) == 2:
             imageDims.append(1)
         imageDims = imageDims[::-1]
@@ -0,0 +1,355 @@
+import time
+import bisect
+import threading
+from collections import OrderedDict
+
+
+#: Default histogram buckets in seconds, from 1 ms to 1 min.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Counter(object):
+    """
+    Monotonically increasing counter, optionally split by labels.
+
+    Args:
+        name (str): Name of the metric.
+        documentation (str): Short description of what is counted.
+        labelNames (tuple): Names of the labels each count is split by.
+    """
+
+    def __init__(self, name, documentation, labelNames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelNames = tuple(labelNames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+
+    def inc(self, amount=1, **labels):
+        """
+        Increases the count for the given label values.
+
+        Args:
+            amount (int or float): Non-negative amount to increase the count by.
+            labels: One keyword argument per label name with the label's value.
+        """
+        key = self._labelValues(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+    def get(self, **labels):
+        """
+        Returns:
+            Current count for the given label values.
+        """
+        return self._values.get(self._labelValues(labels), 0)
+
+
+    def samples(self):
+        """
+        Returns:
+            list: Tuples (label values dict, count) for all counted label values.
+        """
+        with self._lock:
+            items = list(self._values.items())
+        return [(dict(zip(self.labelNames, key)), value) for key, value in items]
+
+
+    def _labelValues(self, labels):
+        return _labelValues(self, labels)
+
+
+
+class Gauge(object):
+    """
+    Value that can go up and down, e.g. the number of requests in progress,
+    optionally split by labels.
+
+    Args:
+        name (str): Name of the metric.
+        documentation (str): Short description of what is measured.
+        labelNames (tuple): Names of the labels each value is split by.
+    """
+
+    def __init__(self, name, documentation, labelNames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelNames = tuple(labelNames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+
+    def inc(self, amount=1, **labels):
+        """
+        Increases the value for the given label values by amount.
+        """
+        key = _labelValues(self, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+    def dec(self, amount=1, **labels):
+        """
+        Decreases the value for the given label values by amount.
+        """
+        self.inc(-amount, **labels)
+
+
+    def set(self, value, **labels):
+        """
+        Sets the value for the given label values.
+        """
+        key = _labelValues(self, labels)
+        with self._lock:
+            self._values[key] = value
+
+
+    def get(self, **labels):
+        """
+        Returns:
+            Current value for the given label values.
+        """
+        return self._values.get(_labelValues(self, labels), 0)
+
+
+    def trackInProgress(self, **labels):
+        """
+        Returns:
+            Context manager increasing the value on enter and decreasing it
+            on exit.
+        """
+        return _InProgress(self, labels)
+
+
+    def samples(self):
+        """
+        Returns:
+            list: Tuples (label values dict, value) for all set label values.
+        """
+        with self._lock:
+            items = list(self._values.items())
+        return [(dict(zip(self.labelNames, key)), value) for key, value in items]
+
+
+
+class Histogram(object):
+    """
+    Counts observed values (usually durations in seconds) in buckets,
+    optionally split by labels. Also keeps their count and sum.
+
+    Args:
+        name (str): Name of the metric.
+        documentation (str): Short description of what is observed.
+        labelNames (tuple): Names of the labels the observations are split by.
+        buckets (tuple): Sorted upper bounds of the buckets. A bucket for
+            all values (+Inf) is always added.
+    """
+
+    def __init__(self, name, documentation, labelNames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelNames = tuple(labelNames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+
+    def observe(self, value, **labels):
+        """
+        Records an observed value for the given label values.
+        """
+        key = _labelValues(self, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0, 0.0]
+            entry[0][index] += 1
+            entry[1] += 1
+            entry[2] += value
+
+
+    def time(self, **labels):
+        """
+        Returns:
+            Context manager observing the time in seconds spent inside it.
+        """
+        return _Timer(self, labels)
+
+
+    def get(self, **labels):
+        """
+        Returns:
+            tuple: Number and sum of the values observed for the given label
+            values.
+        """
+        entry = self._values.get(_labelValues(self, labels))
+        return (entry[1], entry[2]) if entry is not None else (0, 0.0)
+
+
+    def samples(self):
+        """
+        Returns:
+            list: Tuples (label values dict, cumulative bucket counts, count,
+            sum) for all observed label values. The bucket counts include the
+            final +Inf bucket.
+        """
+        with self._lock:
+            items = [(key, list(entry[0]), entry[1], entry[2])
+                     for key, entry in self._values.items()]
+        samples = []
+        for key, counts, count, total in items:
+            for i in range(1, len(counts)):
+                counts[i] += counts[i - 1]
+            samples.append((dict(zip(self.labelNames, key)), counts, count, total))
+        return samples
+
+
+
+class MetricsRegistry(object):
+    """
+    Holds all metrics of a process. Metrics are created on first request and
+    shared by everybody requesting a metric of the same name afterwards.
+    """
+
+    def __init__(self):
+        self._metrics = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    def counter(self, name, documentation, labelNames=()):
+        """
+        Returns the :class:`Counter` with the given name, creating it if needed.
+        """
+        return self._getOrCreate(Counter, name, documentation, labelNames)
+
+
+    def gauge(self, name, documentation, labelNames=()):
+        """
+        Returns the :class:`Gauge` with the given name, creating it if needed.
+        """
+        return self._getOrCreate(Gauge, name, documentation, labelNames)
+
+
+    def histogram(self, name, documentation, labelNames=(), buckets=DEFAULT_BUCKETS):
+        """
+        Returns the :class:`Histogram` with the given name, creating it if
+        needed.
+        """
+        return self._getOrCreate(Histogram, name, documentation, labelNames, buckets)
+
+
+    def collect(self):
+        """
+        Returns:
+            list: All registered metrics in order of creation.
+        """
+        with self._lock:
+            return list(self._metrics.values())
+
+
+    def _getOrCreate(self, metricClass, name, documentation, labelNames, *args):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = metricClass(name, documentation, labelNames, *args)
+                self._metrics[name] = metric
+            elif not isinstance(metric, metricClass):
+                raise ValueError("Metric \"%s\" is already registered as %s."
+                                 % (name, type(metric).__name__))
+            return metric
+
+
+    def exposition(self):
+        """
+        Returns:
+            str: All registered metrics in the Prometheus text exposition
+            format (version 0.0.4).
+        """
+        lines = []
+        for metric in self.collect():
+            lines.append("# HELP %s %s" % (metric.name, _escape(metric.documentation, False)))
+            if isinstance(metric, Histogram):
+                lines.append("# TYPE %s histogram" % metric.name)
+                bounds = [_formatValue(bound) for bound in metric.buckets] + ["+Inf"]
+                for labels, counts, count, total in metric.samples():
+                    for bound, bucketCount in zip(bounds, counts):
+                        bucketLabels = dict(labels, le=bound)
+                        lines.append("%s_bucket%s %d" % (metric.name,
+                                                         _formatLabels(bucketLabels),
+                                                         bucketCount))
+                    lines.append("%s_sum%s %s" % (metric.name, _formatLabels(labels),
+                                                  _formatValue(total)))
+                    lines.append("%s_count%s %d" % (metric.name, _formatLabels(labels), count))
+            else:
+                lines.append("# TYPE %s %s" % (metric.name,
+                                               "gauge" if isinstance(metric, Gauge)
+                                               else "counter"))
+                for labels, value in metric.samples():
+                    lines.append("%s%s %s" % (metric.name, _formatLabels(labels),
+                                              _formatValue(value)))
+        return "\n".join(lines) + "\n"
+
+
+
+class _Timer(object):
+
+    def __init__(self, histogram, labels):
+        self._histogram = histogram
+        self._labels = labels
+
+    def __enter__(self):
+        self._start = time.time()
+        return self
+
+    def __exit__(self, *args):
+        self._histogram.observe(time.time() - self._start, **self._labels)
+
+
+
+class _InProgress(object):
+
+    def __init__(self, gauge, labels):
+        self._gauge = gauge
+        self._labels = labels
+
+    def __enter__(self):
+        self._gauge.inc(**self._labels)
+        return self
+
+    def __exit__(self, *args):
+        self._gauge.dec(**self._labels)
+
+
+
+def _labelValues(metric, labels):
+    if len(labels) != len(metric.labelNames) or set(labels) != set(metric.labelNames):
+        raise ValueError("Metric \"%s\" expects the labels %s."
+                         % (metric.name, str(metric.labelNames)))
+    return tuple(str(labels[name]) for name in metric.labelNames)
+
+
+def _escape(value, quotes=True):
+    value = value.replace("\\", "\\\\").replace("\n", "\\n")
+    return value.replace("\"", "\\\"") if quotes else value
+
+
+def _formatLabels(labels):
+    if not labels:
+        return ""
+    return "{%s}" % ",".join("%s=\"%s\"" % (name, _escape(str(value)))
+                             for name, value in sorted(labels.items()))
+
+
+def _formatValue(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+
+# Default registry used throughout modelhublib and modelhubapi
+registry = MetricsRegistry()
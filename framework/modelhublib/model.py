@@ -21,3 +21,21 @@ class ModelBase(object):
         """
         raise NotImplementedError("This is a method of an abstract class.")
 
+
+    def infer_batch(self, inputs):
+        """
+        Optional method. Overwrite this method to run the inference on several
+        inputs at once, e.g. by stacking them into a single batch for your
+        deep learning framework. It is only used if batching is enabled in the API
+        (see :func:`~modelhubapi.pythonapi.ModelHubAPI.enable_batching`).
+
+        The default implementation simply calls :func:`~infer` for each input.
+
+        Args:
+            inputs (list): List of inputs, each one as it would be passed to :func:`~infer`.
+
+        Returns:
+            List of inference results, one per input and in the same order as the inputs.
+            Each result must have the same format as a result of :func:`~infer`.
+        """
+        return [self.infer(input) for input in inputs]
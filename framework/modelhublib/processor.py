@@ -1,7 +1,22 @@
+import io
+import six
 import numpy as np
+import PIL.Image
+import SimpleITK
+import multiprocessing
+from multiprocessing.pool import ThreadPool
 
-from .imageloaders import PilImageLoader, SitkImageLoader, NumpyImageLoader
+from .imageloaders import PilImageLoader, SitkImageLoader, NumpyImageLoader, LoaderRegistry
 from .imageconverters import PilToNumpyConverter, SitkToNumpyConverter, NumpyToNumpyConverter
+from . import metrics
+
+
+_stageSeconds = metrics.registry.histogram(
+    "modelhub_preprocess_stage_seconds",
+    "Time spent in the stages of ImageProcessorBase.loadAndPreprocess: "
+    "\"load\" (reading and decoding), \"preprocess_image\", \"convert\" "
+    "(to numpy) and \"preprocess_array\".",
+    ("stage",))
 
 
 class ImageProcessorBase(object):
@@ -29,6 +44,15 @@ class ImageProcessorBase(object):
     would be to call the original constructor from your derived class and then change
     what you need to change.
 
+    Before the chain of responsibility is asked, inputs are routed by their format
+    (magic bytes, file extension) to the one loader and converter registered for it in
+    a :class:`~modelhublib.imageloaders.loaderRegistry.LoaderRegistry`. The chain is
+    only used as fallback if routing fails. Routing is only done as long as the
+    chains start with the default loaders and converters created here, so appending
+    your handlers to the end of a chain keeps it, while replacing or inserting
+    handlers disables it and your chain is asked for every input. To disable
+    routing explicitly, set self._loaderRegistry to None in your constructor.
+
     Args:
         config (dict): Model configuration (loaded from model's config.json)
     """
@@ -41,6 +65,30 @@ class ImageProcessorBase(object):
         self._imageToNumpyConverter = PilToNumpyConverter()
         self._imageToNumpyConverter.setSuccessor(SitkToNumpyConverter())
         self._imageToNumpyConverter._successor.setSuccessor(NumpyToNumpyConverter())
+        self._defaultLoaders = _chain(self._imageLoader)
+        self._defaultConverters = _chain(self._imageToNumpyConverter)
+        self._loaderRegistry = LoaderRegistry()
+        self._loaderRegistry.register(PilImageLoader(self._config), PilToNumpyConverter(),
+                                      PIL.Image.Image,
+                                      mimeTypes=["image/png", "image/jpeg", "image/jpg",
+                                                 "image/gif", "image/bmp", "image/tiff"],
+                                      extensions=[".png", ".jpg", ".jpeg", ".gif", ".bmp",
+                                                  ".tif", ".tiff"],
+                                      magicBytes=[(0, b"\x89PNG\r\n\x1a\n"), (0, b"\xff\xd8\xff"),
+                                                  (0, b"GIF87a"), (0, b"GIF89a"),
+                                                  (0, b"II*\x00"), (0, b"MM\x00*")])
+        self._loaderRegistry.register(SitkImageLoader(self._config), SitkToNumpyConverter(),
+                                      SimpleITK.Image,
+                                      mimeTypes=["application/nii", "application/nii-gzip",
+                                                 "application/nrrd", "application/dicom"],
+                                      extensions=[".nii", ".nii.gz", ".nrrd", ".nhdr",
+                                                  ".mha", ".mhd", ".dcm"],
+                                      magicBytes=[(0, b"NRRD"), (128, b"DICM"),
+                                                  (344, b"n+1\x00"), (344, b"ni1\x00")])
+        self._loaderRegistry.register(NumpyImageLoader(self._config), NumpyToNumpyConverter(),
+                                      np.ndarray,
+                                      extensions=[".npy"],
+                                      magicBytes=[(0, b"\x93NUMPY")])
 
     def loadAndPreprocess(self, input, id=None):
         """
@@ -58,13 +106,72 @@ class ImageProcessorBase(object):
             numpy array appropriate to feed into the inference model
             (4 dimensions: [batchsize, z/color, height, width])
         """
-        image = self._load(input, id=id)
-        image = self._preprocessBeforeConversionToNumpy(image)
-        npArr = self._convertToNumpy(image)
-        npArr = self._preprocessAfterConversionToNumpy(npArr)
+        with _stageSeconds.time(stage="load"):
+            image = self._load(input, id=id)
+        with _stageSeconds.time(stage="preprocess_image"):
+            image = self._preprocessBeforeConversionToNumpy(image)
+        with _stageSeconds.time(stage="convert"):
+            npArr = self._convertToNumpy(image)
+        with _stageSeconds.time(stage="preprocess_array"):
+            npArr = self._preprocessAfterConversionToNumpy(npArr)
         return npArr
 
 
+    def loadAndPreprocessMany(self, inputs, numThreads=None):
+        """
+        Loads and preprocesses multiple inputs concurrently, each one like
+        :func:`~loadAndPreprocess` does. SimpleITK and PIL release the GIL while
+        decoding, so e.g. the sequences of an MRI study load in parallel.
+
+        There should be no need to overwrite this method in a derived class!
+
+        Args:
+            inputs (dict): Input file names keyed by input id. Also accepts the
+                input dictionary passed to multi-input models, i.e. values may
+                be dictionaries holding the file name under "fileurl". The key
+                "format" is ignored.
+            numThreads (int or None): Maximum number of inputs processed at the
+                same time. Defaults to the number of CPU cores.
+
+        Returns:
+            dict: numpy arrays as returned by :func:`~loadAndPreprocess`,
+            keyed by input id.
+
+        Raises:
+            The first exception raised while processing any of the inputs.
+        """
+        items = [(id, value["fileurl"] if isinstance(value, dict) else value)
+                 for id, value in inputs.items() if id != "format"]
+        if not items:
+            return {}
+        numThreads = min(numThreads or multiprocessing.cpu_count(), len(items))
+        if numThreads == 1:
+            return dict((id, self.loadAndPreprocess(input, id=id)) for id, input in items)
+        pool = ThreadPool(numThreads)
+        try:
+            npArrs = pool.map(lambda item: self.loadAndPreprocess(item[1], id=item[0]), items)
+        finally:
+            pool.close()
+            pool.join()
+        return dict((id, npArr) for (id, _), npArr in zip(items, npArrs))
+
+
+    def setCopyFreeConversion(self, copyFree=True):
+        """
+        Enables or disables copy-free mode for all image converters of this
+        processor (see :class:`~modelhublib.imageconverters.imageConverter.ImageConverter`).
+        Call this in the constructor of your derived class to lower peak memory
+        when converting large images. The converted values do not change.
+
+        Args:
+            copyFree (bool): Whether to convert in copy-free mode.
+        """
+        self._imageToNumpyConverter.setCopyFree(copyFree)
+        if self._loaderRegistry is not None:
+            for converter in self._loaderRegistry.converters():
+                converter.setCopyFree(copyFree)
+
+
     def computeOutput(self, inferenceResults):
         """
         Abstract method. Overwrite this method to define how to postprocess
@@ -99,7 +206,16 @@ class ImageProcessorBase(object):
             the library/handler used for loading (default implementation uses PIL or SimpleITK).
             Hence it might not always be the same.
         """
-        image = self._imageLoader.load(input, id=id)
+        if not self._isRoutingEnabled():
+            return self._imageLoader.load(input, id=id)
+        if isinstance(input, six.binary_type) and not isinstance(input, six.string_types):
+            input = io.BytesIO(input)
+        image = self._loaderRegistry.load(input, id=id)
+        if image is None:
+            # the routed loader already failed, don't ask the chain's one again
+            routed = self._loaderRegistry.route(input)
+            image = self._imageLoader.load(input, id=id,
+                                           skip=type(routed) if routed is not None else None)
         return image
 
 
@@ -139,7 +255,13 @@ class ImageProcessorBase(object):
         Returns:
             Representation of the input image as numpy array with 4 dimensions [batchsize, z/color, height, width].
         """
-        npArr = self._imageToNumpyConverter.convert(image)
+        if not self._isRoutingEnabled():
+            return self._imageToNumpyConverter.convert(image)
+        npArr = self._loaderRegistry.convert(image)
+        if npArr is None:
+            routed = self._loaderRegistry.converterFor(image)
+            npArr = self._imageToNumpyConverter.convert(
+                image, skip=type(routed) if routed is not None else None)
         return npArr
 
 
@@ -157,3 +279,33 @@ class ImageProcessorBase(object):
             Preprocessed numpy array with 4 dimensions [batchsize, z/color, height, width].
         """
         return npArr
+
+
+    def _isRoutingEnabled(self):
+        """
+        Returns:
+            bool: True if there is a loader registry and the chains of
+            responsibility still start with the default handlers, i.e.
+            routing picks the same handler the chain would.
+        """
+        if self._loaderRegistry is None:
+            return False
+        loaders = _chain(self._imageLoader)
+        converters = _chain(self._imageToNumpyConverter)
+        return all(a is b for a, b in zip(loaders, self._defaultLoaders)) \
+            and len(loaders) >= len(self._defaultLoaders) \
+            and all(a is b for a, b in zip(converters, self._defaultConverters)) \
+            and len(converters) >= len(self._defaultConverters)
+
+
+
+def _chain(handler):
+    """
+    Returns:
+        list: handler and all its successors in order.
+    """
+    handlers = []
+    while handler is not None:
+        handlers.append(handler)
+        handler = handler._successor
+    return handlers
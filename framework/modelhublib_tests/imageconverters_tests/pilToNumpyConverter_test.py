@@ -30,6 +30,27 @@ class TestPilImageConverter(unittest.TestCase):
         image = np.array([[1, 2], [3, 4]])
         self.assertRaises(IOError, self.imageConverter.convert, image)
 
+    def test_copy_free_convert_matches_default_convert(self):
+        copyFreeConverter = PilToNumpyConverter(copyFree = True)
+        values = np.arange(32 * 64 * 3, dtype = np.uint32).reshape(32, 64, 3) % 256
+        rgbImage = PIL.Image.fromarray(values.astype(np.uint8), "RGB")
+        for image in [rgbImage, rgbImage.convert("L"), rgbImage.convert("RGBA"),
+                      rgbImage.convert("I"), rgbImage.convert("F")]:
+            expected = self.imageConverter.convert(image)
+            npArr = copyFreeConverter.convert(image)
+            self.assertEqual(np.float32, npArr.dtype)
+            self.assertTupleEqual(expected.shape, npArr.shape)
+            self.assertTrue(npArr.flags.c_contiguous)
+            self.assertTrue(npArr.flags.writeable)
+            np.testing.assert_array_equal(expected, npArr)
+
+    def test_setCopyFree_applies_to_successors(self):
+        successor = PilToNumpyConverter()
+        self.imageConverter.setSuccessor(successor)
+        self.imageConverter.setCopyFree(True)
+        self.assertTrue(self.imageConverter.copyFree)
+        self.assertTrue(successor.copyFree)
+
 
 
 if __name__ == '__main__':
@@ -30,6 +30,27 @@ class TestSitkImageConverter(unittest.TestCase):
         image = np.array([[1, 2], [3, 4]])
         self.assertRaises(IOError, self.imageConverter.convert, image)
 
+    def test_copy_free_convert_matches_default_convert(self):
+        copyFreeConverter = SitkToNumpyConverter(copyFree = True)
+        values = np.arange(3 * 5 * 7).reshape(3, 5, 7) - 50
+        images = [sitk.GetImageFromArray(values.astype(np.int16)),
+                  sitk.GetImageFromArray(values[0].astype(np.uint8)),
+                  sitk.GetImageFromArray(values.astype(np.float32) / 3),
+                  sitk.GetImageFromArray(values.astype(np.float64) / 3)]
+        for image in images:
+            expected = self.imageConverter.convert(image)
+            npArr = copyFreeConverter.convert(image)
+            self.assertEqual(np.float32, npArr.dtype)
+            self.assertTupleEqual(expected.shape, npArr.shape)
+            np.testing.assert_array_equal(expected, npArr)
+
+    def test_copy_free_convert_does_not_share_memory_with_image(self):
+        image = sitk.GetImageFromArray(np.ones((2, 4), dtype = np.float32))
+        npArr = SitkToNumpyConverter(copyFree = True).convert(image)
+        del image
+        npArr[0, 0, 0, 0] = 5
+        self.assertListEqual([[[[5, 1, 1, 1], [1, 1, 1, 1]]]], npArr.tolist())
+
 
 
 if __name__ == '__main__':
@@ -16,6 +16,9 @@ class TestImageLoader(unittest.TestCase):
         self.assertRaises(NotImplementedError, self.imageLoader._getImageDimensions, None)
         self.assertRaises(NotImplementedError, self.imageLoader._checkConfigCompliance, None)
     
+    def test_probeImageDimensions_defaults_to_none(self):
+        self.assertIsNone(self.imageLoader._probeImageDimensions("nonexistent.png"))
+
     def test_load_returns_IOError_on_string_input(self):
         self.assertRaises(IOError, self.imageLoader.load, "nonexistent.png")
 
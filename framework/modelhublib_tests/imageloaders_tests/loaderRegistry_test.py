@@ -0,0 +1,104 @@
+import unittest
+import os
+import io
+import json
+import numpy as np
+import PIL.Image
+import SimpleITK as sitk
+
+from modelhublib import metrics
+from modelhublib.imageloaders import LoaderRegistry, PilImageLoader, SitkImageLoader, NumpyImageLoader
+from modelhublib.imageconverters import PilToNumpyConverter, SitkToNumpyConverter, NumpyToNumpyConverter
+
+
+class RecordingLoader(NumpyImageLoader):
+
+    def __init__(self, config):
+        super(RecordingLoader, self).__init__(config)
+        self.inputs = []
+
+    def _load(self, input):
+        self.inputs.append(input)
+        return super(RecordingLoader, self)._load(input)
+
+
+class TestLoaderRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.testDataDir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "testdata"))
+        with open(os.path.join(self.testDataDir, "test_config.json")) as jsonFile:
+            self.config = json.load(jsonFile)
+        self.pilLoader = PilImageLoader(self.config)
+        self.sitkLoader = SitkImageLoader(self.config)
+        self.numpyLoader = RecordingLoader(self.config)
+        self.registry = LoaderRegistry()
+        self.registry.register(self.pilLoader, PilToNumpyConverter(), PIL.Image.Image,
+                               mimeTypes=["image/png"], extensions=[".png"],
+                               magicBytes=[(0, b"\x89PNG\r\n\x1a\n")])
+        self.registry.register(self.sitkLoader, SitkToNumpyConverter(), sitk.Image,
+                               mimeTypes=["application/nii-gzip"],
+                               extensions=[".nii.gz", ".nrrd"],
+                               magicBytes=[(0, b"NRRD")])
+        self.registry.register(self.numpyLoader, NumpyToNumpyConverter(), np.ndarray,
+                               extensions=[".npy"], magicBytes=[(0, b"\x93NUMPY")])
+        self.fallbacks = metrics.registry.counter("modelhub_image_loader_fallbacks_total", "",
+                                                  ("stage", "reason"))
+
+    def tearDown(self):
+        pass
+
+    def test_route_by_magic_bytes(self):
+        imgFileName = os.path.join(self.testDataDir, "testimage_ramp_4x2.png")
+        with open(imgFileName, "rb") as f:
+            buffer = io.BytesIO(f.read())
+        self.assertIs(self.pilLoader, self.registry.route(buffer))
+        self.assertEqual(0, buffer.tell())
+        self.assertIs(self.numpyLoader,
+                      self.registry.route(os.path.join(self.testDataDir, "test_numpy_3x4x4.npy")))
+        self.assertIs(self.sitkLoader,
+                      self.registry.route(os.path.join(self.testDataDir, "testimage_ramp_4x2.nrrd")))
+
+    def test_route_by_extension(self):
+        imgFileName = os.path.join(self.testDataDir, "testimage_nifti_91x109x91.nii.gz")
+        self.assertIs(self.sitkLoader, self.registry.route(imgFileName))
+
+    def test_route_by_mime_type(self):
+        buffer = io.BytesIO(b"\x1f\x8b unknown content")
+        self.assertIsNone(self.registry.route(buffer))
+        self.assertIs(self.sitkLoader, self.registry.route(buffer, mimeType="application/nii-gzip"))
+
+    def test_load_uses_only_routed_loader(self):
+        npImage = self.registry.load(os.path.join(self.testDataDir, "test_numpy_3x4x4.npy"))
+        self.assertTupleEqual((3,4,4), npImage.shape)
+        self.registry.load(os.path.join(self.testDataDir, "testimage_ramp_4x2.png"))
+        self.assertEqual(1, len(self.numpyLoader.inputs))
+
+    def test_load_unknown_format_returns_none_and_counts_fallback(self):
+        before = self.fallbacks.get(stage="load", reason="unknown_format")
+        self.assertIsNone(self.registry.load(b"unknown content"))
+        self.assertEqual(before + 1, self.fallbacks.get(stage="load", reason="unknown_format"))
+
+    def test_load_failing_routed_loader_returns_none_and_counts_fallback(self):
+        before = self.fallbacks.get(stage="load", reason="routed_loader_failed")
+        self.assertIsNone(self.registry.load(io.BytesIO(b"\x93NUMPY broken header")))
+        self.assertEqual(before + 1, self.fallbacks.get(stage="load", reason="routed_loader_failed"))
+
+    def test_load_raises_on_config_noncompliance(self):
+        self.config["model"]["io"]["input"]["single"]["dim_limits"][2]["min"] = 5
+        self.assertRaises(IOError, self.registry.load,
+                          os.path.join(self.testDataDir, "testimage_ramp_4x2.png"))
+
+    def test_convert_picks_converter_by_image_type(self):
+        image = sitk.Image([4,2], sitk.sitkUInt8)
+        self.assertIsInstance(self.registry.converterFor(image), SitkToNumpyConverter)
+        self.assertTupleEqual((1, 1, 2, 4), self.registry.convert(image).shape)
+
+    def test_convert_unknown_image_type_returns_none_and_counts_fallback(self):
+        before = self.fallbacks.get(stage="convert", reason="unknown_image_type")
+        self.assertIsNone(self.registry.convert([1, 2, 3]))
+        self.assertEqual(before + 1, self.fallbacks.get(stage="convert", reason="unknown_image_type"))
+
+
+
+if __name__ == '__main__':
+    unittest.main()
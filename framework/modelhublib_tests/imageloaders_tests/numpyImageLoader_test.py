@@ -1,5 +1,6 @@
 import unittest
 import os
+import io
 import json
 
 from modelhublib.imageloaders import NumpyImageLoader
@@ -20,6 +21,29 @@ class TestNumpyImageLoader(unittest.TestCase):
         image = self.imageLoader.load(arrayFileName)
         self.assertTupleEqual((3,4,4), image.shape)
 
+    def test_probeImageDimensions_returns_shape_from_header(self):
+        arrayFileName = os.path.join(self.testDataDir, "test_numpy_3x4x4.npy")
+        self.assertTupleEqual((3,4,4), self.imageLoader._probeImageDimensions(arrayFileName))
+
+    def test_probeImageDimensions_returns_none_for_other_formats(self):
+        imgFileName = os.path.join(self.testDataDir, "testimage_ramp_4x2.png")
+        self.assertIsNone(self.imageLoader._probeImageDimensions(imgFileName))
+
+    def test_load_rejects_noncompliant_array_before_decoding(self):
+        arrayFileName = os.path.join(self.testDataDir, "test_numpy_3x4x4.npy")
+        self.config["model"]["io"]["input"]["single"]["dim_limits"][0]["max"] = 2
+        loadCalls = []
+        self.imageLoader._load = lambda input: loadCalls.append(input)
+        self.assertRaises(IOError, self.imageLoader.load, arrayFileName)
+        self.assertListEqual([], loadCalls)
+
+    def test_load_numpy_array_from_buffer(self):
+        arrayFileName = os.path.join(self.testDataDir, "test_numpy_3x4x4.npy")
+        with open(arrayFileName, "rb") as f:
+            buffer = io.BytesIO(f.read())
+        image = self.imageLoader.load(buffer)
+        self.assertTupleEqual((3,4,4), image.shape)
+
 
 if __name__ == '__main__':
     unittest.main()
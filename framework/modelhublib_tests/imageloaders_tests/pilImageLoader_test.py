@@ -1,5 +1,6 @@
 import unittest
 import os
+import io
 import PIL
 import json
 
@@ -32,6 +33,20 @@ class TestPilImageLoader(unittest.TestCase):
         dims = self.imageLoader._getImageDimensions(image)
         self.assertListEqual([1,2,4], dims)
 
+    def test_load_testimage_ramp_4x2_from_bytes(self):
+        imgFileName = os.path.join(self.testDataDir, "testimage_ramp_4x2.png")
+        with open(imgFileName, "rb") as f:
+            image = self.imageLoader.load(f.read())
+        self.assertTupleEqual((4,2), image.size)
+
+    def test_load_testimage_ramp_4x2_from_buffer(self):
+        imgFileName = os.path.join(self.testDataDir, "testimage_ramp_4x2.png")
+        with open(imgFileName, "rb") as f:
+            buffer = io.BytesIO(f.read())
+        buffer.seek(3)
+        image = self.imageLoader.load(buffer)
+        self.assertTupleEqual((4,2), image.size)
+
 
 
 if __name__ == '__main__':
@@ -1,5 +1,7 @@
 import unittest
 import os
+import io
+import tempfile
 import SimpleITK as sitk
 import json
 
@@ -55,6 +57,48 @@ class TestSitkImageLoader(unittest.TestCase):
         dims = self.imageLoader._getImageDimensions(image)
         self.assertListEqual([1,256,256], dims)
 
+    def test_probeImageDimensions_returns_header_dims_for_nifti(self):
+        imgFileName = os.path.join(self.testDataDir, "testimage_nifti_91x109x91.nii.gz")
+        self.assertListEqual([91,109,91], self.imageLoader._probeImageDimensions(imgFileName))
+
+    def test_probeImageDimensions_matches_loaded_dims_for_2d_image(self):
+        imgFileName = os.path.join(self.testDataDir, "testimage_checkers_64x32.nrrd")
+        image = self.imageLoader.load(imgFileName)
+        self.assertListEqual(self.imageLoader._getImageDimensions(image),
+                             self.imageLoader._probeImageDimensions(imgFileName))
+
+    def test_load_rejects_noncompliant_nifti_before_decoding(self):
+        imgFileName = os.path.join(self.testDataDir, "testimage_nifti_91x109x91.nii.gz")
+        self.config["model"]["io"]["input"]["single"]["dim_limits"][0]["max"] = 10
+        loadCalls = []
+        self.imageLoader._load = lambda input: loadCalls.append(input)
+        self.assertRaises(IOError, self.imageLoader.load, imgFileName)
+        self.assertListEqual([], loadCalls)
+
+    def test_load_testimage_nifti_91x109x91_from_named_buffer(self):
+        imgFileName = os.path.join(self.testDataDir, "testimage_nifti_91x109x91.nii.gz")
+        with open(imgFileName, "rb") as f:
+            buffer = io.BytesIO(f.read())
+        buffer.name = "upload.nii.gz"
+        image = self.imageLoader.load(buffer)
+        self.assertTupleEqual((91,109,91), image.GetSize())
+
+    def test_load_from_buffer_removes_temporary_file(self):
+        imgFileName = os.path.join(self.testDataDir, "testimage_checkers_64x32.nrrd")
+        with open(imgFileName, "rb") as f:
+            buffer = io.BytesIO(f.read())
+        buffer.name = "upload.nrrd"
+        tempDir = tempfile.mkdtemp()
+        originalTempDir = tempfile.tempdir
+        tempfile.tempdir = tempDir
+        try:
+            image = self.imageLoader.load(buffer)
+            self.assertTupleEqual((64,32), image.GetSize())
+            self.assertListEqual([], os.listdir(tempDir))
+        finally:
+            tempfile.tempdir = originalTempDir
+            os.rmdir(tempDir)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,126 @@
+import unittest
+
+from modelhublib.metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+
+class TestCounter(unittest.TestCase):
+
+    def setUp(self):
+        self.counter = Counter("test_total", "Test counter", ("outcome",))
+
+    def tearDown(self):
+        pass
+
+    def test_inc_counts_per_label_value(self):
+        self.counter.inc(outcome="success")
+        self.counter.inc(2, outcome="success")
+        self.counter.inc(outcome="error")
+        self.assertEqual(3, self.counter.get(outcome="success"))
+        self.assertEqual(1, self.counter.get(outcome="error"))
+        self.assertEqual(0, self.counter.get(outcome="unknown"))
+
+    def test_inc_fails_on_wrong_labels(self):
+        self.assertRaises(ValueError, self.counter.inc)
+        self.assertRaises(ValueError, self.counter.inc, reason="error")
+
+    def test_samples_lists_all_label_values(self):
+        self.counter.inc(outcome="success")
+        self.assertListEqual([({"outcome": "success"}, 1)], self.counter.samples())
+
+
+
+class TestGauge(unittest.TestCase):
+
+    def setUp(self):
+        self.gauge = Gauge("test_in_flight", "Test gauge", ("endpoint",))
+
+    def tearDown(self):
+        pass
+
+    def test_value_goes_up_and_down(self):
+        self.gauge.inc(endpoint="predict")
+        self.gauge.inc(3, endpoint="predict")
+        self.gauge.dec(endpoint="predict")
+        self.assertEqual(3, self.gauge.get(endpoint="predict"))
+        self.gauge.set(7, endpoint="predict")
+        self.assertEqual(7, self.gauge.get(endpoint="predict"))
+
+    def test_track_in_progress(self):
+        with self.gauge.trackInProgress(endpoint="predict"):
+            self.assertEqual(1, self.gauge.get(endpoint="predict"))
+        self.assertEqual(0, self.gauge.get(endpoint="predict"))
+
+
+
+class TestHistogram(unittest.TestCase):
+
+    def setUp(self):
+        self.histogram = Histogram("test_seconds", "Test histogram", ("stage",),
+                                   buckets=(0.1, 1.0))
+
+    def tearDown(self):
+        pass
+
+    def test_observe_counts_cumulative_buckets(self):
+        for value in [0.05, 0.1, 0.5, 2.0]:
+            self.histogram.observe(value, stage="load")
+        labels, counts, count, total = self.histogram.samples()[0]
+        self.assertDictEqual({"stage": "load"}, labels)
+        self.assertListEqual([2, 3, 4], counts)
+        self.assertEqual(4, count)
+        self.assertAlmostEqual(2.65, total)
+        self.assertEqual((0, 0.0), self.histogram.get(stage="convert"))
+
+    def test_time_observes_duration(self):
+        with self.histogram.time(stage="load"):
+            pass
+        count, total = self.histogram.get(stage="load")
+        self.assertEqual(1, count)
+        self.assertLess(total, 0.1)
+
+    def test_observe_fails_on_wrong_labels(self):
+        self.assertRaises(ValueError, self.histogram.observe, 1.0)
+
+
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def tearDown(self):
+        pass
+
+    def test_counter_is_shared_by_name(self):
+        counter = self.registry.counter("test_total", "Test counter")
+        self.assertIs(counter, self.registry.counter("test_total", "Test counter"))
+        self.assertListEqual([counter], self.registry.collect())
+
+    def test_name_cannot_be_registered_twice_with_other_type(self):
+        self.registry.counter("test_total", "Test counter")
+        self.assertRaises(ValueError, self.registry.gauge, "test_total", "Test gauge")
+
+    def test_exposition_in_prometheus_text_format(self):
+        self.registry.counter("test_total", "Test \\ counter", ("path",)).inc(
+            2, path="a\"b\n")
+        self.registry.gauge("test_in_flight", "Test gauge").set(1.5)
+        self.registry.histogram("test_seconds", "Test histogram",
+                                buckets=(0.5,)).observe(0.25)
+        self.assertEqual("# HELP test_total Test \\\\ counter\n"
+                         "# TYPE test_total counter\n"
+                         "test_total{path=\"a\\\"b\\n\"} 2\n"
+                         "# HELP test_in_flight Test gauge\n"
+                         "# TYPE test_in_flight gauge\n"
+                         "test_in_flight 1.5\n"
+                         "# HELP test_seconds Test histogram\n"
+                         "# TYPE test_seconds histogram\n"
+                         "test_seconds_bucket{le=\"0.5\"} 1\n"
+                         "test_seconds_bucket{le=\"+Inf\"} 1\n"
+                         "test_seconds_sum 0.25\n"
+                         "test_seconds_count 1\n",
+                         self.registry.exposition())
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,7 +3,9 @@ import os
 import PIL
 import json
 import six
+import threading
 
+from modelhublib import metrics
 from modelhublib.processor import ImageProcessorBase
 
 # The MetaTestImageProcessorBase meta class is used to generate tests
@@ -56,6 +58,140 @@ class TestImageProcessorBase(unittest.TestCase):
     def test_computeOutput_is_abstract(self):
         self.assertRaises(NotImplementedError, self.processor.computeOutput, None)
 
+    def test_load_routes_numpy_input_without_trying_other_loaders(self):
+        arrayFileName = os.path.join(self.testDataDir, "test_numpy_3x4x4.npy")
+        chainCalls = []
+        def recordCall(input):
+            chainCalls.append(input)
+            raise IOError("Chain should not be used.")
+        self.processor._imageLoader._load = recordCall
+        self.processor._imageLoader._successor._load = recordCall
+        npArr = self.processor.loadAndPreprocess(arrayFileName)
+        self.assertTupleEqual((3,4,4), npArr.shape)
+        self.assertListEqual([], chainCalls)
+
+    def test_load_falls_back_to_chain_if_routing_fails(self):
+        imgFileName = os.path.join(self.testDataDir, "testimage_ramp_4x2.png")
+        fallbacks = metrics.registry.counter("modelhub_image_loader_fallbacks_total", "",
+                                             ("stage", "reason"))
+        before = fallbacks.get(stage="load", reason="routed_loader_failed")
+        self.processor._loaderRegistry.route(imgFileName)._load = None
+        npArr = self.processor.loadAndPreprocess(imgFileName)
+        self.assertListEqual([[[[50.0,100.0,150.0,200.0],[50.0,100.0,150.0,200.0]]]], npArr.tolist())
+        self.assertEqual(before + 1, fallbacks.get(stage="load", reason="routed_loader_failed"))
+
+    def test_load_fallback_skips_loader_that_failed_routing(self):
+        imgFileName = os.path.join(self.testDataDir, "testimage_ramp_4x2.png")
+        chainCalls = []
+        def recordCall(input, id=None):
+            chainCalls.append(input)
+            raise IOError("Routed loader already failed.")
+        self.processor._loaderRegistry.route(imgFileName)._load = None
+        self.processor._imageLoader._load = recordCall
+        npArr = self.processor.loadAndPreprocess(imgFileName)
+        self.assertListEqual([[[[50.0,100.0,150.0,200.0],[50.0,100.0,150.0,200.0]]]], npArr.tolist())
+        self.assertListEqual([], chainCalls)
+
+    def test_load_uses_customized_chain_instead_of_routing(self):
+        imgFileName = os.path.join(self.testDataDir, "testimage_ramp_4x2.png")
+        chainCalls = []
+        loader = self.processor._imageLoader._successor
+        originalLoad = loader._load
+        def recordCall(input, id=None):
+            chainCalls.append(input)
+            return originalLoad(input)
+        loader._load = recordCall
+        # a contributed processor putting its own loader first
+        self.processor._imageLoader = loader
+        npArr = self.processor.loadAndPreprocess(imgFileName)
+        self.assertListEqual([[[[50.0,100.0,150.0,200.0],[50.0,100.0,150.0,200.0]]]], npArr.tolist())
+        self.assertListEqual([imgFileName], chainCalls)
+
+    def test_load_routes_if_handlers_are_appended_to_chain(self):
+        loader = self.processor._imageLoader._successor._successor
+        loader.setSuccessor(type(loader)(self.config))
+        self.assertTrue(self.processor._isRoutingEnabled())
+
+    def test_loadAndPreprocess_times_its_stages(self):
+        stageSeconds = metrics.registry.histogram("modelhub_preprocess_stage_seconds", "",
+                                                  ("stage",))
+        stages = ["load", "preprocess_image", "convert", "preprocess_array"]
+        before = [stageSeconds.get(stage=stage)[0] for stage in stages]
+        self.processor.loadAndPreprocess(os.path.join(self.testDataDir, "testimage_ramp_4x2.png"))
+        self.assertListEqual([count + 1 for count in before],
+                             [stageSeconds.get(stage=stage)[0] for stage in stages])
+
+    def test_load_without_registry_uses_chain(self):
+        self.processor._loaderRegistry = None
+        imgFileName = os.path.join(self.testDataDir, "testimage_ramp_4x2.nrrd")
+        npArr = self.processor.loadAndPreprocess(imgFileName)
+        self.assertListEqual([[[[50.0,100.0,150.0,200.0],[50.0,100.0,150.0,200.0]]]], npArr.tolist())
+
+    def test_setCopyFreeConversion_applies_to_all_converters(self):
+        self.processor.setCopyFreeConversion(True)
+        converters = self.processor._loaderRegistry.converters()
+        converter = self.processor._imageToNumpyConverter
+        while converter:
+            converters.append(converter)
+            converter = converter._successor
+        self.assertTrue(all(converter.copyFree for converter in converters))
+        for fileExt in testFileExtensions:
+            imgFileName = os.path.join(self.testDataDir, "testimage_ramp_4x2." + fileExt)
+            npArr = self.processor.loadAndPreprocess(imgFileName)
+            self.assertListEqual([[[[50.0,100.0,150.0,200.0],[50.0,100.0,150.0,200.0]]]], npArr.tolist())
+
+
+
+
+class TestImageProcessorBaseMultiInput(unittest.TestCase):
+
+    def setUp(self):
+        self.testDataDir = os.path.abspath(os.path.join(os.path.dirname(__file__), "testdata"))
+        with open(os.path.join(self.testDataDir, "test_config_mi.json")) as jsonFile:
+            self.config = json.load(jsonFile)
+        self.processor = ImageProcessorBase(self.config)
+        self.pngFileName = os.path.join(self.testDataDir, "testimage_ramp_4x2.png")
+        self.nrrdFileName = os.path.join(self.testDataDir, "testimage_ramp_4x2.nrrd")
+
+    def tearDown(self):
+        pass
+
+    def test_loadAndPreprocessMany_returns_arrays_keyed_by_id(self):
+        npArrs = self.processor.loadAndPreprocessMany({"name": self.pngFileName,
+                                                       "name2": self.nrrdFileName})
+        self.assertListEqual(["name", "name2"], sorted(npArrs.keys()))
+        for npArr in npArrs.values():
+            self.assertListEqual([[[[50.0,100.0,150.0,200.0],[50.0,100.0,150.0,200.0]]]], npArr.tolist())
+
+    def test_loadAndPreprocessMany_accepts_multi_input_dict(self):
+        inputs = {"format": ["application/json"],
+                  "name": {"type": "image/png", "fileurl": self.pngFileName},
+                  "name2": {"type": "application/nrrd", "fileurl": self.nrrdFileName}}
+        npArrs = self.processor.loadAndPreprocessMany(inputs, numThreads=1)
+        self.assertListEqual(["name", "name2"], sorted(npArrs.keys()))
+
+    def test_loadAndPreprocessMany_processes_inputs_concurrently(self):
+        arrived = []
+        allArrived = threading.Event()
+        def waitForOtherInputs(npArr):
+            arrived.append(npArr)
+            if len(arrived) == 2:
+                allArrived.set()
+            # Sequential processing never gets past this for the first input
+            if not allArrived.wait(5.0):
+                raise IOError("Inputs were not processed concurrently.")
+            return npArr
+        self.processor._preprocessAfterConversionToNumpy = waitForOtherInputs
+        npArrs = self.processor.loadAndPreprocessMany({"name": self.pngFileName,
+                                                       "name2": self.nrrdFileName},
+                                                      numThreads=2)
+        self.assertEqual(2, len(npArrs))
+
+    def test_loadAndPreprocessMany_raises_on_noncompliant_input(self):
+        self.config["model"]["io"]["input"]["name2"]["dim_limits"][1]["min"] = 3
+        self.assertRaises(IOError, self.processor.loadAndPreprocessMany,
+                          {"name": self.pngFileName, "name2": self.nrrdFileName})
+
 
 
 if __name__ == '__main__':